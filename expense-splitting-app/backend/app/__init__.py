@@ -7,8 +7,6 @@ from .config import DevelopmentConfig  # Change this to the appropriate config c
 from flask_jwt_extended import JWTManager # type: ignore
 from .utils import auth_utils
 import logging
-import stripe
-import paypalrestsdk
 
 # Set the logging level to DEBUG to capture debug logs
 logging.basicConfig(level=logging.DEBUG)
@@ -50,6 +48,26 @@ def create_app(config_class=DevelopmentConfig):
     db.init_app(app)
     migrate.init_app(app, db)
 
+    # Shared, persistent blocklist of logged out tokens
+    from .utils.token_blocklist import init_token_blocklist
+    init_token_blocklist(app)
+
+    # Answers most username and email availability checks without a query
+    from .utils.availability_index import init_availability_index
+    init_availability_index(app)
+
+    # Password hashing off the request thread
+    from .utils.password_hasher import init_password_hasher
+    init_password_hasher(app)
+
+    # Rate limits and load shedding, checked before any other request work
+    from .utils.rate_limiter import init_rate_limiter
+    init_rate_limiter(app)
+
+    # Track SQL query count and time per request
+    from .utils.query_monitor import init_query_monitor
+    init_query_monitor(app)
+
     # Import and register blueprints or routes
     from .routes import auth, logout, groups, profile, expenses, user, admin, payments
     app.register_blueprint(auth.bp)
@@ -71,14 +89,28 @@ def create_app(config_class=DevelopmentConfig):
         }
         return jsonify(response), 500
     
-    # Initialize Stripe
-    stripe.api_key = app.config['STRIPE_API_KEY']
-
-    # Initialize PayPal
-    paypalrestsdk.configure({
-        "mode": "sandbox",  # or "live"
-        "client_id": app.config['PAYPAL_CLIENT_ID'],
-        "client_secret": app.config['PAYPAL_CLIENT_SECRET']
-    })
+    # Stripe and PayPal clients, each behind a gateway with its own threads, deadlines and circuit breaker
+    from .services.payment_gateway import init_payment_gateways
+    init_payment_gateways(app)
+
+    # Pre-reserved group join codes
+    from .services.join_code_pool import init_join_code_pool
+    init_join_code_pool(app)
+
+    # Content-addressed profile images and their thumbnails
+    from .utils.image_store import init_image_store
+    init_image_store(app)
+
+    # Read-through cache for users, profiles and group members
+    from .utils.cache import init_cache
+    init_cache(app)
+
+    # 304 Not Modified for polled resources that haven't changed
+    from .utils.conditional import init_conditional_get
+    init_conditional_get(app)
+
+    # Applies stored payment webhooks in the background
+    from .services.webhook_service import init_webhook_worker
+    init_webhook_worker(app)
     
     return app
\ No newline at end of file
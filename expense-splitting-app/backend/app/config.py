@@ -6,24 +6,96 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URI', 'sqlite:///default.db')  # Default to SQLite
     UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', './uploads')  # Default upload folder
     ALLOWED_EXTENSIONS = os.getenv('ALLOWED_EXTENSIONS', 'pdf,jpg,png').split(',')  # Default file types
+    # Profile images, stored by content hash under UPLOAD_FOLDER/images
+    PROFILE_IMAGE_SIZES = [int(size) for size in os.getenv('PROFILE_IMAGE_SIZES', '64,256').split(',')]  # Thumbnail sizes in pixels, needs Pillow
+    PROFILE_IMAGE_WORKERS = int(os.getenv('PROFILE_IMAGE_WORKERS', 2))  # Threads resizing thumbnails, 0 resizes during the request
+    PROFILE_IMAGE_MAX_BYTES = int(os.getenv('PROFILE_IMAGE_MAX_BYTES', 10 * 1024 * 1024))
     CORS_ORIGINS = os.getenv('CORS_ORIGINS', 'http://localhost:3000')  # Default origin
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    BULK_IMPORT_MAX_ROWS = int(os.getenv('BULK_IMPORT_MAX_ROWS', 10000))  # Rows accepted by one bulk import
+    # SQL instrumentation
+    SQL_QUERY_BUDGET = int(os.getenv('SQL_QUERY_BUDGET', 20))  # Warn when a request runs more queries than this
+    SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv('SQL_N_PLUS_ONE_THRESHOLD', 5))  # Warn when one statement repeats this often
+    SQL_QUERY_STATS_HEADERS = False  # Add X-DB-Query-Count and X-DB-Time-Ms response headers
+    # Password hashing, run in a process pool so it doesn't stall request threads
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')  # Werkzeug method string including the cost; older hashes are upgraded on login
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', os.cpu_count() or 1))  # 0 hashes inline on the request thread
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 64))  # Queued hashes before logins get 503
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    # Logged out tokens
+    TOKEN_BLOCKLIST_STORE = os.getenv('TOKEN_BLOCKLIST_STORE', 'database')  # 'database' or 'memory' (single process only)
+    TOKEN_BLOCKLIST_REFRESH_SECONDS = float(os.getenv('TOKEN_BLOCKLIST_REFRESH_SECONDS', 2))  # How stale a worker's view of other workers' logouts may be
+    TOKEN_BLOCKLIST_CAPACITY = int(os.getenv('TOKEN_BLOCKLIST_CAPACITY', 100000))  # Bloom filter size per worker
+    TOKEN_BLOCKLIST_REBUILD_SECONDS = float(os.getenv('TOKEN_BLOCKLIST_REBUILD_SECONDS', 300))  # Full reload from the store, whatever the refreshes missed
+    # Username and email availability checks
+    AVAILABILITY_INDEX_ENABLED = os.getenv('AVAILABILITY_INDEX_ENABLED', 'true').lower() == 'true'  # Per-worker bloom filters that answer "available" without a query
+    AVAILABILITY_INDEX_CAPACITY = int(os.getenv('AVAILABILITY_INDEX_CAPACITY', 100000))  # Bloom filter size per worker, raised to twice the user count when that is larger
+    AVAILABILITY_INDEX_REFRESH_SECONDS = float(os.getenv('AVAILABILITY_INDEX_REFRESH_SECONDS', 2))  # How stale a worker's view of other workers' registrations may be
+    AVAILABILITY_INDEX_REBUILD_SECONDS = float(os.getenv('AVAILABILITY_INDEX_REBUILD_SECONDS', 300))
+    # Group join codes, reserved ahead of time in batches
+    GROUP_CODE_BATCH_SIZE = int(os.getenv('GROUP_CODE_BATCH_SIZE', 100))  # Codes claimed per database round trip
+    GROUP_CODE_LOW_WATER = int(os.getenv('GROUP_CODE_LOW_WATER', 25))  # Refill in the background below this many
+    GROUP_CODE_BACKGROUND_REFILL = os.getenv('GROUP_CODE_BACKGROUND_REFILL', 'true').lower() == 'true'
+    # Read-through cache for hot lookups (users, profiles, group members)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')  # 'memory' (per worker) or 'sqlite' (shared by workers on one host)
+    CACHE_PATH = os.getenv('CACHE_PATH')  # SQLite file for the shared backend, defaults to instance/cache.db
+    CACHE_TTL_SECONDS = float(os.getenv('CACHE_TTL_SECONDS', 60))  # Upper bound on staleness, e.g. for other workers' memory caches
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', 10000))  # Per worker, memory backend only
+    # Polling clients
+    CONDITIONAL_GET_ENABLED = os.getenv('CONDITIONAL_GET_ENABLED', 'true').lower() == 'true'  # ETag/Last-Modified on polled GETs, unchanged ones answered with 304
+    # Admission control
+    RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', 'true').lower() == 'true'
+    RATE_LIMIT_STORE = os.getenv('RATE_LIMIT_STORE', 'memory')  # 'memory' (per worker) or 'sqlite' (shared by workers on one host)
+    RATE_LIMIT_STORE_PATH = os.getenv('RATE_LIMIT_STORE_PATH')  # SQLite file for the shared store, defaults to instance/rate_limits.db
+    RATE_LIMIT_IP_PER_SECOND = float(os.getenv('RATE_LIMIT_IP_PER_SECOND', 20))  # Sustained requests per client IP
+    RATE_LIMIT_IP_BURST = float(os.getenv('RATE_LIMIT_IP_BURST', 40))
+    RATE_LIMIT_USER_PER_SECOND = float(os.getenv('RATE_LIMIT_USER_PER_SECOND', 10))  # Sustained requests per signed-in user
+    RATE_LIMIT_USER_BURST = float(os.getenv('RATE_LIMIT_USER_BURST', 30))
+    RATE_LIMIT_PASSWORD_PER_SECOND = float(os.getenv('RATE_LIMIT_PASSWORD_PER_SECOND', 0.2))  # Logins and registrations per client IP
+    RATE_LIMIT_PASSWORD_BURST = float(os.getenv('RATE_LIMIT_PASSWORD_BURST', 10))
+    CONCURRENCY_TARGET_LATENCY_MS = float(os.getenv('CONCURRENCY_TARGET_LATENCY_MS', 500))  # 0 disables the adaptive concurrency limit
+    CONCURRENCY_LIMIT_INITIAL = int(os.getenv('CONCURRENCY_LIMIT_INITIAL', 32))  # Requests in flight per worker
+    CONCURRENCY_LIMIT_MIN = int(os.getenv('CONCURRENCY_LIMIT_MIN', 4))
+    CONCURRENCY_LIMIT_MAX = int(os.getenv('CONCURRENCY_LIMIT_MAX', 256))
     #Payment intergration
     STRIPE_API_KEY = 'stripe_api_key'  # Default Stripe API key
     PAYPAL_CLIENT_ID = 'paypal_client_id'  # Default PayPal client
     PAYPAL_CLIENT_SECRET = 'paypal_client_secret'  # Default PayPal secret
+    PAYPAL_MODE = os.getenv('PAYPAL_MODE', 'sandbox')  # or 'live'
+    PAYPAL_RETURN_URL = os.getenv('PAYPAL_RETURN_URL', 'http://localhost:3000/payment/success')
+    PAYPAL_CANCEL_URL = os.getenv('PAYPAL_CANCEL_URL', 'http://localhost:3000/payment/cancel')
+    PAYMENT_FAKE_PROVIDER = os.getenv('PAYMENT_FAKE_PROVIDER', 'false').lower() == 'true'  # Use the in-process fake instead of Stripe and PayPal
+    PAYMENT_PROVIDER_TIMEOUT = float(os.getenv('PAYMENT_PROVIDER_TIMEOUT', 10))  # Deadline for one provider call, retries included
+    PAYMENT_PROVIDER_MAX_ATTEMPTS = int(os.getenv('PAYMENT_PROVIDER_MAX_ATTEMPTS', 3))
+    PAYMENT_PROVIDER_WORKERS = int(os.getenv('PAYMENT_PROVIDER_WORKERS', 8))  # Threads (and pooled connections) per provider
+    PAYMENT_CIRCUIT_FAILURES = int(os.getenv('PAYMENT_CIRCUIT_FAILURES', 5))  # Consecutive failures before calls fail fast
+    PAYMENT_CIRCUIT_RESET_SECONDS = float(os.getenv('PAYMENT_CIRCUIT_RESET_SECONDS', 30))
+    STRIPE_WEBHOOK_SECRET = os.getenv('STRIPE_WEBHOOK_SECRET', 'your_stripe_webhook_secret')
+    WEBHOOK_WORKER_ENABLED = os.getenv('WEBHOOK_WORKER_ENABLED', 'true').lower() == 'true'  # Drain the webhook inbox in a background thread
+    WEBHOOK_BATCH_SIZE = int(os.getenv('WEBHOOK_BATCH_SIZE', 100))  # Events applied per transaction
+    WEBHOOK_POLL_SECONDS = float(os.getenv('WEBHOOK_POLL_SECONDS', 1))
 
 
 class DevelopmentConfig(Config):
     """Development configuration."""
     DEBUG = True
     CORS_ORIGINS = ['http://localhost:3000', 'http://127.0.0.1:3000']
+    SQL_QUERY_STATS_HEADERS = True
 
 class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     CORS_ORIGINS = '*'  # Allow all origins in testing
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", 'your_test_jwt_secret')  # Default JWT secret for testing
+    TOKEN_BLOCKLIST_STORE = 'memory'
+    AVAILABILITY_INDEX_REFRESH_SECONDS = 0  # Tests add users directly, so always pick them up
+    PASSWORD_HASH_WORKERS = 0
+    PROFILE_IMAGE_WORKERS = 0
+    RATE_LIMIT_ENABLED = False
+    PAYMENT_FAKE_PROVIDER = True
+    WEBHOOK_WORKER_ENABLED = False
+    GROUP_CODE_BACKGROUND_REFILL = False
     SQLALCHEMY_DATABASE_URI = os.getenv('TEST_DATABASE_URI', 'sqlite:///test.db')  # Default to SQLite for testing
 
 class ProductionConfig(Config):
@@ -1,7 +1,8 @@
 from . import db
 from datetime import datetime
 from sqlalchemy.orm import relationship  # type: ignore
-from sqlalchemy import Column, Integer, String, ForeignKey  # type: ignore
+from sqlalchemy import Column, Integer, String, ForeignKey, event  # type: ignore
+from .utils.user_search import install_user_search
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -13,6 +14,13 @@ class User(db.Model):
     profile_image = db.Column(db.String(255))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     role = db.Column(db.String(50), default='user')
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Versions the user for conditional GETs
+
+    # Supports keyset pagination over (created_at, id)
+    __table_args__ = (db.Index('ix_users_created_at_id', 'created_at', 'id'),)
+
+# Full-text index for user search, which can't be declared as a column index
+event.listen(User.__table__, 'after_create', install_user_search)
 
 class Group(db.Model):
     __tablename__ = 'groups'
@@ -22,33 +30,54 @@ class Group(db.Model):
     description = db.Column(db.Text)
     created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    ledger_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Group revision, bumped by every write to the group
+    # Summary counters for the groups list, kept up to date on every write
+    member_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    total_spent = db.Column(db.Integer, nullable=False, default=0, server_default='0')  # Minor units (cents), all expenses
+    last_activity_at = db.Column(db.DateTime, default=datetime.utcnow)  # Latest expense, payment or new member
 
     # Relationship to expenses
     expenses = db.relationship('Expense', back_populates='group')
     members = db.relationship('User', secondary='group_members')
 
+    __table_args__ = (db.Index('ix_groups_created_by_created_at_id', 'created_by', 'created_at', 'id'),)
+
+class GroupJoinCode(db.Model):
+    """A join code handed out to a worker's code pool; claiming it here keeps codes unique across workers."""
+    __tablename__ = 'group_join_codes'
+    code = db.Column(db.String(10), primary_key=True)
+    reserved_at = db.Column(db.DateTime, default=datetime.utcnow)
+
 class GroupMember(db.Model):
     __tablename__ = 'group_members'
     group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
     joined_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_group_members_group_id_joined_at', 'group_id', 'joined_at', 'user_id'),
+        db.Index('ix_group_members_user_id_group_id', 'user_id', 'group_id'),  # A user's groups
+    )
+
 class Expense(db.Model):
     __tablename__ = 'expenses'
     id = db.Column(db.Integer, primary_key=True)
     description = db.Column(db.String(255), nullable=True)
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Integer, nullable=False) # Minor units (cents)
     currency = db.Column(db.String(3), nullable=False, default='ZAR')
     group_id = db.Column(db.Integer, db.ForeignKey('groups.id')) 
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
     split_type = db.Column(db.String(50), nullable=False)
     paid_by = db.Column(db.String(50), nullable=True)
+    import_batch = db.Column(db.String(32), nullable=True, index=True)  # Set on expenses created by a bulk import
 
     # Relationship back to Group
     group = relationship('Group', back_populates='expenses')
     user = relationship('User', backref='expenses')
 
+    __table_args__ = (db.Index('ix_expenses_group_id_created_at_id', 'group_id', 'created_at', 'id'),)
+
 class Category(db.Model):
     __tablename__ = 'categories'  
     id = db.Column(db.Integer, primary_key=True)
@@ -60,9 +89,9 @@ class Category(db.Model):
 class ExpenseSplit(db.Model):
     __tablename__ = 'expense_splits'
     id = db.Column(db.Integer, primary_key=True)
-    expense_id = db.Column(db.Integer, db.ForeignKey('expenses.id'), nullable=False) 
+    expense_id = db.Column(db.Integer, db.ForeignKey('expenses.id'), nullable=False, index=True) # Splits are always loaded by expense
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False) 
-    amount = db.Column(db.Float, nullable=False)
+    amount = db.Column(db.Integer, nullable=False) # Minor units (cents)
     name = db.Column(db.String(100), nullable=False)
 
     expense = db.relationship('Expense', backref='expense_splits') 
@@ -70,19 +99,69 @@ class ExpenseSplit(db.Model):
 class Payment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), nullable=True) # Group the payment settles, if any
+    payee_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True) # Group member receiving the settlement
+    amount = db.Column(db.Integer, nullable=False) # Minor units (cents)
     currency = db.Column(db.String(3), nullable=False)
     payment_method = db.Column(db.String(50), nullable=False) # 'stripe' or 'paypal'
     payment_status = db.Column(db.String(50), nullable=False) # 'pending','success' or 'failed'
+    provider_reference = db.Column(db.String(255), nullable=True) # Stripe PaymentIntent ID or PayPal payment ID
+    idempotency_key = db.Column(db.String(255), nullable=True) # Also sent to the provider, so a retried request creates one payment
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    user = db.relationship('User', backref='payments')
+    user = db.relationship('User', foreign_keys=[user_id], backref='payments')
+
+    __table_args__ = (
+        db.Index('ix_payment_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+        db.Index('ix_payment_method_provider_reference', 'payment_method', 'provider_reference', unique=True),
+        db.Index('ix_payment_idempotency_key', 'idempotency_key', unique=True),
+    )
 
 class Balance(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    balance = db.Column(db.Float, nullable=False, default=0.0)
+    balance = db.Column(db.Integer, nullable=False, default=0) # Minor units (cents)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
-    user = db.relationship('User', backref='balance', uselist=False)
\ No newline at end of file
+    user = db.relationship('User', backref='balance', uselist=False)
+
+class GroupBalance(db.Model):
+    """Net balance of a user within a group, kept up to date on every write.
+
+    A positive balance means the group owes the user, a negative balance
+    means the user owes the group.
+    """
+    __tablename__ = 'group_balances'
+    group_id = db.Column(db.Integer, db.ForeignKey('groups.id'), primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    balance = db.Column(db.Integer, nullable=False, default=0) # Minor units (cents)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    user = db.relationship('User')
+
+class RevokedToken(db.Model):
+    """A logged out JWT, kept until the token would have expired anyway."""
+    __tablename__ = 'revoked_tokens'
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Workers fetch entries revoked since their last refresh
+
+class WebhookEvent(db.Model):
+    """A provider webhook delivery, stored as received and applied later by the inbox worker."""
+    __tablename__ = 'webhook_events'
+    id = db.Column(db.Integer, primary_key=True)  # Processing order
+    provider = db.Column(db.String(20), nullable=False) # 'stripe' or 'paypal'
+    event_id = db.Column(db.String(255), nullable=False) # The provider's event ID, so retried deliveries are stored once
+    event_type = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.Text, nullable=False) # The event object as JSON
+    status = db.Column(db.String(20), nullable=False, default='pending') # 'pending', 'processed' or 'failed'
+    error = db.Column(db.Text, nullable=True)
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.UniqueConstraint('provider', 'event_id', name='uq_webhook_event_provider_event_id'),
+        db.Index('ix_webhook_event_status_id', 'status', 'id'),
+    )
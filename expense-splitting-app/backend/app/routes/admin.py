@@ -2,8 +2,8 @@ from functools import wraps
 from flask import Blueprint, request, jsonify, current_app  # type: ignore
 from ..services.admin_service import AdminService  # Import the UserService
 import jwt  # type: ignore
-from flask_jwt_extended import jwt_required  # type: ignore
 from ..utils.auth_utils import admin_required, get_current_user_id, login_required
+from ..utils.cache import get_cache
 from ..models import User
 from .. import db
 
@@ -11,7 +11,6 @@ bp = Blueprint('admin', __name__)
 
 @bp.route('/api/admin/assign-first', methods=['POST'])
 @login_required
-@jwt_required()
 def assign_first_admin(user_id):
     """Assign the first admin if no admin exists."""
 
@@ -63,6 +62,15 @@ def revoke_user(user_id):
     except Exception as e:
         return jsonify({'error': 'An unexpected error occurred.'}), 500
     
+@bp.route('/api/admin/cache-stats', methods=['GET'])
+@admin_required
+def cache_stats():
+    """Hit and miss counts of this worker's read-through cache."""
+    cache = get_cache()
+    if cache is None:
+        return jsonify({'enabled': False}), 200
+    return jsonify({'enabled': True, **cache.stats()}), 200
+
 @bp.route('/api/delete-user/<int:user_id>', methods=['DELETE'])
 @admin_required
 def delete_user(user_id):
@@ -2,7 +2,7 @@ from functools import wraps
 from flask import Blueprint, request, jsonify, current_app # type: ignore
 from ..services.user_service import UserService  # Import the UserService
 import jwt # type: ignore
-from ..models import User
+from ..utils.password_hasher import PasswordHashingBusy
 
 bp = Blueprint('auth', __name__)
 
@@ -31,6 +31,8 @@ def register():
         return jsonify({'message': 'User registered successfully'}), 201
     except ValueError as ve:
         return jsonify({'error': str(ve)}), 409
+    except PasswordHashingBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     except Exception as e:
         return jsonify({'error': 'Registration failed', 'details': str(e)}), 500
 
@@ -42,7 +44,10 @@ def login():
     if not data or 'username' not in data or 'password' not in data:
         return jsonify({'error': 'Username and password are required'}), 400
 
-    user = UserService.authenticate_user(data['username'], data['password'])
+    try:
+        user = UserService.authenticate_user(data['username'], data['password'])
+    except PasswordHashingBusy as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': '1'}
     if user:
         # Check for remember_me flag
         remember_me = data.get('remember_me', False)
@@ -55,19 +60,18 @@ def login():
 
 @bp.route('/api/check-email', methods=['POST'])
 def check_email():
-    email = request.json.get('email')
+    email = (request.get_json(silent=True) or {}).get('email')
     if not email:
         return jsonify({'message': 'Email is required'}), 400
 
-    if UserService.validate_email(email):
-        return jsonify({'isRegistered': True}), 200
-
-    return jsonify({'isRegistered': False}), 200
+    return jsonify({'isRegistered': UserService.is_email_registered(email)}), 200
 
 @bp.route('/api/check-username', methods=['POST'])
 def check_username():
-    data = request.get_json()
-    username = data.get('username')
-    if User.query.filter_by(username=username).first():
+    username = (request.get_json(silent=True) or {}).get('username')
+    if not username:
+        return jsonify({'message': 'Username is required'}), 400
+
+    if UserService.is_username_taken(username):
         return jsonify({"isTaken": True, "message": "Username is already taken"}), 409
     return jsonify({"isTaken": False, "message": "Username is available"}), 200
\ No newline at end of file
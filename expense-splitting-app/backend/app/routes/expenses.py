@@ -1,16 +1,21 @@
+import csv
+import io
+import json
 import logging
 from typing import Dict
-from flask import Blueprint, request, jsonify # type: ignore
+from flask import Blueprint, request, jsonify, current_app # type: ignore
 from ..services.expense_service import ExpenseService  # Import the ExpenseService
+from ..services.revision_service import RevisionService
 from ..utils.auth_utils import get_current_user_id, login_required
-from flask_jwt_extended import jwt_required # type: ignore
-from ..models import Group, User
+from ..utils.conditional import conditional_get
+from ..utils.pagination import InvalidCursorError, get_page_args
 
 bp = Blueprint('expenses', __name__)
 
+NDJSON_MIMETYPES = {'application/x-ndjson', 'application/ndjson', 'application/jsonl'}
+
 @bp.route('/api/expenses', methods=['POST'])
 @login_required
-@jwt_required()
 def add_expense(user_id):
     user_id = get_current_user_id()  # Get the current logged-in user's ID
 
@@ -21,31 +26,9 @@ def add_expense(user_id):
     # User ID validation
     if not user_id or not isinstance(user_id, int):
         return jsonify({'error': 'User not found'}), 400
-    
-    user = User.query.get(user_id)
-    if not user:
-        return jsonify({'error': 'User not found'}), 400
-        
-    paid_by = user.full_name 
-
-    # Ensure that the creator is always included in the participants list
-    creator_participant = {
-        "user_id": user_id,
-        "name": paid_by 
-    }
 
-    # Check if the creator is already included in participants
-    participants = split_data.get('participants', [])
-    if not any(p['user_id'] == user_id for p in participants):
-        participants.append(creator_participant)
-
-    split_data['paid_by'] = paid_by
-        
     # Validate required field
-    required_fields = [
-        'amount', 'description', 'group_id', 
-        'split_type', 'paid_by', 'participants'
-    ]
+    required_fields = ['amount', 'description', 'group_id', 'split_type']
         
     for field in required_fields:
         if field not in split_data:
@@ -53,24 +36,16 @@ def add_expense(user_id):
         
     # Validate currency
     if 'currency' not in split_data or not isinstance(split_data['currency'], str):
-        raise ValueError("Invalid or missing currency")
+        return jsonify({'error': 'Invalid or missing currency'}), 400
     if len(split_data['currency']) != 3 or not split_data['currency'].isalpha():
-        raise ValueError("Currency must be a valid 3-letter ISO code")
-
-        
-    # Validate participants
-    if not isinstance(split_data['participants'], list) or len(split_data['participants']) == 0:
-        return jsonify({'error': 'Invalid or empty participants list'}), 400
-    
+        return jsonify({'error': 'Currency must be a valid 3-letter ISO code'}), 400
 
     # Extract fields from the request body
     amount = split_data['amount']
     description = split_data['description']
     group_id = split_data['group_id']  # Expect group_id in the request
     split_type = split_data['split_type']
-    paid_by = split_data['paid_by']
     currency = split_data['currency'] #Added curency
-    participants = split_data.get('participants', [])
 
     try:
         # Add expense using the service
@@ -80,9 +55,8 @@ def add_expense(user_id):
             description, 
             group_id, 
             split_type=split_type,
-            paid_by=paid_by,
-            participants=participants,
-            currency = currency
+            currency = currency,
+            participants=split_data.get('participants'),
         )
         return jsonify({'message': 'Expense added successfully', 'expense_id': expense.id}), 201
     except ValueError as ve:
@@ -94,61 +68,117 @@ def add_expense(user_id):
         return jsonify({'error': 'Failed to add expense', 'details': str(e)}), 400
 
 
+def _parse_csv_row(row):
+    """Convert a CSV record into the same shape as a JSON expense row."""
+    row = {key: value for key, value in row.items() if key and value not in (None, '')}
+    if 'participants' in row:
+        try:
+            row['participants'] = [int(user_id) for user_id in row['participants'].split(';') if user_id.strip()]
+        except ValueError:
+            row['participants'] = row['participants'].split(';')
+    return row
+
+def _read_bulk_rows(max_rows):
+    """Read expense rows from a JSON array, an NDJSON stream or a CSV stream."""
+    mimetype = (request.mimetype or '').lower()
+
+    if mimetype in NDJSON_MIMETYPES or mimetype == 'text/csv':
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8')
+        if mimetype == 'text/csv':
+            records = (_parse_csv_row(row) for row in csv.DictReader(stream))
+        else:
+            records = (line for line in stream if line.strip())
+
+        rows = []
+        for record in records:
+            if len(rows) >= max_rows:
+                raise OverflowError(f'A single import is limited to {max_rows} rows')
+            if isinstance(record, str):
+                try:
+                    record = json.loads(record)
+                except ValueError:
+                    record = 'Invalid JSON'
+            rows.append(record)
+        return rows
+
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('expenses')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array, NDJSON or CSV body of expenses')
+    if len(data) > max_rows:
+        raise OverflowError(f'A single import is limited to {max_rows} rows')
+    return data
+
+@bp.route('/api/expenses/bulk', methods=['POST'])
+@login_required
+def bulk_add_expenses(user_id):
+    user_id = get_current_user_id()  # Get the current logged-in user's ID
+
+    group_id = request.args.get('group_id', type=int)
+    if not group_id:
+        return jsonify({'error': 'Group ID is required'}), 400
+
+    try:
+        rows = _read_bulk_rows(current_app.config.get('BULK_IMPORT_MAX_ROWS', 10000))
+    except OverflowError as oe:
+        return jsonify({'error': str(oe)}), 413
+    except (ValueError, UnicodeDecodeError) as ve:
+        return jsonify({'error': str(ve)}), 400
+
+    if not rows:
+        return jsonify({'error': 'No expenses provided'}), 400
+
+    try:
+        result = ExpenseService.bulk_add_expenses(user_id, group_id, rows)
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 404
+    except PermissionError as pe:
+        return jsonify({'error': str(pe)}), 403
+    except Exception as e:
+        logging.error(f"Failed to import expenses: {str(e)}")  # Log the error
+        return jsonify({'error': 'Failed to import expenses', 'details': str(e)}), 400
+
+    if not result['created']:
+        return jsonify({'error': 'No expenses were imported', 'errors': result['errors']}), 400
+
+    return jsonify({
+        'message': 'Expenses imported successfully',
+        'created': len(result['created']),
+        'expense_ids': result['created'],
+        'errors': result['errors']
+    }), 201
+
+
 @bp.route('/api/expenses', methods=['GET'])
 @login_required
-@jwt_required()
+@conditional_get(lambda user_id: RevisionService.group_version(user_id, request.args.get('group_id', type=int)))
 def get_expenses(user_id):
     user_id = get_current_user_id()  # Get the current logged-in user's ID
 
     # Extract query parameters
     group_id = request.args.get('group_id', type=int)
-    page = request.args.get('page', default=1, type=int)
-    per_page = request.args.get('per_page', default=10, type=int)  # Default 10 items per page
-    group_id = request.args.get('group_id', type=int)
+    cursor, per_page, include_total = get_page_args('per_page', 10)  # Default 10 items per page
 
     if not group_id:
         return jsonify({'error': 'Group ID is required'}), 400
-    
-    # Check if the group exists
-    group = Group.query.get(group_id)
-    if not group:
-        return jsonify({'error': 'Group not found'}), 404
 
     try:
-        # Use the ExpenseService to get expenses with pagination
-        paginated_expenses = ExpenseService.get_expenses(
-            user_id=user_id, group_id=group_id, page=page, per_page=per_page
+        # Use the ExpenseService to get a page of expenses
+        expense_page = ExpenseService.get_expenses(
+            user_id=user_id, group_id=group_id, cursor=cursor,
+            per_page=per_page, include_total=include_total
         )
 
         # Serialize expenses for the response
-        expense_list = [
-            {
-                'id': expense.id,
-                'description': expense.description,
-                'amount': ExpenseService.format_amount_with_currency(expense.amount, expense.currency),
-                'currency': expense.currency,
-                'group_id': expense.group_id,
-                'split_type': expense.split_type,
-                'paid_by': expense.paid_by,
-                'participants': [
-                    {
-                        'user_id': split.user_id,
-                        'amount': ExpenseService.format_amount_with_currency(split.amount, expense.currency),
-                        'name': split.name
-                    }
-                    for split in expense.expense_splits
-                ]
-            }
-            for expense in paginated_expenses.items
-        ]
-
-        # Response with pagination metadata
-        return jsonify({
-            'expenses': expense_list,
-            'total': paginated_expenses.total,
-            'pages': paginated_expenses.pages,
-            'current_page': paginated_expenses.page
-        }), 200
+        expense_list = [ExpenseService.serialize_expense(expense) for expense in expense_page.items]
+
+        # Response with the cursor for the next page
+        return jsonify(expense_page.to_dict('expenses', expense_list)), 200
+    except InvalidCursorError as ice:
+        return jsonify({'error': str(ice)}), 400
+    except ValueError as ve:
+        return jsonify({'error': str(ve)}), 404
     except PermissionError as pe:
         return jsonify({'error': str(pe)}), 403
     except Exception as e:
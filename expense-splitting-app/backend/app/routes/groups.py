@@ -1,13 +1,20 @@
 from flask import Blueprint, request, jsonify # type: ignore
 from ..services.group_service import GroupService  # Import the GroupService
-from flask_jwt_extended import jwt_required # type: ignore
+from ..services.balance_service import BalanceService
+from ..services.dashboard_service import DashboardService
+from ..services.expense_service import ExpenseService
+from ..services.revision_service import RevisionService
+from ..services.settlement_service import SettlementService
 from ..utils.auth_utils import get_current_user_id, login_required
+from ..utils.conditional import conditional_get
+from ..utils.export import get_date_range_args, get_export_format, stream_export
+from ..utils.money import format_minor_units
+from ..utils.pagination import InvalidCursorError, get_page_args
 
 bp = Blueprint('groups', __name__)
 
 @bp.route('/api/groups', methods=['POST'])
 @login_required
-@jwt_required()
 def create_group(user_id):
     user_id = get_current_user_id()  # Get the current logged-in user's ID
     data = request.get_json() if request.is_json else request.form
@@ -26,13 +33,16 @@ def create_group(user_id):
 
 @bp.route('/api/groups', methods=['GET'])
 @login_required
-@jwt_required()
+@conditional_get(RevisionService.user_groups_version)
 def get_groups(user_id):
     user_id = get_current_user_id()
+    cursor, limit, include_total = get_page_args()
 
     try:
-        groups = GroupService.get_user_groups(user_id)
-        return jsonify({'groups': groups}), 200
+        page = GroupService.get_user_groups(user_id, cursor=cursor, limit=limit, include_total=include_total)
+        return jsonify(page.to_dict('groups', page.items)), 200
+    except InvalidCursorError as ice:
+        return jsonify({'error': str(ice)}), 400
     except PermissionError as pe:
         return jsonify({'error': str(pe)}), 403
     except Exception as e:
@@ -41,7 +51,6 @@ def get_groups(user_id):
 
 @bp.route('/api/groups/join', methods=['POST'])
 @login_required
-@jwt_required()
 def join_group(user_id):
     current_user_id = get_current_user_id()
     data = request.get_json()
@@ -58,15 +67,94 @@ def join_group(user_id):
 
 @bp.route('/api/groups/members', methods=['GET'])
 @login_required
-@jwt_required()
+@conditional_get(lambda user_id: RevisionService.group_version(user_id, request.args.get('group_id', type=int)))
 def get_group_members(user_id):
     group_id = request.args.get('group_id', type=int)
+    cursor, limit, include_total = get_page_args()
 
     try:
-        members = GroupService.get_group_members(group_id)
-        return jsonify({"group_id": group_id, "members": members}), 200
+        page = GroupService.get_group_members(group_id, cursor=cursor, limit=limit, include_total=include_total)
+        return jsonify({"group_id": group_id, **page.to_dict("members", page.items)}), 200
+    except InvalidCursorError as ice:
+        return jsonify({"error": str(ice)}), 400
     except ValueError as ve:
         return jsonify({"error": str(ve)}), 404
     except Exception as e:
         print(f"Error fetching group members: {str(e)}")  # Log the error
-        return jsonify({'error': 'Failed to fetch group members', 'details': str(e)}), 400
\ No newline at end of file
+        return jsonify({'error': 'Failed to fetch group members', 'details': str(e)}), 400
+
+@bp.route('/api/groups/<int:group_id>/balances', methods=['GET'])
+@login_required
+def get_group_balances(user_id, group_id):
+    user_id = get_current_user_id()
+
+    try:
+        balances = BalanceService.get_group_balances(user_id, group_id)
+        totals = ExpenseService.get_group_totals(group_id)
+        return jsonify({"group_id": group_id, "balances": balances, "totals": totals}), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
+    except PermissionError as pe:
+        return jsonify({"error": str(pe)}), 403
+    except Exception as e:
+        print(f"Error fetching group balances: {str(e)}")  # Log the error
+        return jsonify({'error': 'Failed to fetch group balances', 'details': str(e)}), 400
+
+@bp.route('/api/groups/<int:group_id>/settlements', methods=['GET'])
+@login_required
+def get_settlement_plan(user_id, group_id):
+    user_id = get_current_user_id()
+
+    try:
+        transfers = SettlementService.get_settlement_plan(user_id, group_id)
+        return jsonify({"group_id": group_id, "transfers": transfers}), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
+    except PermissionError as pe:
+        return jsonify({"error": str(pe)}), 403
+    except Exception as e:
+        print(f"Error building settlement plan: {str(e)}")  # Log the error
+        return jsonify({'error': 'Failed to build settlement plan', 'details': str(e)}), 400
+
+@bp.route('/api/groups/<int:group_id>/dashboard', methods=['GET'])
+@login_required
+def get_group_dashboard(user_id, group_id):
+    user_id = get_current_user_id()
+
+    try:
+        return jsonify(DashboardService.get_group_dashboard(user_id, group_id)), 200
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 404
+    except PermissionError as pe:
+        return jsonify({"error": str(pe)}), 403
+    except Exception as e:
+        print(f"Error building group dashboard: {str(e)}")  # Log the error
+        return jsonify({'error': 'Failed to build group dashboard', 'details': str(e)}), 400
+
+GROUP_EXPORT_COLUMNS = (
+    'expense_id', 'created_at', 'description', 'amount', 'currency', 'split_type', 'paid_by',
+    'payer_id', 'split_user_id', 'split_name', 'split_amount'
+)
+
+@bp.route('/api/groups/<int:group_id>/export', methods=['GET'])
+@login_required
+def export_group_expenses(user_id, group_id):
+    """Stream every expense in the group with its splits, oldest first, as CSV or NDJSON."""
+    try:
+        export_format = get_export_format()
+        start, end = get_date_range_args()
+        rows = ExpenseService.export_group_expenses(user_id, group_id, start, end)
+    except ValueError as ve:
+        status = 404 if str(ve) == 'Group not found' else 400
+        return jsonify({"error": str(ve)}), status
+    except PermissionError as pe:
+        return jsonify({"error": str(pe)}), 403
+
+    def export_rows():
+        for row in rows:
+            yield (
+                row[0], row[1].isoformat() if row[1] else None, row[2], format_minor_units(row[3]), *row[4:10],
+                format_minor_units(row[10]) if row[10] is not None else None
+            )
+
+    return stream_export(GROUP_EXPORT_COLUMNS, export_rows(), export_format, f'group-{group_id}-expenses')
@@ -1,22 +1,23 @@
+from datetime import datetime
 from flask import Blueprint, jsonify, session # type: ignore
-from flask_jwt_extended import jwt_required, get_jwt # type: ignore
+from ..utils import token_blocklist
+from ..utils.auth_utils import forget_token, get_bearer_token, get_current_identity, login_required
 
 bp = Blueprint('logout', __name__)
 
-# In-memory blacklist for demonstration (you may want to use a database)
-blacklist = set()
-
 # Define the token in blocklist loader function
 def blacklist_loader(jwt_header, jwt_payload):
-    jti = jwt_payload['jti']  # Get the unique identifier for the token
-    return jti in blacklist  # Return True if the token is blacklisted
+    jti = jwt_payload.get('jti')  # Get the unique identifier for the token
+    return bool(jti) and token_blocklist.is_revoked(jti)  # Return True if the token is blacklisted
 
 @bp.route('/api/logout', methods=['POST'])
-@jwt_required()  # Ensure the user is logged in with a valid JWT
-def logout():
+@login_required  # Ensure the user is logged in with a valid JWT
+def logout(user_id):
     try:
-        jti = get_jwt()['jti']  # Get the unique identifier for the token
-        blacklist.add(jti)  # Add the token's jti to the blacklist
+        identity = get_current_identity()
+        expires_at = datetime.utcfromtimestamp(identity.expires_at) if identity.expires_at else None
+        token_blocklist.revoke(identity.jti, expires_at)  # Blocklisted until the token would have expired
+        forget_token(get_bearer_token())
         return jsonify({'message': 'Logged out successfully'}), 200
     except Exception as e:
         print(f"Logout error: {e}")  # Log the error
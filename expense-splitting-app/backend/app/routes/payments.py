@@ -1,38 +1,104 @@
-from flask import Blueprint, request, jsonify
-from ..models import Payment, Balance, db
+import json
+import math
+import uuid
+from flask import Blueprint, request, jsonify, current_app
+from ..models import Payment, Balance, GroupMember, db
 from ..utils.auth_utils import login_required
+from ..services.balance_service import BalanceService
+from ..services.payment_gateway import PaymentProviderError, PaymentProviderUnavailable, get_payment_gateway
+from ..services.webhook_service import HANDLERS as WEBHOOK_HANDLERS, WebhookService, notify_webhook_worker
+from ..utils.export import EXPORT_BATCH_SIZE, get_date_range_args, get_export_format, stream_export
+from ..utils.money import format_minor_units, from_minor_units, to_minor_units
+from ..utils.pagination import get_page_args, paginate_by_cursor
+from sqlalchemy.exc import IntegrityError
 import stripe
-import paypalrestsdk
 
 bp = Blueprint('payments', __name__)
 
+def _validate_settlement(user_id, group_id, payee_id):
+  """Ensure a group settlement is between two different members of that group."""
+  if not group_id:
+    return
+  # Without a payee the payer's credit would have no matching debit and the ledger wouldn't sum to zero
+  if not payee_id:
+    raise ValueError('payee_id is required when settling up in a group.')
+  if payee_id == user_id:
+    raise ValueError('You cannot settle up with yourself.')
+  member_ids = {user_id, payee_id}
+  members = GroupMember.query.filter(
+    GroupMember.group_id == group_id,
+    GroupMember.user_id.in_(member_ids)
+  ).count()
+  if members != len(member_ids):
+    raise PermissionError('Payer and payee must be members of the group.')
+
+def _idempotency_key(user_id):
+  """Scope the client's Idempotency-Key header to the user, or make a fresh key for this request."""
+  key = request.headers.get('Idempotency-Key')
+  if not key:
+    return uuid.uuid4().hex
+  if len(key) > 200:
+    raise ValueError('Idempotency-Key must be at most 200 characters.')
+  return f'{user_id}:{key}'
+
+def _save_pending_payment(**fields):
+  """Store a pending payment once per idempotency key; a retried request gets the existing row."""
+  payment = Payment.query.filter_by(idempotency_key=fields['idempotency_key']).first()
+  if payment:
+    return payment
+
+  payment = Payment(payment_status='pending', **fields)
+  db.session.add(payment)
+  try:
+    db.session.commit()
+  except IntegrityError:
+    # A concurrent retry with the same key got there first
+    db.session.rollback()
+    payment = Payment.query.filter_by(idempotency_key=fields['idempotency_key']).one()
+  return payment
+
+def _provider_unavailable(error):
+  """Tell the client to come back later instead of holding the request open."""
+  return jsonify({'error': str(error)}), 503, {'Retry-After': str(max(1, math.ceil(error.retry_after)))}
+
 @bp.route('/api/payments/stripe', methods=['POST'])
 @login_required
 def create_stripe_payment(user_id):
   data = request.get_json()
   amount = data.get('amount')
   currency = data.get('currency', 'usd')
+  group_id = data.get('group_id')
+  payee_id = data.get('payee_id')
 
   try:
-    # create a Stripe PaymentIntent
-    intent = stripe.PaymentIntent.create(
-      amount=int(amount * 100), # Stripe expects amounts in cents
-      currency=currency,
-      metadata={'user_id': user_id}
+    _validate_settlement(user_id, group_id, payee_id)
+    amount = to_minor_units(amount) # Stripe expects amounts in cents, as does the ledger
+    idempotency_key = _idempotency_key(user_id)
+
+    # create a Stripe PaymentIntent, bounded by the gateway's deadline.
+    # Stripe returns the original intent when the same key is replayed.
+    intent = get_payment_gateway('stripe').call(
+      'create_payment_intent', amount, currency, {'user_id': user_id},
+      idempotency_key=idempotency_key
     )
 
-    #save payment record
-    payment = Payment(
+    #save payment record, keyed by the intent so the webhook finds it with one index lookup
+    _save_pending_payment(
       user_id=user_id,
       amount=amount,
       currency=currency,
       payment_method='stripe',
-      payment_status='pending'
+      provider_reference=intent['id'],
+      idempotency_key=idempotency_key,
+      group_id=group_id,
+      payee_id=payee_id
     )
-    db.session.add(payment)
-    db.session.commit()
 
-    return jsonify({'client_secret': intent.client_secret}), 200
+    return jsonify({'client_secret': intent['client_secret']}), 200
+  except PermissionError as pe:
+    return jsonify({'error': str(pe)}), 403
+  except PaymentProviderUnavailable as pu:
+    return _provider_unavailable(pu)
   except Exception as e:
     return jsonify({'error': str(e)}), 400
   
@@ -42,49 +108,49 @@ def create_paypal_payment(user_id):
   data = request.get_json()
   amount = data.get('amount')
   currency = data.get('currency', 'USD')
+  group_id = data.get('group_id')
+  payee_id = data.get('payee_id')
 
-  payment = paypalrestsdk.Payment({
-    'intent': 'sale',
-    'payer': {
-        'payment_method': 'paypal'
-    },
-    'transactions': [{
-        'amount': {
-            'total': str(amount),
-            'currency': currency
-        },
-        'description': 'Payment for Expense Splitting App'
-    }],
-    'redirect_urls': {
-        'return_url': 'http://localhost:3000/payment/success',
-        'cancel_url': 'http://localhost:3000/payment/cancel'
-    }
-})
-
-  if payment.create():
-    #save payment record
-    payment_record = Payment(
-      user_id=user_id,
-      amount=amount,
-      currency=currency,
-      payment_method='paypal',
-      payment_status='pending'
+  try:
+    _validate_settlement(user_id, group_id, payee_id)
+    amount = to_minor_units(amount)
+    idempotency_key = _idempotency_key(user_id)
+  except PermissionError as pe:
+    return jsonify({'error': str(pe)}), 403
+  except ValueError as ve:
+    return jsonify({'error': str(ve)}), 400
+
+  try:
+    payment = get_payment_gateway('paypal').call(
+      'create_payment', amount, currency, user_id,
+      current_app.config.get('PAYPAL_RETURN_URL', 'http://localhost:3000/payment/success'),
+      current_app.config.get('PAYPAL_CANCEL_URL', 'http://localhost:3000/payment/cancel'),
+      idempotency_key=idempotency_key
     )
-    db.session.add(payment_record)
-    db.session.commit()
+  except PaymentProviderUnavailable as pu:
+    return _provider_unavailable(pu)
+  except PaymentProviderError as pe:
+    return jsonify({'error': str(pe)}), 400
 
-    for link in payment.links:
-      if link.rel == 'approval_url':
-        approval_url = link.href
-        return jsonify({'approval_url': approval_url}), 200
-  else:
-    return jsonify({'error': payment.error}), 400
+  #save payment record, keyed by PayPal's payment ID for the success callback
+  _save_pending_payment(
+    user_id=user_id,
+    amount=amount,
+    currency=currency,
+    payment_method='paypal',
+    provider_reference=payment['id'],
+    idempotency_key=idempotency_key,
+    group_id=group_id,
+    payee_id=payee_id
+  )
+
+  return jsonify({'approval_url': payment['approval_url']}), 200
   
 @bp.route('/api/payments/stripe/webhook', methods=['POST'])
 def stripe_webhook():
   payload = request.get_data(as_text=True)
   sig_header = request.headers.get('Stripe-Signature')
-  endpoint_secret = 'your_stripe_webhook_secret'
+  endpoint_secret = current_app.config['STRIPE_WEBHOOK_SECRET']
 
   try:
     event = stripe.Webhook.construct_event(
@@ -94,26 +160,12 @@ def stripe_webhook():
     return jsonify({'error': 'Invalid payload'}), 400
   except stripe.error.SignatureVerificationError as e:
     return jsonify({'error': 'Invalid signature'}), 400
-  
-  if event['type'] == 'payment_intent.succeeded':
-    intent = event['data']['object']
-    user_id = intent['metadata']['user_id']
-    amount = intent['amount'] / 100 # convert back to dollars
-
-    #update payment record
-    payment = Payment.query.filter_by(user_id=user_id, amount=amount, payment_method='stripe').first()
-    if payment:
-      payment.payment_status = 'success'
-      db.session.commit()
-
-    #update user balance
-    balance = Balance.query.filter_by(user_id=user_id).first()
-    if balance:
-      balance.balance -= amount
-    else:
-      balance = Balance(user_id=user_id, balance=-amount)
-      db.session.add(balance)
-    db.session.commit()
+
+  # Store the event and acknowledge straight away; the inbox worker applies it.
+  # Redelivered events hit the unique event ID and are acknowledged without being stored again.
+  if ('stripe', event['type']) in WEBHOOK_HANDLERS:
+    WebhookService.record_event('stripe', event['id'], event['type'], json.loads(payload)['data']['object'])
+    notify_webhook_worker()
 
   return jsonify({'status': 'success'}), 200
 
@@ -122,47 +174,106 @@ def paypal_success():
   payment_id = request.args.get('paymentId')
   payer_id = request.args.get('PayerID')
 
-  payment = paypalrestsdk.Payment.find(payment_id)
-
-  if payment.execute({'payer_id': payer_id}):
-    user_id = payment.transactions[0].item_list.items[0].sku
-    amount = float(payment.transaction[0].amount.total)
-
-    #update payment record
-    payment_record = Payment.query.filter_by(user_id=user_id, amount=amount, payment_method='paypal').first()
-    if payment_record:
-      payment_record.payment_status = 'completed'
-      db.session.commit()
-    
-    #update user balance
-    balance = Balance.query.filter_by(user_id=user_id).first()
-    if balance:
-      balance.balance -= amount
-    else:
-      balance = Balance(user_id=user_id, balance=-amount)
-    db.session.commit()
+  try:
+    payment = get_payment_gateway('paypal').call('execute_payment', payment_id, payer_id)
+  except PaymentProviderUnavailable as pu:
+    return _provider_unavailable(pu)
+  except PaymentProviderError as pe:
+    return jsonify({'error': str(pe)}), 400
+
+  user_id = payment['user_id']
+  amount = payment['amount']
 
+  #update payment record, one lookup on the provider reference index
+  payment_record = Payment.query.filter_by(payment_method='paypal', provider_reference=payment['id']).first()
+  if not payment_record or payment_record.payment_status != 'pending':
+    # A reloaded or replayed callback; the payment was applied when it first completed
     return jsonify({'status':'success'}), 200
+  payment_record.payment_status = 'completed'
+  BalanceService.apply_payment(payment_record)
+
+  #update user balance
+  balance = Balance.query.filter_by(user_id=user_id).first()
+  if balance:
+    balance.balance -= amount
   else:
-    return jsonify({'error': payment.error}),400
+    balance = Balance(user_id=user_id, balance=-amount)
+    db.session.add(balance)
+
+  # Payment status, group ledger and user balance are committed together
+  db.session.commit()
+
+  return jsonify({'status':'success'}), 200
+
+def _payment_history_query(user_id):
+  """The user's payments, narrowed by the optional from/to and status query parameters."""
+  start, end = get_date_range_args()
+  query = Payment.query.filter(Payment.user_id == user_id)
+  if start:
+    query = query.filter(Payment.created_at >= start)
+  if end:
+    query = query.filter(Payment.created_at < end)
+
+  statuses = [status for status in request.args.get('status', '').split(',') if status]
+  if statuses:
+    query = query.filter(Payment.payment_status.in_(statuses))
+
+  filters = (start, end, tuple(sorted(statuses)))
+  return query, filters
 
 @bp.route('/api/payment/history', methods=['GET'])
 @login_required
 def get_payment_history(user_id):
   """Retrieve payment history for the logged-in user"""
+  cursor, limit, include_total = get_page_args()
+
   try:
-    payments = Payment.query.filter_by(user_id=user_id).all()
+    query, filters = _payment_history_query(user_id)
+    page = paginate_by_cursor(
+      query, Payment.created_at, Payment.id,
+      cursor=cursor, limit=limit,
+      include_total=include_total, total_cache_key=('payments', user_id, filters)
+    )
     payment_history = [
       {
         'id': payment.id,
-        'amount': payment.amount,
+        'amount': from_minor_units(payment.amount),
         'currency': payment.currency,
         'payment_method': payment.payment_method,
         'payment_status': payment.payment_status,
         'created_at': payment.created_at
       }
-      for payment in payments
+      for payment in page.items
     ]
-    return jsonify({'payment_history': payment_history}), 200
+    return jsonify(page.to_dict('payment_history', payment_history)), 200
+  except ValueError as ve:  # Includes InvalidCursorError
+    return jsonify({'error': str(ve)}), 400
   except Exception as e:
-    return jsonify({'error': 'Failed to retrive payment history', 'details': str(e)}), 500
\ No newline at end of file
+    return jsonify({'error': 'Failed to retrive payment history', 'details': str(e)}), 500
+
+PAYMENT_EXPORT_COLUMNS = (
+  'id', 'created_at', 'amount', 'currency', 'payment_method', 'payment_status',
+  'group_id', 'payee_id', 'provider_reference'
+)
+
+@bp.route('/api/payment/history/export', methods=['GET'])
+@login_required
+def export_payment_history(user_id):
+  """Stream the logged-in user's whole payment history, oldest first, as CSV or NDJSON"""
+  try:
+    export_format = get_export_format()
+    query, _ = _payment_history_query(user_id)
+  except ValueError as ve:
+    return jsonify({'error': str(ve)}), 400
+
+  # Plain tuples read through a server-side cursor, EXPORT_BATCH_SIZE rows at a time
+  rows = query.with_entities(
+    Payment.id, Payment.created_at, Payment.amount, Payment.currency, Payment.payment_method,
+    Payment.payment_status, Payment.group_id, Payment.payee_id, Payment.provider_reference
+  ).order_by(Payment.created_at, Payment.id).yield_per(EXPORT_BATCH_SIZE)
+
+  def export_rows():
+    for row in rows:
+      yield (row.id, row.created_at.isoformat() if row.created_at else None, format_minor_units(row.amount), *row[3:])
+
+  return stream_export(PAYMENT_EXPORT_COLUMNS, export_rows(), export_format, 'payment-history')
@@ -3,8 +3,10 @@ from flask import Blueprint, request, jsonify, current_app, send_from_directory
 from ..models import User
 from .. import db
 from ..utils.auth_utils import get_current_user_id, login_required
-from flask_jwt_extended import jwt_required # type: ignore
 from ..services.profile_service import ProfileService  # Import the ProfileService
+from ..services.revision_service import RevisionService
+from ..utils.conditional import conditional_get
+from ..utils.image_store import get_image_store
 
 bp = Blueprint('profile', __name__)
 
@@ -12,9 +14,27 @@ bp = Blueprint('profile', __name__)
 def uploaded_file(filename):
     return send_from_directory(current_app.config['UPLOAD_FOLDER'], filename)
 
+@bp.route('/uploads/images/<name>')
+def uploaded_image(name):
+    """Content-addressed profile images and thumbnails. Their bytes never change, so browsers may keep them."""
+    store = get_image_store()
+    path = store.path(name)
+    if path:
+        response = send_from_directory(store.folder, name)
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        return response
+
+    # A thumbnail that isn't ready yet: send the original meanwhile, but don't let it be kept
+    original = store.original_name(name)
+    if original and store.path(original):
+        response = send_from_directory(store.folder, original)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
+    return jsonify({'error': 'Image not found'}), 404
+
 @bp.route('/api/profile', methods=['GET'])  
 @login_required
-@jwt_required()
+@conditional_get(RevisionService.user_version)
 def get_profile(user_id):
     current_user_id = get_current_user_id()  
 
@@ -4,6 +4,9 @@ from ..services.user_service import UserService  # Import the UserService
 import jwt  # type: ignore
 from flask_jwt_extended import jwt_required  # type: ignore
 from ..utils.auth_utils import login_required
+from ..utils.conditional import conditional_get
+from ..services.revision_service import RevisionService
+from ..utils.pagination import MAX_PAGE_SIZE, get_page_args
 from ..models import User
 from .. import db
 
@@ -12,6 +15,7 @@ bp = Blueprint('user', __name__)
 # Get a specific user
 @bp.route('/api/user', methods=['GET'])
 @login_required 
+@conditional_get(RevisionService.user_version)
 def get_user(user_id):
     user_info = UserService.get_user_by_id(user_id)
     if not user_info:
@@ -19,9 +23,28 @@ def get_user(user_id):
 
     return jsonify({"user": user_info}), 200
 
-# Get all users
+# Get all users, search them, or look up a batch by ID
 @bp.route('/api/users', methods=['GET'])
 @login_required  
 def get_users(user_id):
-    users = UserService.get_all_users()
-    return jsonify({'users': users}), 200
+    if 'ids' in request.args:
+        try:
+            ids = [int(part) for part in request.args['ids'].split(',') if part.strip()]
+        except ValueError:
+            return jsonify({'error': 'ids must be a comma-separated list of user IDs'}), 400
+        if len(ids) > MAX_PAGE_SIZE:
+            return jsonify({'error': f'At most {MAX_PAGE_SIZE} ids can be looked up at once'}), 400
+        return jsonify({'users': UserService.get_users_by_ids(ids)}), 200
+
+    cursor, limit, include_total = get_page_args()
+    term = request.args.get('q')
+
+    try:
+        if term is not None:
+            page = UserService.search_users(term, cursor=cursor, limit=limit, include_total=include_total)
+        else:
+            page = UserService.get_all_users(cursor=cursor, limit=limit, include_total=include_total)
+    except ValueError as ve:  # Includes InvalidCursorError
+        return jsonify({'error': str(ve)}), 400
+
+    return jsonify(page.to_dict('users', page.items)), 200
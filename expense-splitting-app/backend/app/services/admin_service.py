@@ -1,9 +1,10 @@
 from werkzeug.security import generate_password_hash, check_password_hash # type: ignore
 import jwt # type: ignore
 from datetime import datetime, timedelta
-from ..models import User
+from ..models import Group, GroupMember, User
 from .. import db
 from flask import current_app # type: ignore
+from ..utils.cache import invalidate
 
 class AdminService:
 
@@ -19,6 +20,7 @@ class AdminService:
         try:
             user.role = 'admin'
             db.session.commit()
+            invalidate('user', user_id)
             return {'message': f'User {user.username} promoted to admin'}
         except Exception as e:
             db.session.rollback()
@@ -52,6 +54,7 @@ class AdminService:
         try:
             user.role = 'user'  # or whatever the default role is
             db.session.commit()
+            invalidate('user', user_id)
             return {'message': f'User  {user.username} has been revoked from admin'}
         except Exception as e:
             db.session.rollback()
@@ -63,8 +66,28 @@ class AdminService:
         if not user:
             raise ValueError("User not found.")
 
-        # Delete the user from the database
-        db.session.delete(user)
-        db.session.commit()  # Commit the changes to the database
+        group_ids = [group_id for group_id, in db.session.query(GroupMember.group_id).filter_by(user_id=user_id)]
+
+        try:
+            # Leave their groups in the same transaction, keeping the member counters and
+            # group revisions in step the way add_user_to_group does when someone joins
+            GroupMember.query.filter_by(user_id=user_id).delete(synchronize_session=False)
+            if group_ids:
+                Group.query.filter(Group.id.in_(group_ids)).update(
+                    {
+                        Group.member_count: Group.member_count - 1,
+                        Group.ledger_version: Group.ledger_version + 1,  # Cached dashboards list the members
+                    },
+                    synchronize_session=False
+                )
+
+            # Delete the user from the database
+            db.session.delete(user)
+            db.session.commit()  # Commit the changes to the database
+        except Exception as e:
+            db.session.rollback()
+            raise Exception(f"Failed to delete user: {str(e)}")
+        invalidate('user', user_id)
+        invalidate('group_members', *group_ids)
 
         return {'message': f'User {user_id} deleted successfully.'}
\ No newline at end of file
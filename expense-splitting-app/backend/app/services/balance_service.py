@@ -0,0 +1,190 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Any, Dict, Iterable, List
+from ..models import Expense, ExpenseSplit, Group, GroupBalance, GroupMember, Payment, User
+from .. import db
+from ..utils.money import from_minor_units
+from sqlalchemy import func # type: ignore
+
+
+class BalanceService:
+
+    @staticmethod
+    def expense_deltas(payer_id: int, amount: int, splits: Iterable[Dict[str, Any]]) -> Dict[int, int]:
+        """Work out how an expense moves each member's net balance, in minor units."""
+        deltas = defaultdict(int)
+
+        # The payer is owed the full amount, every participant owes their share
+        deltas[payer_id] += amount
+        for split in splits:
+            deltas[split['user_id']] -= split['amount']
+
+        return dict(deltas)
+
+    @staticmethod
+    def apply_deltas(group_id: int, deltas: Dict[int, int], spent: int = 0) -> None:
+        """
+        Add the given deltas to the group's ledger, and spent to its total spend.
+
+        Runs inside the caller's transaction, the caller is responsible for
+        committing or rolling back.
+        """
+        deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+        if deltas:
+            BalanceService._apply_balance_deltas(group_id, deltas)
+
+        # Let cached settlement plans and dashboards know the group has moved on, and keep its summary current
+        Group.query.filter_by(id=group_id).update(
+            {
+                Group.ledger_version: Group.ledger_version + 1,
+                Group.total_spent: Group.total_spent + spent,
+                Group.last_activity_at: datetime.utcnow(),
+            },
+            synchronize_session=False
+        )
+
+    @staticmethod
+    def _apply_balance_deltas(group_id: int, deltas: Dict[int, int]) -> None:
+        upsert = BalanceService._balance_upsert()
+        if upsert is not None:
+            # One executemany that inserts new rows and increments existing ones in SQL
+            now = datetime.utcnow()
+            db.session.execute(upsert, [
+                {'group_id': group_id, 'user_id': user_id, 'balance': delta, 'updated_at': now}
+                for user_id, delta in deltas.items()
+            ])
+        else:
+            rows = GroupBalance.query.filter(
+                GroupBalance.group_id == group_id,
+                GroupBalance.user_id.in_(deltas.keys())
+            ).all()
+            existing = {row.user_id: row for row in rows}
+
+            for user_id, delta in deltas.items():
+                row = existing.get(user_id)
+                if row:
+                    # Increment in SQL so concurrent writers don't overwrite each other
+                    row.balance = GroupBalance.balance + delta
+                else:
+                    db.session.add(GroupBalance(group_id=group_id, user_id=user_id, balance=delta))
+
+    @staticmethod
+    def _balance_upsert():
+        """Build an INSERT ... ON CONFLICT statement for the ledger, if the database supports one."""
+        table = GroupBalance.__table__
+        dialect = db.session.get_bind().dialect.name
+
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert # type: ignore
+            else:
+                from sqlalchemy.dialects.postgresql import insert # type: ignore
+            statement = insert(table)
+            return statement.on_conflict_do_update(
+                index_elements=[table.c.group_id, table.c.user_id],
+                set_={'balance': table.c.balance + statement.excluded.balance, 'updated_at': statement.excluded.updated_at}
+            )
+
+        if dialect == 'mysql':
+            from sqlalchemy.dialects.mysql import insert # type: ignore
+            statement = insert(table)
+            return statement.on_duplicate_key_update(
+                balance=table.c.balance + statement.inserted.balance,
+                updated_at=statement.inserted.updated_at
+            )
+
+        return None
+
+    @staticmethod
+    def apply_expense(expense, splits: Iterable[Dict[str, Any]]) -> None:
+        """Record a new expense in its group's ledger."""
+        deltas = BalanceService.expense_deltas(expense.user_id, expense.amount, splits)
+        BalanceService.apply_deltas(expense.group_id, deltas, spent=expense.amount)
+
+    @staticmethod
+    def payment_deltas(payment) -> Dict[int, int]:
+        """Work out how a settlement payment moves each member's net balance, in minor units."""
+        # Paying reduces what the payer owes and what the payee is owed. A payment with no one
+        # else on the other side moves nothing, so the ledger always sums to zero.
+        if not payment.payee_id or payment.payee_id == payment.user_id:
+            return {}
+        return {payment.user_id: payment.amount, payment.payee_id: -payment.amount}
+
+    @staticmethod
+    def apply_payment(payment) -> None:
+        """Record a successful settlement payment in its group's ledger."""
+        if not payment.group_id:
+            return
+
+        BalanceService.apply_deltas(payment.group_id, BalanceService.payment_deltas(payment))
+
+    @staticmethod
+    def get_group_balances(user_id: int, group_id: int) -> List[Dict[str, Any]]:
+        """Return every member's net balance in the group."""
+        group = Group.query.get(group_id)
+        if not group:
+            raise ValueError("Group not found")
+
+        is_member = GroupMember.query.filter_by(user_id=user_id, group_id=group_id).first()
+        if not is_member:
+            raise PermissionError('User is not part of the selected group.')
+
+        # Members without a ledger row yet have a zero balance
+        rows = (
+            db.session.query(User.id, User.username, User.full_name, GroupBalance.balance)
+            .join(GroupMember, GroupMember.user_id == User.id)
+            .outerjoin(
+                GroupBalance,
+                (GroupBalance.group_id == GroupMember.group_id) & (GroupBalance.user_id == User.id)
+            )
+            .filter(GroupMember.group_id == group_id)
+            .all()
+        )
+
+        return [
+            {
+                'user_id': row.id,
+                'username': row.username,
+                'full_name': row.full_name,
+                'balance': from_minor_units(row.balance)
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def compute_group_balances(group_id: int) -> Dict[int, int]:
+        """
+        Recompute every member's net balance from the group's history.
+
+        Aggregates with SUM()/GROUP BY in the database. Amounts are integer
+        minor units, so the result matches the ledger exactly and can be used
+        to check or rebuild it.
+        """
+        balances = defaultdict(int)
+
+        paid = (
+            db.session.query(Expense.user_id, func.sum(Expense.amount))
+            .filter(Expense.group_id == group_id)
+            .group_by(Expense.user_id)
+        )
+        owed = (
+            db.session.query(ExpenseSplit.user_id, func.sum(ExpenseSplit.amount))
+            .join(Expense, Expense.id == ExpenseSplit.expense_id)
+            .filter(Expense.group_id == group_id)
+            .group_by(ExpenseSplit.user_id)
+        )
+        settled = db.session.query(Payment.user_id, Payment.payee_id, func.sum(Payment.amount)).filter(
+            Payment.group_id == group_id,
+            Payment.payment_status.in_(['success', 'completed'])
+        ).group_by(Payment.user_id, Payment.payee_id)
+
+        for user_id, total in paid:
+            balances[user_id] += total
+        for user_id, total in owed:
+            balances[user_id] -= total
+        for payer_id, payee_id, total in settled:
+            balances[payer_id] += total
+            if payee_id:
+                balances[payee_id] -= total
+
+        return {user_id: balance for user_id, balance in balances.items() if user_id is not None}
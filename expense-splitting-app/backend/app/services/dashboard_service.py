@@ -0,0 +1,97 @@
+from typing import Any, Dict
+from sqlalchemy.orm import selectinload # type: ignore
+from ..models import Expense, Group, GroupBalance, GroupMember, User
+from .. import db
+from ..utils.lru_cache import LRUCache
+from ..utils.money import from_minor_units
+from ..utils.pagination import paginate_by_cursor
+from .expense_service import ExpenseService
+from .revision_service import RevisionService
+from .settlement_service import SettlementService
+
+RECENT_EXPENSES = 10
+
+# Dashboards keyed by group ID, each stored with the group revision it was built from
+_dashboard_cache = LRUCache(maxsize=1024)
+
+
+class DashboardService:
+
+    @staticmethod
+    def get_group_dashboard(user_id: int, group_id: int) -> Dict[str, Any]:
+        """
+        Members, balances, recent expenses, totals and the settle-up plan of a group.
+
+        Access is checked on every call, in the same query that reads the
+        group's revision (Group.ledger_version). Every write to the group
+        bumps that revision, so a cached dashboard is served for as long as
+        its revision is current and rebuilt after the next write.
+        """
+        membership = RevisionService.group_membership(user_id, group_id)
+        if not membership:
+            raise ValueError('Group not found')
+        if membership.member_id is None:
+            raise PermissionError('User is not part of the selected group.')
+
+        cached = _dashboard_cache.get(group_id)
+        if cached and cached[0] == membership.ledger_version:
+            return cached[1]
+
+        dashboard = DashboardService._build(group_id, membership.ledger_version)
+        _dashboard_cache.set(group_id, (membership.ledger_version, dashboard))
+        return dashboard
+
+    @staticmethod
+    def _build(group_id: int, revision: int) -> Dict[str, Any]:
+        group = (
+            db.session.query(Group.id, Group.name, Group.description, Group.unique_code)
+            .filter(Group.id == group_id)
+            .one()
+        )
+
+        # Members and their ledger balances in one query; members without a ledger row are at zero
+        members = (
+            db.session.query(User.id, User.username, User.full_name, GroupMember.joined_at, GroupBalance.balance)
+            .join(GroupMember, GroupMember.user_id == User.id)
+            .outerjoin(
+                GroupBalance,
+                (GroupBalance.group_id == GroupMember.group_id) & (GroupBalance.user_id == User.id)
+            )
+            .filter(GroupMember.group_id == group.id)
+            .order_by(GroupMember.joined_at, User.id)
+            .all()
+        )
+
+        # The settle-up plan comes from the same balances, without another query
+        plan = SettlementService.plan_transfers(
+            {member.id: member.balance or 0 for member in members}, {member.id: member.username for member in members}
+        )
+
+        recent = paginate_by_cursor(
+            Expense.query.filter_by(group_id=group.id).options(selectinload(Expense.expense_splits)),
+            Expense.created_at, Expense.id, limit=RECENT_EXPENSES
+        )
+
+        return {
+            'group': {
+                'group_id': group.id,
+                'name': group.name,
+                'description': group.description,
+                'unique_code': group.unique_code,
+                'revision': revision,
+            },
+            'members': [
+                {
+                    'id': member.id,
+                    'username': member.username,
+                    'full_name': member.full_name,
+                    'joined_at': member.joined_at.isoformat() if member.joined_at else None,
+                    'balance': from_minor_units(member.balance),
+                }
+                for member in members
+            ],
+            'recent_expenses': [ExpenseService.serialize_expense(expense) for expense in recent.items],
+            'expenses_next_cursor': recent.next_cursor,  # Carry on with GET /api/expenses
+            'totals': ExpenseService.get_group_totals(group.id),
+            'transfers': plan,
+        }
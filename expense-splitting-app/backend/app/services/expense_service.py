@@ -1,11 +1,22 @@
+from collections import defaultdict
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
 from enum import Enum
 import logging
-from typing import Any, Dict, List, Union
+from typing import Any, Dict, List, Optional, Union
 from urllib import request
+import uuid
 from ..models import Expense, ExpenseSplit, Group, GroupMember, User
 from .. import db
+from .balance_service import BalanceService
+from .revision_service import RevisionService
+from ..utils.pagination import CursorPage, paginate_by_cursor
+from ..utils.export import EXPORT_BATCH_SIZE
+from ..utils.money import allocate, from_minor_units, to_minor_units
+from ..utils import split_calculator
+from sqlalchemy import func # type: ignore
 import logging
-from sqlalchemy.orm.exc import NoResultFound # type: ignore
+from sqlalchemy.orm import selectinload # type: ignore
 
 class SplitType(Enum):
     EQUAL = "equal"
@@ -19,19 +30,10 @@ CURRENCY_SYMBOLS = {
     "GBP": "£"
     }
 
-class ExpenseService:
-
-    @staticmethod
-    def get_participants_user_ids(group_id: int) -> List[Dict[str, Any]]:
-        """Fetch user_ids of participants in a group."""
-        group = Group.query.get(group_id)
-        if not group:
-            raise ValueError("Group not found")
-
-        # Create a list of participants with user_id and name
-        user_ids = [{'user_id': user.id, 'name': user.username} for user in group.members]
-        return user_ids
+# Keep IN (...) lists well below SQLite's bound parameter limit
+BULK_QUERY_CHUNK_SIZE = 500
 
+class ExpenseService:
 
     @staticmethod
     def add_expense(
@@ -40,27 +42,113 @@ class ExpenseService:
         description: str, 
         group_id: int, 
         split_type: str,
-        paid_by: str,
         currency: str,
-        participants: List[Dict[str, Any]],
+        paid_by: Optional[str] = None,
+        participants: Optional[List[Dict[str, Any]]] = None,
         ) -> Expense:
         """
         Create an expense with split
+
+        The group, its members and the duplicate description check are
+        resolved in one query, then the expense, its splits and the ledger
+        update are written in one transaction. The number of queries does
+        not grow with the size of the group. The expense is split between
+        the given participants, or every member of the group when there are
+        none, and paid_by defaults to the payer's name.
         """
 
         """Comprehensive input validation"""
         # User ID validation
         if not user_id or not isinstance(user_id, int):
             raise ValueError("User not found")
+
+        # Group ID validation
+        if not group_id or not isinstance(group_id, int):
+            raise ValueError("Invalid group ID")
+
+        duplicate = (
+            db.session.query(Expense.id)
+            .filter(Expense.group_id == group_id, Expense.description == description)
+            .exists()
+        )
+        rows = (
+            db.session.query(User.id, User.username, User.full_name, duplicate.label('duplicate'))
+            .select_from(Group)
+            .outerjoin(GroupMember, GroupMember.group_id == Group.id)
+            .outerjoin(User, User.id == GroupMember.user_id)
+            .filter(Group.id == group_id)
+            .all()
+        )
+        if not rows:
+            raise ValueError("Group not found")
+
+        members = {row.id: row for row in rows if row.id is not None}
+        if user_id not in members:
+            raise PermissionError('User is not part of the selected group.')
+
+        paid_by = paid_by or members[user_id].full_name or members[user_id].username
+        amount = ExpenseService._validate_expense_fields(amount, description, split_type, paid_by, currency)
+
+        # Check for duplicate description in the same group
+        if rows[0].duplicate:
+            raise ValueError("Duplicate description found in the same group")
+
+        all_participants = [{'user_id': row.id, 'name': row.username} for row in members.values()]
+        participants = ExpenseService._resolve_participants(participants, members, all_participants, split_type)
+
+        logging.debug(f"Calling calculate_splits with data: {{'split_type': split_type, 'amount': amount, 'participants': participants}}")
+
+        # Call calculate_splits function to generate splits
+        splits = ExpenseService.calculate_splits({
+            'split_type': split_type,
+            'amount': amount,
+            'participants': participants,
+        })
+
+        try:
+            # Create a new expense
+            expense = Expense(
+                amount=amount,
+                description=description,
+                group_id=group_id,
+                user_id=user_id,  # Add user_id to associate with the expense
+                split_type=split_type,
+                paid_by=paid_by,
+                currency=currency.upper(),
+            )
+
+            db.session.add(expense)
+            db.session.flush()  # Assign the expense ID without committing yet
+
+            # Insert every split in a single executemany
+            db.session.bulk_insert_mappings(ExpenseSplit, [
+                {'expense_id': expense.id, 'user_id': split['user_id'], 'amount': split['amount'], 'name': split['name']}
+                for split in splits
+            ])
+
+            # Update the group ledger in the same transaction as the splits
+            BalanceService.apply_expense(expense, splits)
+
+            db.session.commit()
+            return expense
         
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Failed to add expense: {str(e)}")
+            raise
+
+    @staticmethod
+    def _validate_expense_fields(amount, description, split_type, paid_by, currency) -> int:
+        """Validate the fields of a single expense and return the amount in minor units."""
         # Amount validation
         try:
-            # Convert amount to float if it's a string
-            if isinstance(amount, str):
-                amount = float(amount)
+            # Convert the amount (a number or numeric string) to cents
+            if not isinstance(amount, (int, float, str)):
+                raise ValueError("Invalid amount")
+            amount = to_minor_units(amount)
             
-            # Validate amount is a number and positive
-            if not isinstance(amount, (int, float)) or amount <= 0:
+            # Validate amount is positive
+            if amount <= 0:
                 raise ValueError("Invalid amount")
         except (TypeError, ValueError):
             raise ValueError("Amount must be a valid positive number")
@@ -69,17 +157,8 @@ class ExpenseService:
         if not description or not isinstance(description, str):
             raise ValueError("Invalid description")
         
-        # Check for duplicate description in the same group
-        existing_expense = Expense.query.filter_by(group_id=group_id, description=description).first()
-        if existing_expense:
-            raise ValueError("Duplicate description found in the same group")
-        
-        # Group ID validation
-        if not group_id or not isinstance(group_id, int):
-            raise ValueError("Invalid group ID")
-        
         # Split type validation
-        if not split_type or split_type.lower() not in ['equal', 'percentage', 'custom_amount']:
+        if not split_type or not isinstance(split_type, str) or split_type.lower() not in ['equal', 'percentage', 'custom_amount']:
             raise ValueError("Invalid split type")
         
         # Paid by validation
@@ -90,97 +169,265 @@ class ExpenseService:
         if not currency or not isinstance(currency, str):
             raise ValueError("Currency is required")
 
-        valid_currencies = set(CURRENCY_SYMBOLS.keys())
-        if currency.upper() not in valid_currencies:
+        if currency.upper() not in CURRENCY_SYMBOLS:
             raise ValueError("Invalid currency. Must be a valid ISO 4217 code.")
-        
-        # Fetch participants from the group
-        participants = ExpenseService.get_participants_user_ids(group_id)
-        
-        # Participants validation
-        if not participants or not isinstance(participants, list):
-            raise ValueError("Invalid participants")
-        
-        for participant in participants:
-            if not isinstance(participant, dict):
-                raise ValueError("Each participant must be a dictionary")
-            
-            if 'user_id' not in participant or 'name' not in participant:
-                raise ValueError("Participant must have user_id and name")
-            
-             # Ensure each user_id exists in the users table
-            try:
-                user = User.query.filter_by(id=participant['user_id']).one()
-            except NoResultFound:
-                raise ValueError(f"User with ID {participant['user_id']} not found")
-            
 
-        # Check if the user is a member of the group
-        is_member = GroupMember.query.filter_by(user_id=user_id, group_id=group_id).first()
-        if not is_member:
+        return amount
+
+    @staticmethod
+    def bulk_add_expenses(user_id: int, group_id: int, rows: List[Any]) -> Dict[str, Any]:
+        """
+        Import many expenses into a group in a single transaction.
+
+        Every row is validated against one prefetched set of group members and
+        existing descriptions. Valid rows are inserted together with their
+        splits, invalid rows are reported back by index.
+        """
+        group = Group.query.get(group_id)
+        if not group:
+            raise ValueError("Group not found")
+
+        member_rows = (
+            db.session.query(User.id, User.username, User.full_name)
+            .join(GroupMember, GroupMember.user_id == User.id)
+            .filter(GroupMember.group_id == group_id)
+            .all()
+        )
+        members = {row.id: row for row in member_rows}
+        if user_id not in members:
             raise PermissionError('User is not part of the selected group.')
-        
-        try:
-            # Create a new expense
-            expense = Expense(
-                amount=amount,
-                description=description,
-                group_id=group_id,
-                user_id=user_id,  # Add user_id to associate with the expense
-                split_type=split_type,
-                paid_by=paid_by,
-                currency=currency.upper(),
+
+        paid_by = members[user_id].full_name or members[user_id].username
+        all_participants = [{'user_id': row.id, 'name': row.username} for row in member_rows]
+
+        # Only descriptions that appear in this batch can clash with existing expenses
+        descriptions = {row.get('description') for row in rows if isinstance(row, dict) and isinstance(row.get('description'), str)}
+        taken = set()
+        description_list = list(descriptions)
+        for start in range(0, len(description_list), BULK_QUERY_CHUNK_SIZE):
+            chunk = description_list[start:start + BULK_QUERY_CHUNK_SIZE]
+            taken.update(
+                description for (description,) in
+                db.session.query(Expense.description)
+                .filter(Expense.group_id == group_id, Expense.description.in_(chunk))
             )
 
-            db.session.add(expense)
-            db.session.commit()
+        errors = []
+        candidates = []
+        for index, row in enumerate(rows):
+            try:
+                if not isinstance(row, dict):
+                    raise ValueError("Each row must be an object")
 
-            logging.debug(f"Calling calculate_splits with data: {{'split_type': split_type, 'amount': amount, 'participants': participants}}")
-
-            # Call calculate_splits function to generate splits
-            splits = ExpenseService.calculate_splits({
-                'split_type': split_type,
-                'amount': amount,
-                'participants': participants,
-            })
-
-            # Iterate over each split and create an ExpenseSplit for each participant
-            for split in splits:
-                expense_split = ExpenseSplit(
-                    expense_id=expense.id,
-                    user_id=split['user_id'],
-                    amount=split['amount'],
-                    name=split['name']
+                description = row.get('description')
+                split_type = row.get('split_type', SplitType.EQUAL.value)
+                currency = row.get('currency', 'ZAR')
+                amount = ExpenseService._validate_expense_fields(
+                    row.get('amount'), description, split_type, paid_by, currency
                 )
-                db.session.add(expense_split)
+                split_type = split_type.lower()
+
+                participants = ExpenseService._resolve_participants(row.get('participants'), members, all_participants, split_type)
+                if split_type == SplitType.PERCENTAGE.value:
+                    values = split_calculator.scale_percentages([participant['percentage'] for participant in participants])
+                elif split_type == SplitType.CUSTOM_AMOUNT.value:
+                    values = [to_minor_units(participant['amount']) for participant in participants]
+                else:
+                    values = None
+
+                created_at = row.get('created_at')
+                if created_at:
+                    try:
+                        created_at = datetime.fromisoformat(created_at)
+                    except (TypeError, ValueError):
+                        raise ValueError("created_at must be an ISO 8601 date")
+
+                candidates.append((index, {
+                    'amount': amount,
+                    'description': description,
+                    'group_id': group_id,
+                    'user_id': user_id,
+                    'split_type': split_type,
+                    'paid_by': paid_by,
+                    'currency': currency.upper(),
+                    'created_at': created_at or datetime.utcnow(),
+                }, participants, values))
+            except (ValueError, KeyError, TypeError) as e:
+                errors.append({'row': index, 'error': str(e)})
+
+        # Split every row in one batch per split type rather than one dict comprehension per row
+        shares_by_row = {}
+        for split_type in SplitType:
+            batch_rows = [candidate for candidate in candidates if candidate[1]['split_type'] == split_type.value]
+            if not batch_rows:
+                continue
+            amounts = [expense['amount'] for _, expense, _, _ in batch_rows]
+            counts = [len(participants) for _, _, participants, _ in batch_rows]
+            if split_type == SplitType.EQUAL:
+                batch = split_calculator.split_equal(amounts, counts)
+            else:
+                flat_values = [value for _, _, _, values in batch_rows for value in values]
+                if split_type == SplitType.PERCENTAGE:
+                    batch = split_calculator.split_by_percentage(amounts, flat_values, counts)
+                else:
+                    batch = split_calculator.split_by_amounts(amounts, flat_values, counts)
+
+            for position, (index, _, _, _) in enumerate(batch_rows):
+                shares_by_row[index] = batch.errors.get(position) or batch.shares_for(position)
+
+        prepared = []
+        for index, expense, participants, _ in candidates:
+            shares = shares_by_row[index]
+            if isinstance(shares, str):
+                errors.append({'row': index, 'error': shares})
+            elif expense['description'] in taken:
+                errors.append({'row': index, 'error': "Duplicate description found in the same group"})
+            else:
+                taken.add(expense['description'])
+                splits = [
+                    {'user_id': participant['user_id'], 'name': participant['name'], 'amount': share}
+                    for participant, share in zip(participants, shares)
+                ]
+                prepared.append((expense, splits))
+        errors.sort(key=lambda error: error['row'])
+
+        if not prepared:
+            return {'created': [], 'errors': errors}
+
+        try:
+            # Insert every expense in one executemany, tagged with a token unique to this import,
+            # then read the IDs back by token. Descriptions are unique within the batch, and the
+            # token keeps rows another writer added meanwhile out of the mapping. Core inserts
+            # skip the ORM's per-row bookkeeping, which costs far more than the inserts themselves.
+            batch = uuid.uuid4().hex
+            db.session.execute(Expense.__table__.insert(), [{**expense, 'import_batch': batch} for expense, _ in prepared])
+            expense_ids = dict(
+                db.session.query(Expense.description, Expense.id).filter(Expense.import_batch == batch)
+            )
+
+            split_rows = []
+            deltas = defaultdict(int)
+            for expense, splits in prepared:
+                expense_id = expense_ids[expense['description']]
+                for split in splits:
+                    split_rows.append({
+                        'expense_id': expense_id,
+                        'user_id': split['user_id'],
+                        'amount': split['amount'],
+                        'name': split['name'],
+                    })
+                for member_id, delta in BalanceService.expense_deltas(user_id, expense['amount'], splits).items():
+                    deltas[member_id] += delta
+
+            db.session.execute(ExpenseSplit.__table__.insert(), split_rows)
+            BalanceService.apply_deltas(group_id, deltas, spent=sum(expense['amount'] for expense, _ in prepared))
 
             db.session.commit()
-            return expense
-        
         except Exception as e:
             db.session.rollback()
-            logging.error(f"Failed to add expense: {str(e)}")
+            logging.error(f"Failed to import expenses: {str(e)}")
             raise
 
+        return {
+            'created': [expense_ids[expense['description']] for expense, _ in prepared],
+            'errors': errors
+        }
+
     @staticmethod
-    def get_expenses(user_id, group_id, page=1, per_page=10):
-        # Check if the user belongs to the group
-        is_member = GroupMember.query.filter_by(user_id=user_id, group_id=group_id).first()
-        if not is_member:
+    def _resolve_participants(requested, members, all_participants, split_type: str = SplitType.EQUAL.value) -> List[Dict[str, Any]]:
+        """
+        Match requested participants against the group members, defaulting to everyone.
+
+        Percentage and custom amount splits need each participant's share, so
+        for those a missing list or a missing share is a ValueError.
+        """
+        share_field = {SplitType.PERCENTAGE.value: 'percentage', SplitType.CUSTOM_AMOUNT.value: 'amount'}.get(split_type.lower())
+        if not requested:
+            if share_field:
+                raise ValueError(f"Participants with a {share_field} are required for a {split_type.lower()} split")
+            return all_participants
+
+        if not isinstance(requested, list):
+            raise ValueError("Invalid participants")
+
+        participants = []
+        for participant in requested:
+            if not isinstance(participant, dict):
+                participant = {'user_id': participant}
+
+            member = members.get(participant.get('user_id'))
+            if not member:
+                raise ValueError(f"User with ID {participant.get('user_id')} is not a member of the group")
+
+            if share_field and participant.get(share_field) is None:
+                raise ValueError(f"Participant {member.id} has no {share_field}")
+
+            participants.append({**participant, 'user_id': member.id, 'name': member.username})
+
+        return participants
+
+    @staticmethod
+    def get_expenses(user_id, group_id, cursor=None, per_page=10, include_total=False) -> CursorPage:
+        # Check the group exists and the user belongs to it in a single query,
+        # shared with the conditional GET check on the same request
+        membership = RevisionService.group_membership(user_id, group_id)
+        if not membership:
+            raise ValueError('Group not found')
+        if membership.member_id is None:
             raise PermissionError('User is not part of the selected group.')
 
-        # Query and paginate expenses for the group
-        expenses_query = Expense.query.filter_by(group_id=group_id)
-        paginated_expenses = expenses_query.paginate(page=page, per_page=per_page, error_out=False)
+        # Query and paginate expenses for the group, newest first, loading
+        # every page's splits in one extra query instead of one per expense
+        expenses_query = Expense.query.filter_by(group_id=group_id).options(selectinload(Expense.expense_splits))
+        return paginate_by_cursor(
+            expenses_query, Expense.created_at, Expense.id,
+            cursor=cursor, limit=per_page,
+            include_total=include_total, total_cache_key=('expenses', group_id)
+        )
+
+    @staticmethod
+    def export_group_expenses(user_id, group_id, start: Optional[datetime] = None, end: Optional[datetime] = None):
+        """
+        Every expense in a group joined with its splits, one row per split, oldest first.
+
+        Access is checked straight away. The rows themselves are read lazily
+        through a server-side cursor in batches of EXPORT_BATCH_SIZE, so the
+        caller can stream any number of them in bounded memory. Expenses
+        without splits still appear once, with empty split columns.
+        """
+        membership = RevisionService.group_membership(user_id, group_id)
+        if not membership:
+            raise ValueError('Group not found')
+        if membership.member_id is None:
+            raise PermissionError('User is not part of the selected group.')
 
-        return paginated_expenses
+        query = (
+            db.session.query(
+                Expense.id, Expense.created_at, Expense.description, Expense.amount, Expense.currency,
+                Expense.split_type, Expense.paid_by, Expense.user_id,
+                ExpenseSplit.user_id, ExpenseSplit.name, ExpenseSplit.amount
+            )
+            .outerjoin(ExpenseSplit, ExpenseSplit.expense_id == Expense.id)
+            .filter(Expense.group_id == group_id)
+        )
+        if start:
+            query = query.filter(Expense.created_at >= start)
+        if end:
+            query = query.filter(Expense.created_at < end)
 
+        # Ordered to match ix_expenses_group_id_created_at_id, so rows stream without a sort
+        return query.order_by(Expense.created_at, Expense.id).yield_per(EXPORT_BATCH_SIZE)
     
     
     # A function to calculate splits based on the split type
     @staticmethod
     def calculate_splits(split_data: Dict) -> List[Dict]:
-        """Calculate splits based on split type"""
+        """
+        Calculate splits based on split type.
+
+        The expense amount is in minor units (cents) and so is every split.
+        Custom split amounts are given by participants in major units.
+        """
         split_type = split_data.get('split_type').lower()
         amount = split_data['amount']
         participants = split_data.get('participants', [])
@@ -210,53 +457,98 @@ class ExpenseService:
     
     # Function to calculate equal split
     @staticmethod
-    def _calculate_equal_split(amount: float, participants: List[Dict]) -> List[Dict]:
-        """Calculate equal split"""
-        per_person_amount = amount / len(participants)
+    def _calculate_equal_split(amount: int, participants: List[Dict]) -> List[Dict]:
+        """Calculate equal split, handing leftover cents to the first participants"""
+        amounts = allocate(amount, [1] * len(participants))
         
         return [
-            {**participant, 'amount': per_person_amount} 
-            for participant in participants
+            {**participant, 'amount': share} 
+            for participant, share in zip(participants, amounts)
         ]
     
 
     # Function to calculate percentage split
     @staticmethod
-    def _calculate_percentage_split(amount: float, participants: List[Dict]) -> List[Dict]:
+    def _calculate_percentage_split(amount: int, participants: List[Dict]) -> List[Dict]:
         """Calculate percentage split"""
-        total_percentage = sum(p.get('percentage', 0) for p in participants)
+        percentages = [participant.get('percentage') for participant in participants]
+        if None in percentages:
+            raise ValueError("Every participant needs a percentage")
+        try:
+            total_percentage = sum(Decimal(str(percentage)) for percentage in percentages)
+        except InvalidOperation:
+            raise ValueError("Percentages must be numbers")
         if total_percentage != 100:
             raise ValueError("Total percentage must equal 100%")
+
+        amounts = allocate(amount, percentages)
         return [
-            {
-                **participant,
-                'amount': round(amount * (participant['percentage'] / 100), 2)
-            }
-            for participant in participants
+            {**participant, 'amount': share}
+            for participant, share in zip(participants, amounts)
         ]
 
     # Function to calculate custom split
     @staticmethod
-    def _calculate_custom_amount_split(amount: float, participants: List[Dict]) -> List[Dict]:
+    def _calculate_custom_amount_split(amount: int, participants: List[Dict]) -> List[Dict]:
         """Calculate and return custom split amounts for each participant"""
-        total_custom_amount = sum(participant.get('amount', 0) for participant in participants)
+        if any(participant.get('amount') is None for participant in participants):
+            raise ValueError("Every participant needs an amount")
+        custom_amounts = [to_minor_units(participant['amount']) for participant in participants]
         
-        if total_custom_amount != amount:
+        # Compare whole cents so the check is exact
+        if sum(custom_amounts) != amount:
             raise ValueError("The total of custom amounts must match the total amount.")
 
         # Assign custom amounts to each participant
         return [
-            {**participant, 'amount': participant.get('amount', 0)}
-            for participant in participants
+            {**participant, 'amount': share}
+            for participant, share in zip(participants, custom_amounts)
         ]
     
     # Function to add currency to the amount
-    def format_amount_with_currency(amount: Union[int, float], currency: str) -> str:
+    @staticmethod
+    def format_amount_with_currency(amount: int, currency: str) -> str:
         """
-        Format the amount with the corresponding currency symbol.
+        Format an amount in minor units with the corresponding currency symbol.
         """
         currency_symbol = CURRENCY_SYMBOLS.get(currency.upper(), currency.upper())  # Default to the currency code
-        return f"{currency_symbol}{amount:.2f}"
+        return f"{currency_symbol}{from_minor_units(amount):.2f}"
+
+    @staticmethod
+    def serialize_expense(expense: Expense) -> Dict[str, Any]:
+        """An expense and its splits as returned by the API, with amounts formatted in its currency."""
+        return {
+            'id': expense.id,
+            'description': expense.description,
+            'amount': ExpenseService.format_amount_with_currency(expense.amount, expense.currency),
+            'currency': expense.currency,
+            'group_id': expense.group_id,
+            'split_type': expense.split_type,
+            'paid_by': expense.paid_by,
+            'created_at': expense.created_at.isoformat() if expense.created_at else None,
+            'participants': [
+                {
+                    'user_id': split.user_id,
+                    'amount': ExpenseService.format_amount_with_currency(split.amount, expense.currency),
+                    'name': split.name
+                }
+                for split in expense.expense_splits
+            ]
+        }
+
+    @staticmethod
+    def get_group_totals(group_id: int) -> List[Dict[str, Any]]:
+        """Total spend of a group per currency, summed in the database."""
+        rows = (
+            db.session.query(Expense.currency, func.sum(Expense.amount), func.count(Expense.id))
+            .filter(Expense.group_id == group_id)
+            .group_by(Expense.currency)
+            .all()
+        )
+        return [
+            {'currency': currency, 'total': from_minor_units(total), 'expense_count': count}
+            for currency, total, count in rows
+        ]
     
     
 
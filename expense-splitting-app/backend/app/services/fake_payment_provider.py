@@ -0,0 +1,69 @@
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+from .payment_gateway import PaymentProviderError, ProviderTransientError
+
+
+class FakePaymentProvider:
+    """
+    In-process stand-in for Stripe and PayPal, used in tests and local development.
+
+    Speaks the same interface as StripeProvider and PayPalProvider. It can be
+    told to be slow (latency), to fail the next few calls transiently
+    (fail_next), or to decline (decline_next), which exercises the gateway's
+    deadlines, retries and circuit breaker without a network.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.fail_next = 0
+        self.decline_next = 0
+        self.calls: List[str] = []
+        self.intents: Dict[str, dict] = {}
+        self.payments: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def _call(self, operation: str) -> None:
+        with self._lock:
+            self.calls.append(operation)
+            fail, decline = self.fail_next > 0, self.decline_next > 0
+            self.fail_next -= fail
+            self.decline_next -= decline
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise ProviderTransientError(f'fake {operation} failed')
+        if decline:
+            raise PaymentProviderError(f'fake {operation} declined')
+
+    def create_payment_intent(self, amount: int, currency: str, metadata: dict, idempotency_key: str) -> dict:
+        self._call('create_payment_intent')
+        with self._lock:
+            intent = self.intents.get(idempotency_key)
+            if intent is None:
+                intent_id = f'pi_fake_{uuid.uuid4().hex[:16]}'
+                intent = {'id': intent_id, 'client_secret': f'{intent_id}_secret', 'amount': amount,
+                          'currency': currency, 'metadata': metadata}
+                self.intents[idempotency_key] = intent
+        return {'id': intent['id'], 'client_secret': intent['client_secret']}
+
+    def create_payment(self, amount: int, currency: str, user_id: int, return_url: str, cancel_url: str,
+                       idempotency_key: str) -> dict:
+        self._call('create_payment')
+        with self._lock:
+            payment = self.payments.get(idempotency_key)
+            if payment is None:
+                payment = {'id': f'PAYID-FAKE-{uuid.uuid4().hex[:12].upper()}', 'amount': amount,
+                           'currency': currency, 'user_id': user_id, 'executed': False}
+                self.payments[idempotency_key] = payment
+                self.payments[payment['id']] = payment
+        return {'id': payment['id'], 'approval_url': f"{return_url}?paymentId={payment['id']}&PayerID=FAKEPAYER"}
+
+    def execute_payment(self, payment_id: str, payer_id: str) -> dict:
+        self._call('execute_payment')
+        payment: Optional[dict] = self.payments.get(payment_id)
+        if payment is None:
+            raise PaymentProviderError(f'Unknown payment {payment_id}')
+        payment['executed'] = True
+        return {'id': payment['id'], 'user_id': payment['user_id'], 'amount': payment['amount']}
@@ -1,24 +1,14 @@
-import base64
-from ..models import Group, GroupMember, User
+from datetime import datetime
+from ..models import Group, GroupBalance, GroupMember, User
 from .. import db
-import uuid
-
-SHORT_CODE_LENGTH = 7
+from ..utils.cache import cached, invalidate
+from ..utils.money import from_minor_units
+from ..utils.pagination import paginate_by_cursor, paginate_sorted
+from .join_code_pool import get_join_code_pool
+from sqlalchemy.exc import IntegrityError # type: ignore
 
 class GroupService:
 
-    @staticmethod
-    def generate_short_code():
-        
-        unique_code = uuid.uuid4()
-        # Encode UUID into URL-safe Base64, and strip padding "="
-        short_code = base64.urlsafe_b64encode(unique_code.bytes).decode('utf-8').rstrip('=')
-        short_code = short_code[:SHORT_CODE_LENGTH]
-
-        # Check if short code already exists
-        if not Group.query.filter_by(unique_code=short_code).first():
-            return short_code
-
     @staticmethod
     def create_group(user_id, group_name, description=''):
         # Ensure that the group name is provided
@@ -30,53 +20,79 @@ class GroupService:
         if existing_group:
             raise ValueError('A group with this name already exists.')
 
-        # Generate a unique code for the group
-        unique_code = GroupService.generate_short_code()
-
-        # Create a new group
-        group = Group(
-            name=group_name,
-            description=description,
-            unique_code=unique_code, 
-            created_by=user_id
-        )
-        
-        db.session.add(group)
-        db.session.commit()
-
-        # Add creator as a member of the group
-        member = GroupMember(
-            group_id=group.id,
-            user_id=user_id
-        )
-        db.session.add(member)
-        db.session.commit()
+        # Join codes come pre-reserved from the pool, so there's nothing to look up here
+        pool = get_join_code_pool()
+        unique_code = pool.take()
+
+        try:
+            group = Group(
+                name=group_name,
+                description=description,
+                unique_code=unique_code,
+                created_by=user_id,
+                member_count=1
+            )
+            db.session.add(group)
+            db.session.flush()  # Assigns group.id
+
+            # Add creator as a member of the group, in the same transaction
+            db.session.add(GroupMember(group_id=group.id, user_id=user_id))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            pool.give_back(unique_code)
+            raise
 
         return group
 
     @staticmethod
-    def get_user_groups(user_id):
-        groups = Group.query.filter_by(created_by=user_id).all()
-        group_list = []
-        
-        # Create a set of group IDs where the user is a member
-        user_group_ids = {member.group_id for member in GroupMember.query.filter_by(user_id=user_id).all()}
-
-        for group in groups:
-            # If the user is a member of the group or is the creator, add it to the list
-            if group.id in user_group_ids or group.created_by == user_id:
-                group_list.append({
-                    'group_id': group.id,
-                    'name': group.name,
-                    'description': group.description,
-                    'created_by': group.created_by,
-                    'unique_code': group.unique_code
-                })
-
-        if not group_list:
+    def get_user_groups(user_id, cursor=None, limit=None, include_total=False):
+        """
+        Retrieve a page of every group the user belongs to, newest first.
+
+        One query joins the user's memberships to their groups and their
+        own ledger rows. Member count, total spend and last activity are
+        counters kept on the group, so nothing is aggregated per request.
+        """
+        groups_query = (
+            db.session.query(
+                Group.id, Group.name, Group.description, Group.created_by, Group.unique_code,
+                Group.created_at, Group.member_count, Group.total_spent, Group.last_activity_at,
+                GroupBalance.balance
+            )
+            .join(GroupMember, GroupMember.group_id == Group.id)
+            .outerjoin(
+                GroupBalance,
+                (GroupBalance.group_id == Group.id) & (GroupBalance.user_id == GroupMember.user_id)
+            )
+            .filter(GroupMember.user_id == user_id)
+        )
+        page = paginate_by_cursor(
+            groups_query, Group.created_at, Group.id,
+            cursor=cursor, limit=limit,
+            include_total=include_total, total_cache_key=('user_groups', user_id),
+            key=lambda group: (group.created_at, group.id)
+        )
+
+        page.items = [
+            {
+                'group_id': group.id,
+                'name': group.name,
+                'description': group.description,
+                'created_by': group.created_by,
+                'unique_code': group.unique_code,
+                'member_count': group.member_count,
+                'total_spent': from_minor_units(group.total_spent),
+                'last_activity_at': group.last_activity_at.isoformat() if group.last_activity_at else None,
+                'balance': from_minor_units(group.balance)  # Positive when the group owes the user
+            }
+            for group in page.items
+        ]
+
+        if not page.items and not cursor:
             raise PermissionError('You do not have permission to access these groups')
 
-        return group_list
+        return page
 
     @staticmethod
     def add_user_to_group(user_id, group_id):
@@ -88,9 +104,18 @@ class GroupService:
         # Create a new GroupMember instance
         new_member = GroupMember(user_id=user_id, group_id=group_id)
         
-        # Add the new member to the session and commit
+        # Add the new member and count them in the same transaction
         db.session.add(new_member)
+        Group.query.filter_by(id=group_id).update(
+            {
+                Group.member_count: Group.member_count + 1,
+                Group.last_activity_at: datetime.utcnow(),
+                Group.ledger_version: Group.ledger_version + 1,  # Cached dashboards list the members
+            },
+            synchronize_session=False
+        )
         db.session.commit()
+        invalidate('group_members', group_id)
         
         return new_member
 
@@ -108,20 +133,44 @@ class GroupService:
         GroupService.add_user_to_group(user_id, group.id)
 
     @staticmethod
-    def get_group_members(group_id):
+    def get_group_members(group_id, cursor=None, limit=None, include_total=False):
+        """
+        A page of a group's members, most recently joined first.
+
+        The whole member list is cached per group and paged in memory, so
+        one invalidation covers every page. New members and renames
+        invalidate it.
+        """
+        members = cached('group_members', group_id, lambda: GroupService._load_members(group_id))
+        if members is None:
+            raise ValueError("Group not found.")
+
+        page = paginate_sorted(
+            members, key=lambda member: (datetime.fromisoformat(member['joined_at']), member['id']),
+            cursor=cursor, limit=limit, include_total=include_total
+        )
+
+        # Create a list of member details to return
+        page.items = [{"id": member['id'], "username": member['username'], "full_name": member['full_name']} for member in page.items]
+        return page
+
+    @staticmethod
+    def _load_members(group_id):
         # Check if the group exists
         group = Group.query.filter_by(id=group_id).first()
         if not group:
-            raise ValueError("Group not found.")
-    
-        # Query to get members of the group
+            return None
+
+        # Query to get members of the group, most recently joined first
         members = (
-            db.session.query(User)
+            db.session.query(User.id, User.username, User.full_name, GroupMember.joined_at)
             .join(GroupMember)
             .filter(GroupMember.group_id == group_id)
+            .order_by(GroupMember.joined_at.desc(), GroupMember.user_id.desc())
             .all()
         )
-
-        # Create a list of member details to return
-        member_list = [{"id": member.id, "username": member.username, "full_name": member.full_name} for member in members]
-        return member_list
\ No newline at end of file
+        return [
+            {"id": member.id, "username": member.username, "full_name": member.full_name,
+             "joined_at": member.joined_at.isoformat()}
+            for member in members
+        ]
@@ -0,0 +1,142 @@
+import base64
+from collections import deque
+import logging
+import os
+import threading
+from typing import List, Optional
+import uuid
+from flask import current_app # type: ignore
+from sqlalchemy.exc import IntegrityError # type: ignore
+from ..models import GroupJoinCode
+from .. import db
+
+SHORT_CODE_LENGTH = 7
+
+
+def generate_short_code() -> str:
+    """A random candidate join code. Not checked for uniqueness; see JoinCodePool."""
+    # Encode a UUID into URL-safe Base64, and strip padding "="
+    short_code = base64.urlsafe_b64encode(uuid.uuid4().bytes).decode('utf-8').rstrip('=')
+    return short_code[:SHORT_CODE_LENGTH]
+
+
+def reserve_join_codes(count: int, max_attempts: int = 5) -> List[str]:
+    """
+    Claim count unused join codes in group_join_codes and return them.
+
+    Candidates are checked and claimed together in one transaction on a
+    connection of its own, so it never commits the caller's session.
+    When another worker claims one of the same candidates first, the
+    insert fails on the primary key and the batch is drawn again.
+    """
+    table = GroupJoinCode.__table__
+    for _ in range(max_attempts):
+        candidates = {generate_short_code() for _ in range(count)}
+        try:
+            with db.engine.begin() as connection:
+                taken = set(connection.execute(
+                    db.select(table.c.code).where(table.c.code.in_(candidates))
+                ).scalars())
+                codes = sorted(candidates - taken)
+                if codes:
+                    connection.execute(table.insert(), [{'code': code} for code in codes])
+            return codes
+        except IntegrityError:
+            continue
+    raise RuntimeError('Could not reserve group join codes')
+
+
+class JoinCodePool:
+    """
+    Join codes reserved ahead of time, so creating a group needs no code lookups.
+
+    Codes are claimed from the database batch_size at a time. Once fewer
+    than low_water are left, a background thread tops the pool up; a
+    request only reserves codes itself if the pool has run dry. The thread
+    is started per process, and forked workers each reserve their own codes.
+    """
+
+    def __init__(self, app, batch_size: int = 100, low_water: int = 25, background: bool = True):
+        self.app = app
+        self.batch_size = batch_size
+        self.low_water = low_water
+        self.background = background
+        self._codes = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+
+    def __len__(self):
+        return len(self._codes)
+
+    def take(self) -> str:
+        """Hand out a code nobody else has. Must be called within an app context."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    # Codes reserved before a fork would be handed out by parent and child alike
+                    self._codes.clear()
+                    self._pid = os.getpid()
+
+        try:
+            code = self._codes.popleft()
+        except IndexError:
+            with self._lock:
+                if not self._codes:
+                    self._codes.extend(reserve_join_codes(self.batch_size))
+                code = self._codes.popleft()
+
+        if len(self._codes) < self.low_water:
+            if self.background:
+                self._ensure_started()
+                self._wake.set()
+            else:
+                self.refill()
+        return code
+
+    def give_back(self, code: str) -> None:
+        """Return a code that was taken but not used, e.g. because creating the group failed."""
+        self._codes.appendleft(code)
+
+    def refill(self) -> None:
+        with self._lock:
+            if len(self._codes) < self.low_water:
+                self._codes.extend(reserve_join_codes(self.batch_size))
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            # Threads don't survive a fork, so each worker process starts its own
+            self._thread = threading.Thread(target=self._run, name='join-code-pool', daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait()
+            self._wake.clear()
+            try:
+                with self.app.app_context():
+                    self.refill()
+            except Exception as e:
+                # The next take() tries again, or reserves inline if the pool runs dry
+                logging.exception(f"Refilling the join code pool failed: {e}")
+
+
+def init_join_code_pool(app) -> JoinCodePool:
+    """Create the app's join code pool. It reserves its first batch when the first group is created."""
+    pool = JoinCodePool(
+        app,
+        batch_size=app.config.get('GROUP_CODE_BATCH_SIZE', 100),
+        low_water=app.config.get('GROUP_CODE_LOW_WATER', 25),
+        background=app.config.get('GROUP_CODE_BACKGROUND_REFILL', True),
+    )
+    app.extensions['join_code_pool'] = pool
+    return pool
+
+
+def get_join_code_pool() -> JoinCodePool:
+    return current_app.extensions['join_code_pool']
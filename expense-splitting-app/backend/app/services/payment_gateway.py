@@ -0,0 +1,224 @@
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import logging
+import random
+import threading
+import time
+from typing import Dict, Optional
+from flask import current_app # type: ignore
+
+
+class PaymentProviderError(Exception):
+    """The provider answered and rejected the request, e.g. a declined card. Retrying won't help."""
+
+
+class PaymentProviderUnavailable(Exception):
+    """The provider could not be reached in time, or its circuit is open."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class ProviderTransientError(Exception):
+    """Raised by provider adapters for failures worth retrying: timeouts, connection errors, 5xx and 429."""
+
+
+class CircuitBreaker:
+    """
+    Stops calling a provider that keeps failing.
+
+    After failure_threshold consecutive failures the circuit opens and calls
+    fail immediately. Once reset_timeout has passed a single trial call is
+    let through; its outcome closes the circuit again or re-opens it.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_progress = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return 'closed'
+        return 'half-open' if time.monotonic() - self._opened_at >= self.reset_timeout else 'open'
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_progress:
+                return False
+            self._trial_in_progress = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_progress = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_in_progress or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_progress = False
+
+    def release(self) -> None:
+        """Give back the trial slot of a call that ended without reaching the provider."""
+        with self._lock:
+            self._trial_in_progress = False
+
+
+class PaymentGateway:
+    """
+    Calls one payment provider from its own small thread pool.
+
+    Every call gets a deadline covering all attempts, so a request thread
+    waits at most `timeout` seconds however slow the provider is. Transient
+    failures are retried with exponential backoff and full jitter while time
+    remains, and repeated failures open the circuit breaker. The pool only
+    queues up to max_pending calls; beyond that, calls fail fast instead of
+    tying up more web workers.
+    """
+
+    def __init__(self, name: str, provider, timeout: float = 10.0, max_attempts: int = 3,
+                 workers: int = 8, max_pending: Optional[int] = None, backoff: float = 0.2,
+                 max_backoff: float = 2.0, breaker: Optional[CircuitBreaker] = None):
+        self.name = name
+        self.provider = provider
+        self.timeout = timeout
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=f'payments-{name}')
+        self._slots = threading.BoundedSemaphore(max_pending or workers * 2)
+
+    def _submit(self, func, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            raise PaymentProviderUnavailable(f"{self.name} is handling too many requests, please retry")
+        try:
+            future = self._executor.submit(func, *args, **kwargs)
+        except Exception:
+            self._slots.release()
+            raise
+        # The slot is held until the call really finishes, not just until the caller gives up
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def call(self, operation: str, *args, idempotent: bool = True, **kwargs):
+        """
+        Run provider.<operation>(*args, **kwargs) within the deadline.
+
+        Pass idempotent=False for calls the provider could apply twice; they
+        are attempted once, since a timed out attempt may still have succeeded.
+        """
+        if not self.breaker.allow():
+            raise PaymentProviderUnavailable(f"{self.name} is temporarily unavailable", self.breaker.retry_after())
+
+        func = getattr(self.provider, operation)
+        deadline = time.monotonic() + self.timeout
+        attempts = self.max_attempts if idempotent else 1
+        last_error = 'no attempt made'
+        # Until an outcome is recorded this call may hold the breaker's only trial slot,
+        # which must be given back however the call ends, or the circuit never closes
+        settled = False
+
+        try:
+            for attempt in range(attempts):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+
+                future = self._submit(func, *args, **kwargs)
+                try:
+                    result = future.result(timeout=remaining)
+                except FutureTimeoutError:
+                    last_error = f"timed out after {self.timeout:g}s"
+                except ProviderTransientError as e:
+                    last_error = str(e)
+                except PaymentProviderError:
+                    # The provider is up, it just said no
+                    self.breaker.record_success()
+                    settled = True
+                    raise
+                except Exception:
+                    self.breaker.record_failure()
+                    settled = True
+                    raise
+                else:
+                    self.breaker.record_success()
+                    settled = True
+                    return result
+
+                self.breaker.record_failure()
+                settled = True
+                logging.warning(f"{self.name}.{operation} attempt {attempt + 1} failed: {last_error}")
+                if not self.breaker.allow():
+                    break
+                settled = False
+
+                delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                if time.monotonic() + delay >= deadline:
+                    break
+                time.sleep(delay)
+        finally:
+            if not settled:
+                self.breaker.release()
+
+        raise PaymentProviderUnavailable(f"{self.name} is unavailable: {last_error}", max(1.0, self.breaker.retry_after()))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def init_payment_gateways(app) -> Dict[str, PaymentGateway]:
+    """Create a gateway per provider, or gateways onto the in-process fake when PAYMENT_FAKE_PROVIDER is set."""
+    config = app.config
+    if config.get('PAYMENT_FAKE_PROVIDER'):
+        from .fake_payment_provider import FakePaymentProvider
+        fake = FakePaymentProvider()
+        providers = {'stripe': fake, 'paypal': fake}
+    else:
+        from .paypal import PayPalProvider
+        from .stripe import StripeProvider
+        timeout = config.get('PAYMENT_PROVIDER_TIMEOUT', 10.0)
+        pool_size = config.get('PAYMENT_PROVIDER_WORKERS', 8)
+        providers = {
+            'stripe': StripeProvider(config['STRIPE_API_KEY'], timeout=timeout),
+            'paypal': PayPalProvider(
+                config.get('PAYPAL_MODE', 'sandbox'), config['PAYPAL_CLIENT_ID'], config['PAYPAL_CLIENT_SECRET'],
+                timeout=timeout, pool_size=pool_size
+            ),
+        }
+
+    gateways = {
+        name: PaymentGateway(
+            name, provider,
+            timeout=config.get('PAYMENT_PROVIDER_TIMEOUT', 10.0),
+            max_attempts=config.get('PAYMENT_PROVIDER_MAX_ATTEMPTS', 3),
+            workers=config.get('PAYMENT_PROVIDER_WORKERS', 8),
+            breaker=CircuitBreaker(
+                failure_threshold=config.get('PAYMENT_CIRCUIT_FAILURES', 5),
+                reset_timeout=config.get('PAYMENT_CIRCUIT_RESET_SECONDS', 30.0),
+            ),
+        )
+        for name, provider in providers.items()
+    }
+    app.extensions['payment_gateways'] = gateways
+    return gateways
+
+
+def get_payment_gateway(name: str) -> PaymentGateway:
+    return current_app.extensions['payment_gateways'][name]
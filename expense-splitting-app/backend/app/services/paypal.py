@@ -0,0 +1,86 @@
+import paypalrestsdk # type: ignore
+from paypalrestsdk import exceptions as paypal_exceptions # type: ignore
+import requests # type: ignore
+from requests.adapters import HTTPAdapter # type: ignore
+from ..utils.money import from_minor_units, to_minor_units
+from .payment_gateway import PaymentProviderError, ProviderTransientError
+
+_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, paypal_exceptions.ServerError)
+
+
+class PooledPayPalApi(paypalrestsdk.Api):
+    """paypalrestsdk.Api that reuses pooled connections and never waits longer than the timeout."""
+
+    def __init__(self, timeout: float, pool_size: int, **options):
+        super().__init__(**options)
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=2, pool_maxsize=pool_size))
+
+    def http_call(self, url, method, **kwargs):
+        response = self.session.request(method, url, proxies=self.proxies, timeout=self.timeout, **kwargs)
+        return self.handle_response(response, response.content.decode('utf-8'))
+
+
+class PayPalProvider:
+    """PayPal calls made by the payment gateway."""
+
+    def __init__(self, mode: str, client_id: str, client_secret: str, timeout: float = 10.0, pool_size: int = 8):
+        self.api = PooledPayPalApi(
+            timeout=timeout, pool_size=pool_size,
+            mode=mode, client_id=client_id, client_secret=client_secret
+        )
+
+    def create_payment(self, amount: int, currency: str, user_id: int, return_url: str, cancel_url: str,
+                       idempotency_key: str) -> dict:
+        total = f"{from_minor_units(amount):.2f}"
+        payment = paypalrestsdk.Payment({
+            'intent': 'sale',
+            'payer': {'payment_method': 'paypal'},
+            'transactions': [{
+                'amount': {'total': total, 'currency': currency},
+                # The payer's id travels as the item sku so the success callback can find the payment
+                'item_list': {'items': [{
+                    'name': 'Settlement', 'sku': str(user_id), 'price': total, 'currency': currency, 'quantity': 1
+                }]},
+                'description': 'Payment for Expense Splitting App'
+            }],
+            'redirect_urls': {'return_url': return_url, 'cancel_url': cancel_url}
+        }, api=self.api)
+        # Sent as PayPal-Request-Id, so a retried create returns the original payment
+        payment.request_id = idempotency_key
+
+        try:
+            created = payment.create()
+        except _TRANSIENT_ERRORS as e:
+            raise ProviderTransientError(str(e)) from e
+        except paypal_exceptions.ConnectionError as e:
+            raise PaymentProviderError(str(e)) from e
+        if not created:
+            raise PaymentProviderError(str(payment.error))
+
+        for link in payment.links:
+            if link.rel == 'approval_url':
+                return {'id': payment.id, 'approval_url': link.href}
+        raise PaymentProviderError('PayPal did not return an approval URL')
+
+    def execute_payment(self, payment_id: str, payer_id: str) -> dict:
+        try:
+            payment = paypalrestsdk.Payment.find(payment_id, api=self.api)
+            attributes = paypalrestsdk.Resource({'payer_id': payer_id}, api=self.api)
+            # One request id per payment, so a retried execute can't charge twice
+            attributes.request_id = f'execute-{payment_id}'
+            executed = payment.post('execute', attributes, payment)
+        except _TRANSIENT_ERRORS as e:
+            raise ProviderTransientError(str(e)) from e
+        except paypal_exceptions.ConnectionError as e:
+            raise PaymentProviderError(str(e)) from e
+        if not executed:
+            raise PaymentProviderError(str(payment.error))
+
+        transaction = payment.transactions[0]
+        return {
+            'id': payment.id,
+            'user_id': int(transaction.item_list.items[0].sku),
+            'amount': to_minor_units(transaction.amount.total),
+        }
@@ -1,20 +1,24 @@
-import os
-from werkzeug.utils import secure_filename # type: ignore
-from ..models import User
+from ..models import Group, GroupMember, User
 from .. import db
-from flask import current_app # type: ignore
+from flask import abort, current_app # type: ignore
+from ..utils.cache import invalidate
+from ..utils.image_store import get_image_store
+from .user_service import UserService
 
 class ProfileService:
 
     @staticmethod
     def get_user_profile(user_id):
-        user = User.query.get_or_404(user_id)
+        # Shares the cached user record with UserService.get_user_by_id
+        user = UserService.get_user_by_id(user_id)
+        if user is None:
+            abort(404)
         return {
-            'id': user.id,
-            'username': user.username,
-            'email': user.email,
-            'full_name': user.full_name,
-            'profile_image': user.profile_image
+            'id': user['id'],
+            'username': user['username'],
+            'email': user['email'],
+            'full_name': user['full_name'],
+            'profile_image': user['profile_image']
         }
 
     @staticmethod
@@ -31,18 +35,31 @@ class ProfileService:
             if not ProfileService.allowed_file(profile_image.filename):
                 raise ValueError("Invalid file type. Allowed types are: " + ", ".join(current_app.config['ALLOWED_EXTENSIONS']))
 
-            filename = secure_filename(profile_image.filename)
-            image_path = os.path.join(current_app.config['UPLOAD_FOLDER'], filename)
+            # Stored under its content hash, so uploads with the same filename never collide
+            store = get_image_store()
             try:
-                profile_image.save(image_path)  # Save the profile image
-                image_url = f"/uploads/{filename}"  # Create the image URL
+                stored_name = store.save(profile_image.stream, profile_image.filename.rsplit('.', 1)[1])
+                image_url = store.display_url(stored_name)  # Points at a thumbnail when they can be made
+            except ValueError:
+                raise
             except Exception as e:
                 raise Exception('Failed to save the profile image: ' + str(e))
 
         if image_url:  # Update only if a new image was uploaded
             user.profile_image = image_url
 
+        group_ids = []
+        if db.session.is_modified(user):
+            # Member lists show the name, so the user's groups move to a new revision too
+            group_ids = [group_id for group_id, in db.session.query(GroupMember.group_id).filter_by(user_id=user.id)]
+            if group_ids:
+                Group.query.filter(Group.id.in_(group_ids)).update(
+                    {Group.ledger_version: Group.ledger_version + 1}, synchronize_session=False
+                )
+
         db.session.commit()  # Commit the changes to the database
+        invalidate('user', user.id)
+        invalidate('group_members', *group_ids)
         return user
 
     @staticmethod
@@ -0,0 +1,73 @@
+from flask import has_request_context # type: ignore
+from sqlalchemy import func # type: ignore
+from ..models import Group, GroupMember, User
+from .. import db
+from ..utils.conditional import request_versions
+
+
+class RevisionService:
+    """
+    Cheap version stamps for conditional GETs, one small indexed query each.
+
+    Each returns (version, last_modified) for conditional_get, or None when
+    the resource doesn't exist or the user can't see it.
+    """
+
+    @staticmethod
+    def user_version(user_id):
+        """A user's own record, versioned by its updated_at stamp."""
+        row = db.session.query(User.updated_at, User.created_at).filter(User.id == user_id).first()
+        if not row:
+            return None
+        stamp = row.updated_at or row.created_at
+        return (stamp.isoformat() if stamp else None), stamp
+
+    @staticmethod
+    def group_membership(user_id, group_id):
+        """
+        The group's ID and revision, and member_id if the user belongs to it, or None if there's no such group.
+
+        Read once per request, so a view that checks access after its
+        conditional GET check doesn't repeat the query.
+        """
+        def load():
+            return (
+                db.session.query(Group.id, Group.ledger_version, GroupMember.user_id.label('member_id'))
+                .outerjoin(GroupMember, (GroupMember.group_id == Group.id) & (GroupMember.user_id == user_id))
+                .filter(Group.id == group_id)
+                .first()
+            )
+
+        if not has_request_context():
+            return load()
+        versions = request_versions()
+        key = ('group', user_id, group_id)
+        if key not in versions:
+            versions[key] = load()
+        return versions[key]
+
+    @staticmethod
+    def group_version(user_id, group_id):
+        """A group the user belongs to, versioned by its revision (bumped by every write to the group)."""
+        if not group_id:
+            return None
+        membership = RevisionService.group_membership(user_id, group_id)
+        if membership is None or membership.member_id is None:
+            return None
+        return membership.ledger_version, None
+
+    @staticmethod
+    def user_groups_version(user_id):
+        """
+        Everything in a user's groups list.
+
+        Revisions only go up, so the number of groups and the sum of their
+        revisions changes whenever the user joins a group or any of them changes.
+        """
+        count, revisions = (
+            db.session.query(func.count(Group.id), func.sum(Group.ledger_version))
+            .join(GroupMember, GroupMember.group_id == Group.id)
+            .filter(GroupMember.user_id == user_id)
+            .one()
+        )
+        return (count, revisions or 0), None
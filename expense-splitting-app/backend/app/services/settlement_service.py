@@ -0,0 +1,89 @@
+import heapq
+from typing import Any, Dict, List
+from ..models import Group, GroupBalance, GroupMember, User
+from .. import db
+from ..utils.lru_cache import LRUCache
+from ..utils.money import from_minor_units
+
+# Settlement plans keyed by group ID, each stored with the ledger version it was built from
+_plan_cache = LRUCache(maxsize=2048)
+
+
+class SettlementService:
+
+    @staticmethod
+    def simplify_debts(balances: Dict[int, int]) -> List[Dict[str, Any]]:
+        """
+        Turn net balances in minor units into a short list of transfers that settles them.
+
+        Greedily matches the largest creditor with the largest debtor using two
+        heaps. Every transfer settles at least one member, so the plan never
+        has more than (members - 1) transfers and runs in O(n log n).
+        """
+        creditors = []
+        debtors = []
+        for user_id, balance in balances.items():
+            if balance > 0:
+                creditors.append((-balance, user_id))
+            elif balance < 0:
+                debtors.append((balance, user_id))
+
+        heapq.heapify(creditors)
+        heapq.heapify(debtors)
+
+        transfers = []
+        while creditors and debtors:
+            credit, creditor_id = heapq.heappop(creditors)
+            debt, debtor_id = heapq.heappop(debtors)
+            amount = min(-credit, -debt)
+
+            transfers.append({
+                'from_user_id': debtor_id,
+                'to_user_id': creditor_id,
+                'amount': amount
+            })
+
+            # Push back whoever still has something left to settle
+            if -credit > amount:
+                heapq.heappush(creditors, (credit + amount, creditor_id))
+            if -debt > amount:
+                heapq.heappush(debtors, (debt + amount, debtor_id))
+
+        return transfers
+
+    @staticmethod
+    def plan_transfers(balances: Dict[int, int], usernames: Dict[int, str]) -> List[Dict[str, Any]]:
+        """The settle-up plan for balances in minor units, as the API returns it: with usernames and amounts in major units."""
+        plan = SettlementService.simplify_debts(balances)
+        for transfer in plan:
+            transfer['from_username'] = usernames[transfer['from_user_id']]
+            transfer['to_username'] = usernames[transfer['to_user_id']]
+            transfer['amount'] = from_minor_units(transfer['amount'])
+        return plan
+
+    @staticmethod
+    def get_settlement_plan(user_id: int, group_id: int) -> List[Dict[str, Any]]:
+        """Return the cached settlement plan for a group, rebuilding it if the ledger changed."""
+        group = Group.query.get(group_id)
+        if not group:
+            raise ValueError("Group not found")
+
+        is_member = GroupMember.query.filter_by(user_id=user_id, group_id=group_id).first()
+        if not is_member:
+            raise PermissionError('User is not part of the selected group.')
+
+        cached = _plan_cache.get(group_id)
+        if cached and cached[0] == group.ledger_version:
+            return cached[1]
+
+        rows = (
+            db.session.query(GroupBalance.user_id, GroupBalance.balance, User.username)
+            .join(User, User.id == GroupBalance.user_id)
+            .filter(GroupBalance.group_id == group_id)
+            .all()
+        )
+        plan = SettlementService.plan_transfers(
+            {row.user_id: row.balance for row in rows}, {row.user_id: row.username for row in rows}
+        )
+        _plan_cache.set(group_id, (group.ledger_version, plan))
+        return plan
@@ -0,0 +1,37 @@
+import stripe # type: ignore
+from .payment_gateway import PaymentProviderError, ProviderTransientError
+
+# Errors where another attempt may succeed; everything else is the provider saying no
+_TRANSIENT_ERRORS = (stripe.APIConnectionError, stripe.RateLimitError, stripe.APIError)
+
+
+class StripeProvider:
+    """
+    Stripe calls made by the payment gateway.
+
+    Uses its own StripeClient rather than the module-level API key. The
+    requests-based HTTP client keeps one keep-alive session per gateway
+    thread, and every HTTP call is bounded by the timeout. Retries are left
+    to the gateway, so the SDK's own retries are turned off.
+    """
+
+    def __init__(self, api_key: str, timeout: float = 10.0):
+        self._client = stripe.StripeClient(
+            api_key,
+            http_client=stripe.RequestsClient(timeout=timeout),
+            max_network_retries=0,
+        )
+        # Newer SDKs moved the services under the v1 namespace
+        self._services = getattr(self._client, 'v1', self._client)
+
+    def create_payment_intent(self, amount: int, currency: str, metadata: dict, idempotency_key: str) -> dict:
+        try:
+            intent = self._services.payment_intents.create(
+                params={'amount': amount, 'currency': currency, 'metadata': metadata},
+                options={'idempotency_key': idempotency_key},
+            )
+        except _TRANSIENT_ERRORS as e:
+            raise ProviderTransientError(str(e)) from e
+        except stripe.StripeError as e:
+            raise PaymentProviderError(e.user_message or str(e)) from e
+        return {'id': intent.id, 'client_secret': intent.client_secret}
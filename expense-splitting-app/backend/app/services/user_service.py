@@ -1,11 +1,17 @@
-from werkzeug.security import generate_password_hash, check_password_hash # type: ignore
 import jwt # type: ignore
 from datetime import datetime, timedelta
 from ..models import User
 from .. import db
 from flask import current_app # type: ignore
 import re
+import uuid
 from sqlalchemy.exc import IntegrityError  # type: ignore # For specific exception handling
+from ..utils.pagination import paginate_by_cursor
+from ..utils.password_hasher import get_password_hasher
+from ..utils.availability_index import get_availability_index
+from ..utils.cache import cached
+from ..utils.user_search import SEARCH_MIN_LENGTH, fts_phrase, like_pattern
+from sqlalchemy import or_, text  # type: ignore
 
 class UserService:
 
@@ -20,7 +26,7 @@ class UserService:
             raise ValueError("Invalid email format")
         
         # Check if the email is already registered
-        if User.query.filter_by(email=email).first():
+        if UserService.is_email_registered(email):
             raise ValueError("Email is already registered")
         
     #Username validation method
@@ -29,9 +35,25 @@ class UserService:
             raise ValueError("Username must be between 3 and 50 characters.")
         if not re.match(r'^[a-zA-Z0-9_-]+$', username):
             raise ValueError("Username can only contain letters, numbers, hyphens, and underscores.")
-        if User.query.filter_by(username=username).first():
+        if UserService.is_username_taken(username):
             raise ValueError("Username is already taken")
 
+    @staticmethod
+    def is_username_taken(username):
+        """Check a username, skipping the query when the availability index rules it out."""
+        index = get_availability_index()
+        if index is not None and not index.may_contain_username(username):
+            return False
+        return db.session.query(User.id).filter_by(username=username).first() is not None
+
+    @staticmethod
+    def is_email_registered(email):
+        """Check an email, skipping the query when the availability index rules it out."""
+        index = get_availability_index()
+        if index is not None and not index.may_contain_email(email):
+            return False
+        return db.session.query(User.id).filter_by(email=email).first() is not None
+
     #Password validation  
     def is_valid_password(password):
         if len(password) < 5:
@@ -61,30 +83,46 @@ class UserService:
         UserService.is_valid_password(password)
         UserService.is_valid_full_name(full_name)
 
+        password_hash = get_password_hasher().hash(password)
+
         try:
             user = User(
                 username=username,
                 email=email,
-                password_hash=generate_password_hash(password),
+                password_hash=password_hash,
                 full_name=full_name,
                 profile_image=profile_image,
                 role='user'  # Set the default role to 'user'
             )
             db.session.add(user)
             db.session.commit()
-            return user
-        
+        # The unique constraints settle races the availability checks can't see
         except IntegrityError:
             db.session.rollback()
-            raise ValueError("Integrity error: Could not add user (duplicate entry or constraint violation)")
+            # Ask the database rather than the availability index, which may not have seen the other insert yet
+            if db.session.query(User.id).filter_by(username=username).first() is not None:
+                raise ValueError("Username is already taken")
+            if db.session.query(User.id).filter_by(email=email).first() is not None:
+                raise ValueError("Email is already registered")
+            raise ValueError("Could not add user (duplicate entry or constraint violation)")
         except Exception as e:
             db.session.rollback()
             raise Exception(f"Registration failed: {str(e)}")
 
+        index = get_availability_index()
+        if index is not None:
+            index.add(username, email)
+        return user
+
     @staticmethod
     def authenticate_user(username, password):
         user = User.query.filter_by(username=username).first()
-        if user and check_password_hash(user.password_hash, password):
+        hasher = get_password_hasher()
+        if user and hasher.verify(user.password_hash, password):
+            # Upgrade hashes made with an older method or cost while we have the password
+            if hasher.needs_rehash(user.password_hash):
+                user.password_hash = hasher.hash(password)
+                db.session.commit()
             return user
         return None
 
@@ -99,42 +137,88 @@ class UserService:
         token = jwt.encode({
             'sub': user_id,
             'role': role,
-            'exp': expiration_time
+            'exp': expiration_time,
+            'jti': uuid.uuid4().hex  # Lets a single token be revoked on logout
         }, current_app.config['SECRET_KEY'], algorithm='HS256')
 
         return token
     
     @staticmethod
     def get_user_by_id(user_id):
-        """Retrieve user information by user ID."""
-        user = User.query.get(user_id)
-        if not user:
-            return None  # User not found
-
-        # Return user information, excluding sensitive data
-        return {
-            'id': user.id,
-            'role': user.role,
-            'username': user.username,
-            'email': user.email,
-            'full_name': user.full_name,
-            'profile_image': user.profile_image
-    }
+        """Retrieve user information by user ID, through the cache."""
+        def load():
+            user = User.query.get(user_id)
+            if not user:
+                return None  # User not found
+
+            # Return user information, excluding sensitive data
+            return _user_info(user)
+
+        # Invalidated by profile updates and admin role changes
+        return cached('user', user_id, load)
 
     @staticmethod
-    def get_all_users():
-        """Retrieve all users from the database."""
-        users = User.query.all()  # Fetch all users from the database
-        return [
-            {
-                'id': user.id,
-                'role': user.role,
-                'username': user.username,
-                'email': user.email,
-                'full_name': user.full_name,
-                'profile_image': user.profile_image
-            }
-            for user in users
-        ]
-    
-    
\ No newline at end of file
+    def get_all_users(cursor=None, limit=None, include_total=False):
+        """Retrieve a page of users from the database, newest first."""
+        page = paginate_by_cursor(
+            User.query, User.created_at, User.id,
+            cursor=cursor, limit=limit,
+            include_total=include_total, total_cache_key=('users',)
+        )
+        page.items = [_user_info(user) for user in page.items]
+        return page
+
+    @staticmethod
+    def search_users(term, cursor=None, limit=None, include_total=False):
+        """
+        Retrieve a page of users whose username or full name contains term, newest first.
+
+        Matches come from the full-text index (FTS5 on SQLite, FULLTEXT on
+        MySQL) rather than a scan of the users table. Raises ValueError for
+        terms shorter than SEARCH_MIN_LENGTH, which the index can't match.
+        """
+        term = (term or '').strip()
+        if len(term) < SEARCH_MIN_LENGTH:
+            raise ValueError(f"Search term must be at least {SEARCH_MIN_LENGTH} characters")
+
+        dialect = db.engine.dialect.name
+        if dialect == 'sqlite':
+            matches = text("SELECT rowid FROM users_fts WHERE users_fts MATCH :term").bindparams(term=fts_phrase(term))
+            query = User.query.filter(User.id.in_(matches.columns(rowid=db.Integer)))
+        elif dialect == 'mysql':
+            query = User.query.filter(
+                text("MATCH (users.username, users.full_name) AGAINST (:term IN BOOLEAN MODE)")
+                .bindparams(term='"' + term.replace('"', ' ') + '"')
+            )
+        else:
+            # No full-text index on other databases, so this scans
+            pattern = like_pattern(term)
+            query = User.query.filter(or_(
+                User.username.ilike(pattern, escape='\\'), User.full_name.ilike(pattern, escape='\\')
+            ))
+
+        page = paginate_by_cursor(
+            query, User.created_at, User.id,
+            cursor=cursor, limit=limit,
+            include_total=include_total, total_cache_key=('users', 'search', term.lower())
+        )
+        page.items = [_user_info(user) for user in page.items]
+        return page
+
+    @staticmethod
+    def get_users_by_ids(user_ids):
+        """Retrieve the given users in one query, in the order asked for. Unknown IDs are left out."""
+        users = {user.id: user for user in User.query.filter(User.id.in_(set(user_ids)))}
+        return [_user_info(users[user_id]) for user_id in dict.fromkeys(user_ids) if user_id in users]
+
+
+def _user_info(user):
+    """Public user fields, leaving out the password hash."""
+    return {
+        'id': user.id,
+        'role': user.role,
+        'username': user.username,
+        'email': user.email,
+        'full_name': user.full_name,
+        'profile_image': user.profile_image
+    }
@@ -0,0 +1,235 @@
+from collections import defaultdict
+from datetime import datetime
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+from flask import current_app # type: ignore
+from sqlalchemy.exc import IntegrityError, OperationalError # type: ignore
+from ..models import Balance, Payment, WebhookEvent
+from .. import db
+from .balance_service import BalanceService
+
+
+def _stripe_payment_succeeded(intent: Dict[str, Any], group_deltas, user_deltas) -> None:
+    user_id = int(intent['metadata']['user_id'])
+    amount = int(intent['amount']) # already in cents
+
+    # One lookup on the provider reference index, however many payments there are
+    payment = Payment.query.filter_by(payment_method='stripe', provider_reference=intent['id']).first()
+    if payment and payment.payment_status == 'pending':
+        payment.payment_status = 'success'
+        if payment.group_id:
+            for member_id, delta in BalanceService.payment_deltas(payment).items():
+                group_deltas[payment.group_id][member_id] += delta
+        # Only when this event completes the payment, so a second event for the same intent changes nothing
+        user_deltas[user_id] -= amount
+
+
+# Events we act on, by (provider, event type); anything else is acknowledged and dropped
+HANDLERS = {
+    ('stripe', 'payment_intent.succeeded'): _stripe_payment_succeeded,
+}
+
+
+class WebhookService:
+
+    @staticmethod
+    def record_event(provider: str, event_id: str, event_type: str, payload: Dict[str, Any]) -> bool:
+        """
+        Store a webhook delivery in the inbox.
+
+        Returns False when the provider already delivered this event; retries
+        are acknowledged without being stored again.
+        """
+        try:
+            db.session.add(WebhookEvent(
+                provider=provider, event_id=event_id, event_type=event_type,
+                payload=json.dumps(payload), status='pending'
+            ))
+            db.session.commit()
+            return True
+        except IntegrityError:
+            db.session.rollback()
+            return False
+
+    @staticmethod
+    def process_pending(batch_size: int = 100) -> int:
+        """
+        Apply up to batch_size pending events, oldest first, in one transaction.
+
+        Balance changes from the whole batch are summed first, so each group
+        ledger and user balance is written once per batch rather than once
+        per event. Events with a malformed payload are marked failed and
+        don't hold up the rest. If the batch fails for another reason, its
+        events are applied one at a time, and the one that still fails is
+        marked failed, so a single bad event can't block the inbox. Returns
+        the number of events handled.
+        """
+        events = WebhookService._pending_events().limit(batch_size).all()
+        if not events:
+            return 0
+
+        try:
+            WebhookService._apply(events)
+        except OperationalError:
+            # The database is unavailable or locked; the batch stays pending for the next pass
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            logging.warning(f"Webhook batch failed, applying its events one at a time: {e}")
+            for event_id in [event.id for event in events]:
+                WebhookService._apply_one(event_id)
+
+        return len(events)
+
+    @staticmethod
+    def _pending_events():
+        query = WebhookEvent.query.filter_by(status='pending').order_by(WebhookEvent.id)
+        if db.engine.dialect.name in ('postgresql', 'mysql'):
+            # Several workers can drain the inbox without picking up the same events
+            query = query.with_for_update(skip_locked=True)
+        return query
+
+    @staticmethod
+    def _apply(events) -> None:
+        group_deltas = defaultdict(lambda: defaultdict(int))
+        user_deltas = defaultdict(int)
+        now = datetime.utcnow()
+        for event in events:
+            handler = HANDLERS.get((event.provider, event.event_type))
+            try:
+                if handler:
+                    handler(json.loads(event.payload), group_deltas, user_deltas)
+                event.status = 'processed'
+            except (KeyError, TypeError, ValueError) as e:
+                WebhookService._mark_failed(event, e, now)
+            event.processed_at = now
+
+        for group_id, deltas in group_deltas.items():
+            BalanceService.apply_deltas(group_id, dict(deltas))
+        WebhookService._apply_user_balances(user_deltas)
+
+        # Payment statuses, group ledgers, user balances and event statuses are committed together
+        db.session.commit()
+
+    @staticmethod
+    def _apply_one(event_id: int) -> None:
+        """Apply a single event from a failed batch, marking it failed if it fails on its own too."""
+        event = WebhookService._pending_events().filter(WebhookEvent.id == event_id).first()
+        if event is None:
+            return  # Handled by another worker meanwhile
+        try:
+            WebhookService._apply([event])
+        except OperationalError:
+            db.session.rollback()
+            raise
+        except Exception as e:
+            db.session.rollback()
+            event = db.session.get(WebhookEvent, event_id)
+            WebhookService._mark_failed(event, e, datetime.utcnow())
+            db.session.commit()
+
+    @staticmethod
+    def _mark_failed(event, error: Exception, now: datetime) -> None:
+        event.status = 'failed'
+        event.error = f"{type(error).__name__}: {error}"
+        event.processed_at = now
+        logging.warning(f"Webhook event {event.provider}:{event.event_id} failed: {event.error}")
+
+    @staticmethod
+    def _apply_user_balances(user_deltas: Dict[int, int]) -> None:
+        user_deltas = {user_id: delta for user_id, delta in user_deltas.items() if delta}
+        if not user_deltas:
+            return
+
+        balances = {}
+        for balance in Balance.query.filter(Balance.user_id.in_(user_deltas)).order_by(Balance.id):
+            balances.setdefault(balance.user_id, balance)
+
+        for user_id, delta in user_deltas.items():
+            if user_id in balances:
+                balances[user_id].balance += delta
+            else:
+                db.session.add(Balance(user_id=user_id, balance=delta))
+
+
+class WebhookInboxWorker:
+    """
+    Background thread that drains the webhook inbox.
+
+    Wakes every poll_interval seconds, or straight away when notified of a
+    new event, and processes batches until the inbox is empty. The thread
+    is started per process, so forked web workers each run their own.
+    """
+
+    def __init__(self, app, batch_size: int = 100, poll_interval: float = 1.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive() and self._pid == os.getpid()
+
+    def ensure_started(self) -> None:
+        if self._running():
+            return
+        with self._lock:
+            if self._running():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='webhook-inbox', daemon=True)
+            self._thread.start()
+
+    def notify(self) -> None:
+        self.ensure_started()
+        self._wake.set()
+
+    def drain(self) -> int:
+        """Process batches until the inbox is empty. Returns the number of events handled."""
+        handled = 0
+        with self.app.app_context():
+            while True:
+                count = WebhookService.process_pending(self.batch_size)
+                handled += count
+                if count < self.batch_size:
+                    return handled
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                # Left pending, so the batch is retried on the next pass
+                logging.exception(f"Webhook inbox batch failed: {e}")
+
+
+def init_webhook_worker(app) -> Optional[WebhookInboxWorker]:
+    """Create the app's inbox worker, started by the first request each process serves."""
+    if not app.config.get('WEBHOOK_WORKER_ENABLED', True):
+        return None
+
+    worker = WebhookInboxWorker(
+        app,
+        batch_size=app.config.get('WEBHOOK_BATCH_SIZE', 100),
+        poll_interval=app.config.get('WEBHOOK_POLL_SECONDS', 1.0),
+    )
+    app.extensions['webhook_worker'] = worker
+
+    # Not started here, so CLI commands like `flask db upgrade` don't spawn it
+    app.before_request(worker.ensure_started)
+    return worker
+
+
+def notify_webhook_worker() -> None:
+    worker = current_app.extensions.get('webhook_worker')
+    if worker is not None:
+        worker.notify()
@@ -1,9 +1,36 @@
 # In app/utils/auth_utils.py
 from functools import wraps
+import hashlib
 from flask import request, jsonify, current_app # type: ignore
 import jwt # type: ignore
 import time
-from typing import Optional, Union
+from typing import Any, Dict, Optional, Union
+from . import token_blocklist
+from .lru_cache import LRUCache
+
+# Recently verified tokens keyed by digest, so hot clients skip the HS256 check
+TOKEN_CACHE_SIZE = 10000
+_token_cache = LRUCache(maxsize=TOKEN_CACHE_SIZE)
+
+# Where the verified identity is kept for the rest of the request
+_IDENTITY_KEY = 'splitit.identity'
+
+TOKEN_EXPIRED = 'expired'
+TOKEN_INVALID = 'invalid'
+
+
+class Identity:
+    """The verified claims of the bearer token on the current request."""
+
+    __slots__ = ('user_id', 'role', 'jti', 'expires_at', 'claims')
+
+    def __init__(self, claims: Dict[str, Any], digest: bytes):
+        self.claims = claims
+        self.user_id = claims.get('sub')
+        self.role = claims.get('role')
+        # Tokens issued before JTIs were added are identified by their digest
+        self.jti = claims.get('jti') or digest.hex()
+        self.expires_at = claims.get('exp')
 
 def decode_token(token: str) -> Union[dict, str]:
     """
@@ -26,6 +53,68 @@ def decode_token(token: str) -> Union[dict, str]:
     except jwt.InvalidTokenError:
         return None
 
+def _token_digest(token: str) -> bytes:
+    # Include the signing key so a token is never trusted under a different key
+    key = str(current_app.config['SECRET_KEY']).encode()
+    return hashlib.sha256(key + b'\0' + token.encode()).digest()
+
+def verify_token(token: str) -> Union[Identity, str]:
+    """
+    Verify a bearer token, using the cache of recently verified tokens.
+
+    Returns an Identity, TOKEN_EXPIRED or TOKEN_INVALID. Revoked tokens are
+    treated as invalid even when they are still cached.
+    """
+    digest = _token_digest(token)
+    identity = _token_cache.get(digest)
+
+    if identity is None:
+        decoded_result = decode_token(token)
+        if decoded_result == 'expired':
+            return TOKEN_EXPIRED
+        if not isinstance(decoded_result, dict):
+            return TOKEN_INVALID
+
+        identity = Identity(decoded_result, digest)
+        # Only cache tokens that expire, and never beyond their expiry
+        if isinstance(identity.expires_at, (int, float)):
+            remaining = identity.expires_at - time.time()
+            if remaining > 0:
+                _token_cache.set(digest, identity, ttl=remaining)
+    elif identity.expires_at <= time.time():
+        _token_cache.pop(digest)
+        return TOKEN_EXPIRED
+
+    if token_blocklist.is_revoked(identity.jti):
+        _token_cache.pop(digest)
+        return TOKEN_INVALID
+
+    return identity
+
+def forget_token(token: str) -> None:
+    """Drop a token from the verified-token cache, e.g. after logout."""
+    _token_cache.pop(_token_digest(token))
+
+def get_bearer_token() -> Optional[str]:
+    """Return the token from a 'Bearer <token>' Authorization header."""
+    auth_header = request.headers.get('Authorization')
+    if not auth_header:
+        return None
+    parts = auth_header.split(" ")
+    return parts[1] if len(parts) > 1 and parts[1] else None
+
+def get_current_identity() -> Optional[Union[Identity, str]]:
+    """
+    Return the identity of the current request, verifying the token only once.
+
+    Returns an Identity, TOKEN_EXPIRED or TOKEN_INVALID, or None when the
+    request carries no token.
+    """
+    if _IDENTITY_KEY not in request.environ:
+        token = get_bearer_token()
+        request.environ[_IDENTITY_KEY] = verify_token(token) if token else None
+    return request.environ[_IDENTITY_KEY]
+
 def get_current_user_id() -> Optional[Union[int, str]]:
     """
     Extract user ID from JWT token in the request header.
@@ -35,24 +124,12 @@ def get_current_user_id() -> Optional[Union[int, str]]:
         'expired': If token is expired
         None: If no token or invalid token
     """
-    auth_header = request.headers.get('Authorization')
-    if not auth_header:
-        return None
-
-    try:
-        # Assumes 'Bearer <token>' format
-        token = auth_header.split(" ")[1]
-        decoded_result = decode_token(token)
-        
-        if decoded_result == 'expired':
-            return 'expired'
-        
-        if isinstance(decoded_result, dict):
-            return decoded_result.get('sub')
-        
-        return None
-    except (IndexError, ValueError):
-        return None
+    identity = get_current_identity()
+    if identity == TOKEN_EXPIRED:
+        return 'expired'
+    if isinstance(identity, Identity):
+        return identity.user_id
+    return None
 
 def login_required(f):
     """
@@ -76,18 +153,15 @@ def login_required(f):
 def admin_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get('Authorization')
-        if not auth_header:
+        identity = get_current_identity()
+        if identity is None:
             return jsonify({'error': 'Authentication required'}), 401
 
-        try:
-            token = auth_header.split(" ")[1]
-            decoded_token = jwt.decode(token, current_app.config['SECRET_KEY'], algorithms=["HS256"])
-            if decoded_token.get('role') != 'admin':
-                return jsonify({'error': 'Admin access required'}), 403
-        except jwt.ExpiredSignatureError:
+        if identity == TOKEN_EXPIRED:
             return jsonify({'error': 'Token expired, please log in again'}), 401
-        except jwt.InvalidTokenError:
+        if identity == TOKEN_INVALID:
             return jsonify({'error': 'Invalid token, please log in again'}), 401
+        if identity.role != 'admin':
+            return jsonify({'error': 'Admin access required'}), 403
         return f(*args, **kwargs)
     return decorated_function
\ No newline at end of file
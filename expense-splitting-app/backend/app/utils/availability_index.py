@@ -0,0 +1,113 @@
+import threading
+import time
+from typing import Optional
+from flask import current_app, has_app_context # type: ignore
+from .bloom import BloomFilter
+
+
+def normalize(value: str) -> str:
+    """The form usernames and emails are indexed under, so case and stray spaces can't dodge a hit."""
+    return value.strip().lower()
+
+
+class AvailabilityIndex:
+    """
+    Per-worker bloom filters of the usernames and emails already in use.
+
+    A miss means the name is definitely free, which answers most
+    availability checks from the registration form without a query. Only
+    possible hits are confirmed with the database. Users registered since
+    the last refresh are added incrementally by ID; a periodic full rebuild
+    catches anything that sequence misses, such as IDs reused after a
+    delete. The unique constraints stay the final word at insert time.
+    """
+
+    def __init__(self, capacity: int = 100000, refresh_interval: float = 2.0, rebuild_interval: float = 300.0):
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._usernames = BloomFilter(capacity)
+        self._emails = BloomFilter(capacity)
+        self._cursor = 0
+        self._refreshed_at: Optional[float] = None
+        self._rebuilt_at: Optional[float] = None
+
+    def add(self, username: str, email: str) -> None:
+        """Record a user registered by this worker, so it is taken here straight away."""
+        with self._lock:
+            self._usernames.add(normalize(username))
+            self._emails.add(normalize(email))
+
+    def may_contain_username(self, username: str) -> bool:
+        self._refresh_if_due()
+        return normalize(username) in self._usernames
+
+    def may_contain_email(self, email: str) -> bool:
+        self._refresh_if_due()
+        return normalize(email) in self._emails
+
+    def _refresh_if_due(self) -> None:
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+
+            if (self._rebuilt_at is None or now - self._rebuilt_at >= self.rebuild_interval
+                    or self._usernames.is_saturated or self._emails.is_saturated):
+                self._rebuild()
+                self._rebuilt_at = now
+            else:
+                self._cursor = self._load(self._usernames, self._emails, self._cursor)
+
+            self._refreshed_at = now
+
+    def _rebuild(self) -> None:
+        from .. import db
+        from ..models import User
+
+        # Leave room to grow before the next rebuild
+        capacity = max(self.capacity, 2 * (db.session.query(db.func.count(User.id)).scalar() or 0))
+        usernames, emails = BloomFilter(capacity), BloomFilter(capacity)
+        self._cursor = self._load(usernames, emails, 0)
+        self._usernames, self._emails = usernames, emails
+
+    def _load(self, usernames: BloomFilter, emails: BloomFilter, cursor: int) -> int:
+        from .. import db
+        from ..models import User
+
+        rows = (
+            db.session.query(User.id, User.username, User.email)
+            .filter(User.id > cursor)
+            .order_by(User.id)
+            .yield_per(1000)
+        )
+        for user_id, username, email in rows:
+            usernames.add(normalize(username))
+            emails.add(normalize(email))
+            cursor = user_id
+        return cursor
+
+
+def init_availability_index(app) -> Optional[AvailabilityIndex]:
+    """Create the app's availability index, loaded from the database on first use."""
+    if not app.config.get('AVAILABILITY_INDEX_ENABLED', True):
+        return None
+
+    index = AvailabilityIndex(
+        capacity=app.config.get('AVAILABILITY_INDEX_CAPACITY', 100000),
+        refresh_interval=app.config.get('AVAILABILITY_INDEX_REFRESH_SECONDS', 2.0),
+        rebuild_interval=app.config.get('AVAILABILITY_INDEX_REBUILD_SECONDS', 300.0),
+    )
+    app.extensions['availability_index'] = index
+    return index
+
+
+def get_availability_index() -> Optional[AvailabilityIndex]:
+    """The app's index, or None when there isn't one and every check should go to the database."""
+    if has_app_context():
+        return current_app.extensions.get('availability_index')
+    return None
@@ -0,0 +1,206 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Callable, Dict, Iterable, Optional
+from flask import current_app, has_app_context # type: ignore
+from .lru_cache import LRUCache
+
+
+class MemoryCacheBackend:
+    """
+    Entries held in this process only, in a bounded LRU with a time-to-live.
+
+    Each worker has its own copy, so an invalidation in one worker reaches
+    the others only when their entries expire. Keep the TTL short when
+    running several workers, or use the SQLite backend.
+    """
+
+    name = 'memory'
+
+    def __init__(self, maxsize: int = 10000):
+        self._entries = LRUCache(maxsize=maxsize)
+
+    def get(self, key: str) -> Optional[str]:
+        return self._entries.get(key)
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        self._entries.set(key, value, ttl=ttl)
+
+    def delete(self, keys: Iterable[str]) -> None:
+        for key in keys:
+            self._entries.pop(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+class SqliteCacheBackend:
+    """
+    Entries in a SQLite file that every worker on the host opens.
+
+    A local stand-in for a shared cache like Redis: an invalidation reaches
+    every worker at once, and each lookup is one primary key read.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str, prune_interval: float = 60.0):
+        self.path = path
+        self._local = threading.local()
+        self._prune_interval = prune_interval
+        self._last_prune = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and per process, since forked workers can't share one
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS cache_entries ('
+                'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key: str) -> Optional[str]:
+        row = self._connection().execute(
+            'SELECT value FROM cache_entries WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        now = time.time()
+        conn = self._connection()
+        conn.execute(
+            'INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, ?) '
+            'ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at',
+            (key, value, now + ttl)
+        )
+        if now - self._last_prune >= self._prune_interval:
+            self._last_prune = now
+            conn.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,))
+
+    def delete(self, keys: Iterable[str]) -> None:
+        self._connection().executemany('DELETE FROM cache_entries WHERE key = ?', [(key,) for key in keys])
+
+    def clear(self) -> None:
+        self._connection().execute('DELETE FROM cache_entries')
+
+
+class Cache:
+    """
+    Read-through cache for hot lookups, in front of a memory or SQLite backend.
+
+    Values are stored as JSON, so every backend hands back a fresh copy of
+    plain data and never a live ORM object. Writers invalidate the keys they
+    change after committing; the TTL bounds how long a value can stay stale
+    if a reader races a writer. Backend errors are logged and treated as
+    misses, so a broken cache never fails a request.
+    """
+
+    def __init__(self, backend, ttl: float = 60.0):
+        self.backend = backend
+        self.ttl = ttl
+        self._counts: Dict[str, Dict[str, int]] = defaultdict(lambda: {'hits': 0, 'misses': 0, 'invalidations': 0})
+        self._lock = threading.Lock()
+
+    def _count(self, namespace: str, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self._counts[namespace][counter] += n
+
+    def get_or_load(self, namespace: str, key: Any, loader: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """The cached value for namespace:key, or loader()'s result, which is cached unless it's None."""
+        cache_key = f'{namespace}:{key}'
+        try:
+            raw = self.backend.get(cache_key)
+        except sqlite3.Error as e:
+            logging.warning(f"Cache read failed for {cache_key}: {e}")
+            raw = None
+        if raw is not None:
+            self._count(namespace, 'hits')
+            return json.loads(raw)
+
+        self._count(namespace, 'misses')
+        value = loader()
+        if value is not None:
+            try:
+                self.backend.set(cache_key, json.dumps(value), self.ttl if ttl is None else ttl)
+            except sqlite3.Error as e:
+                logging.warning(f"Cache write failed for {cache_key}: {e}")
+        return value
+
+    def invalidate(self, namespace: str, *keys: Any) -> None:
+        """Drop namespace:key for each key, so the next read loads it again."""
+        if not keys:
+            return
+        try:
+            self.backend.delete([f'{namespace}:{key}' for key in keys])
+        except sqlite3.Error as e:
+            logging.warning(f"Cache invalidation failed for {namespace}: {e}")
+        self._count(namespace, 'invalidations', len(keys))
+
+    def clear(self) -> None:
+        self.backend.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit, miss and invalidation counts since this worker started, overall and per namespace."""
+        with self._lock:
+            namespaces = {namespace: dict(counts) for namespace, counts in self._counts.items()}
+        for counts in namespaces.values():
+            lookups = counts['hits'] + counts['misses']
+            counts['hit_rate'] = round(counts['hits'] / lookups, 4) if lookups else None
+        hits = sum(counts['hits'] for counts in namespaces.values())
+        misses = sum(counts['misses'] for counts in namespaces.values())
+        return {
+            'backend': self.backend.name,
+            'ttl_seconds': self.ttl,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+            'namespaces': namespaces,
+        }
+
+
+def create_cache_backend(app):
+    if app.config.get('CACHE_BACKEND', 'memory') == 'sqlite':
+        path = app.config.get('CACHE_PATH') or os.path.join(app.instance_path, 'cache.db')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SqliteCacheBackend(path)
+    return MemoryCacheBackend(maxsize=app.config.get('CACHE_MAX_ENTRIES', 10000))
+
+
+def init_cache(app) -> Optional[Cache]:
+    """Set up the app's read-through cache, unless CACHE_ENABLED is off."""
+    if not app.config.get('CACHE_ENABLED', True):
+        return None
+    cache = Cache(create_cache_backend(app), ttl=app.config.get('CACHE_TTL_SECONDS', 60))
+    app.extensions['cache'] = cache
+    return cache
+
+
+def get_cache() -> Optional[Cache]:
+    if not has_app_context():
+        return None
+    return current_app.extensions.get('cache')
+
+
+def cached(namespace: str, key: Any, loader: Callable[[], Any]) -> Any:
+    """loader() through the app's cache, or straight to loader() when caching is off."""
+    cache = get_cache()
+    if cache is None:
+        return loader()
+    return cache.get_or_load(namespace, key, loader)
+
+
+def invalidate(namespace: str, *keys: Any) -> None:
+    """Drop cached values after a write. A no-op when caching is off."""
+    cache = get_cache()
+    if cache is not None:
+        cache.invalidate(namespace, *keys)
@@ -0,0 +1,81 @@
+from datetime import datetime
+from functools import wraps
+import hashlib
+from typing import Any, Callable, Optional, Tuple
+from flask import current_app, g, make_response, request # type: ignore
+
+# What a validator returns: something that changes whenever the resource
+# does, and optionally when it last changed. None skips conditional handling.
+Version = Optional[Tuple[Any, Optional[datetime]]]
+
+
+def make_etag(user_id, version) -> str:
+    """An ETag for this user's view of the requested URL at the given version."""
+    # Query parameters are part of the key, so each page of a list gets its own tag
+    source = f"{request.full_path}|{user_id}|{version!r}"
+    return hashlib.blake2b(source.encode(), digest_size=12).hexdigest()
+
+
+def _not_modified(etag: str, last_modified: Optional[datetime]) -> bool:
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole seconds only
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def request_versions() -> dict:
+    """Versions read during this request, so the view can reuse what its validator read."""
+    return g.setdefault('request_versions', {})
+
+
+def conditional_get(validator: Callable[[Any], Version]):
+    """
+    Answer unchanged GET requests with 304 Not Modified before running the view.
+
+    validator(user_id) reads a cheap version of the resource, such as a
+    revision counter or updated_at stamp, in one small query. When the
+    client already holds that version the view isn't run at all; otherwise
+    the view's response is tagged with ETag and Last-Modified headers.
+    Goes under @login_required, which supplies user_id.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not current_app.extensions.get('conditional_get'):
+                return view(*args, **kwargs)
+
+            user_id = kwargs.get('user_id')
+            version = validator(user_id)
+            if version is None:
+                # e.g. no such group, or no access: let the view answer
+                return view(*args, **kwargs)
+
+            token, last_modified = version
+            etag = make_etag(user_id, token)
+            if _not_modified(etag, last_modified):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+
+            response.set_etag(etag)
+            if last_modified is not None:
+                response.last_modified = last_modified
+            # Private to this user, and always revalidated
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return wrapper
+    return decorator
+
+
+def init_conditional_get(app) -> None:
+    """Turn on conditional GET handling for views decorated with conditional_get."""
+    app.extensions['conditional_get'] = app.config.get('CONDITIONAL_GET_ENABLED', True)
+
+    @app.before_request
+    def reset_request_versions():
+        # g outlives the request when an app context was already pushed, as in tests
+        g.request_versions = {}
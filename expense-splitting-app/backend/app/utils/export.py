@@ -0,0 +1,103 @@
+import csv
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+import io
+from itertools import islice
+import json
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple
+from flask import Response, request, stream_with_context # type: ignore
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Rows fetched from the database cursor at a time, and rows written per chunk sent to the client
+EXPORT_BATCH_SIZE = 1000
+
+
+def _parse_date(name: str, value: str, end_of_range: bool) -> datetime:
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid '{name}' date, expected YYYY-MM-DD or an ISO 8601 timestamp.")
+    # A bare date as the end of a range includes that whole day
+    if end_of_range and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed
+
+
+def get_date_range_args(start_param: str = 'from', end_param: str = 'to') -> Tuple[Optional[datetime], Optional[datetime]]:
+    """
+    Read an optional date range from the query string.
+
+    Returns (start, end) where start is inclusive and end is exclusive,
+    either of which may be None. Raises ValueError for malformed dates.
+    """
+    start = request.args.get(start_param)
+    end = request.args.get(end_param)
+    start = _parse_date(start_param, start, False) if start else None
+    end = _parse_date(end_param, end, True) if end else None
+    if start and end and start >= end:
+        raise ValueError(f"'{start_param}' must be before '{end_param}'.")
+    return start, end
+
+
+def get_export_format(default: str = 'csv') -> str:
+    """Read ?format= for an export, raising ValueError for formats we can't produce."""
+    export_format = request.args.get('format', default).lower()
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported format '{export_format}', expected one of: {', '.join(EXPORT_FORMATS)}.")
+    return export_format
+
+
+def _json_default(value: Any):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    return str(value)
+
+
+def _csv_chunks(columns: Sequence[str], rows: Iterable[Sequence[Any]]):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    rows = iter(rows)
+    while True:
+        # None is written as an empty field; callers format dates and amounts themselves
+        batch = list(islice(rows, EXPORT_BATCH_SIZE))
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        if len(batch) < EXPORT_BATCH_SIZE:
+            return
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def _ndjson_chunks(columns: Sequence[str], rows: Iterable[Sequence[Any]]):
+    encode = json.JSONEncoder(default=_json_default, separators=(',', ':')).encode
+    lines: List[str] = []
+    for row in rows:
+        lines.append(encode(dict(zip(columns, row))))
+        if len(lines) == EXPORT_BATCH_SIZE:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def stream_export(columns: Sequence[str], rows: Iterable[Sequence[Any]], export_format: str, filename: str) -> Response:
+    """
+    Stream rows to the client as CSV or NDJSON, a chunk at a time.
+
+    rows should be a lazy iterable, typically a query run with yield_per,
+    so memory use depends on the chunk size rather than the export size.
+    Values are written as they are, so format dates and amounts first.
+    The generator keeps the request context, and with it the database
+    session, alive until the last row has been sent.
+    """
+    chunks: Callable = _csv_chunks if export_format == 'csv' else _ndjson_chunks
+    response = Response(stream_with_context(chunks(columns, rows)), mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response
@@ -0,0 +1,171 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from typing import List, Optional, Sequence
+from flask import current_app # type: ignore
+from werkzeug.security import safe_join # type: ignore
+
+try:
+    from PIL import Image, ImageOps # type: ignore
+except ImportError:  # Pillow is optional, without it images are served at their original size
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_URL_PREFIX = '/uploads/images/'
+_EXTENSION_ALIASES = {'jpeg': 'jpg'}
+
+
+class ImageStore:
+    """
+    Profile images stored by content hash, with thumbnails made in the background.
+
+    Uploads are streamed to disk in chunks while being hashed, then moved to
+    <sha256>.<ext>. The same picture uploaded twice is stored once, and since
+    the bytes behind a name never change, its URL can be cached for good.
+    Thumbnails (<sha256>_<size>.<ext>) are resized by a thread pool off the
+    request thread. With workers=0 they are made inline, which is what the
+    tests use.
+    """
+
+    def __init__(self, folder: str, sizes: Sequence[int] = (64, 256), workers: int = 2,
+                 max_bytes: int = 10 * 1024 * 1024):
+        self.folder = os.path.abspath(folder)
+        self.sizes = sorted(sizes)
+        self.workers = workers
+        self.max_bytes = max_bytes
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_pid: Optional[int] = None
+        self._executor_lock = threading.Lock()
+
+    def save(self, stream, extension: str) -> str:
+        """Store an upload and queue its thumbnails. Returns its content-addressed name."""
+        extension = _EXTENSION_ALIASES.get(extension.lower(), extension.lower())
+        os.makedirs(self.folder, exist_ok=True)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, part_path = tempfile.mkstemp(dir=self.folder, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                for chunk in iter(lambda: stream.read(CHUNK_SIZE), b''):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise ValueError(f"Profile image is too large, the limit is {self.max_bytes // (1024 * 1024)} MB")
+                    digest.update(chunk)
+                    out.write(chunk)
+
+            name = f"{digest.hexdigest()}.{extension}"
+            if os.path.exists(os.path.join(self.folder, name)):
+                os.remove(part_path)  # Already stored, perhaps uploaded by someone else
+            else:
+                os.replace(part_path, os.path.join(self.folder, name))
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+        if self.can_resize(extension):
+            self._schedule_thumbnails(name)
+        return name
+
+    @staticmethod
+    def can_resize(extension: str) -> bool:
+        """True when Pillow is installed and can read this kind of file."""
+        if Image is None:
+            return False
+        image_format = Image.registered_extensions().get(f'.{extension}')
+        return image_format is not None and image_format in Image.OPEN
+
+    def display_url(self, name: str) -> str:
+        """The URL profiles point at: the largest thumbnail, or the original when there are none."""
+        extension = name.rsplit('.', 1)[1]
+        if self.sizes and self.can_resize(extension):
+            return IMAGE_URL_PREFIX + self.thumbnail_name(name, self.sizes[-1])
+        return IMAGE_URL_PREFIX + name
+
+    @staticmethod
+    def thumbnail_name(name: str, size: int) -> str:
+        stem, extension = name.rsplit('.', 1)
+        return f"{stem}_{size}.{extension}"
+
+    @staticmethod
+    def original_name(thumbnail_name: str) -> Optional[str]:
+        """The original a thumbnail is made from, or None if the name isn't a thumbnail's."""
+        stem, _, extension = thumbnail_name.rpartition('.')
+        original, _, size = stem.rpartition('_')
+        if not original or not size.isdigit():
+            return None
+        return f"{original}.{extension}"
+
+    def path(self, name: str) -> Optional[str]:
+        """The file behind a name, or None if it doesn't exist or would escape the folder."""
+        path = safe_join(self.folder, name)
+        return path if path is not None and os.path.isfile(path) else None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # Created on first use, and again after a fork, since threads don't survive one
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._executor_lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='thumbnails')
+                    self._executor_pid = os.getpid()
+        return self._executor
+
+    def _schedule_thumbnails(self, name: str) -> None:
+        missing = [size for size in self.sizes if not os.path.exists(os.path.join(self.folder, self.thumbnail_name(name, size)))]
+        if not missing:
+            return
+        if not self.workers:
+            self._make_thumbnails(name, missing)
+        else:
+            self._get_executor().submit(self._make_thumbnails, name, missing)
+
+    def _make_thumbnails(self, name: str, sizes: List[int]) -> None:
+        extension = name.rsplit('.', 1)[1]
+        image_format = Image.registered_extensions()[f'.{extension}']
+        try:
+            with Image.open(os.path.join(self.folder, name)) as image:
+                image = ImageOps.exif_transpose(image)  # Phones store rotation separately
+                for size in sizes:
+                    thumbnail = image.copy()
+                    thumbnail.thumbnail((size, size))  # Keeps the aspect ratio and never upscales
+                    if image_format == 'JPEG' and thumbnail.mode not in ('RGB', 'L'):
+                        thumbnail = thumbnail.convert('RGB')
+
+                    # Written aside and renamed, so a half-written thumbnail is never served
+                    fd, part_path = tempfile.mkstemp(dir=self.folder, suffix='.part')
+                    with os.fdopen(fd, 'wb') as out:
+                        thumbnail.save(out, format=image_format)
+                    os.replace(part_path, os.path.join(self.folder, self.thumbnail_name(name, size)))
+        except Exception as e:
+            # The original is still served in place of the missing thumbnails
+            logging.warning(f"Could not make thumbnails for {name}: {e}")
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+def init_image_store(app) -> ImageStore:
+    """Create the app's image store under UPLOAD_FOLDER from the PROFILE_IMAGE_* settings."""
+    store = ImageStore(
+        folder=os.path.join(app.config.get('UPLOAD_FOLDER', './uploads'), 'images'),
+        sizes=app.config.get('PROFILE_IMAGE_SIZES', (64, 256)),
+        workers=app.config.get('PROFILE_IMAGE_WORKERS', 2),
+        max_bytes=app.config.get('PROFILE_IMAGE_MAX_BYTES', 10 * 1024 * 1024),
+    )
+    if Image is None:
+        logging.info("Pillow is not installed, profile images will be served without thumbnails")
+    app.extensions['image_store'] = store
+    return store
+
+
+def get_image_store() -> ImageStore:
+    store = current_app.extensions.get('image_store')
+    if store is None:  # An app not created by create_app
+        store = init_image_store(current_app)
+    return store
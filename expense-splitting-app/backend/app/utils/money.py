@@ -0,0 +1,75 @@
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from fractions import Fraction
+from typing import List, Sequence, Union
+
+# Every supported currency (ZAR, USD, EUR, GBP) has two decimal places
+MINOR_UNITS_PER_MAJOR = 100
+
+Number = Union[int, float, str, Decimal]
+
+
+def to_minor_units(amount: Number) -> int:
+    """
+    Convert an amount in major units (e.g. rands) to integer minor units (cents).
+
+    Strings and floats go through Decimal so that 0.1 + 0.2 style drift
+    never reaches the database. Fractions of a cent are rounded half up.
+    """
+    if isinstance(amount, bool):
+        raise ValueError("Invalid amount")
+    try:
+        value = Decimal(str(amount)) if not isinstance(amount, Decimal) else amount
+        minor = (value * MINOR_UNITS_PER_MAJOR).quantize(Decimal('1'), rounding=ROUND_HALF_UP)
+    except (InvalidOperation, ValueError, TypeError):
+        raise ValueError("Invalid amount")
+    if not minor.is_finite():
+        raise ValueError("Invalid amount")
+    return int(minor)
+
+
+def from_minor_units(amount: int) -> float:
+    """Convert integer minor units back to major units for JSON responses."""
+    return float(Decimal(amount or 0) / MINOR_UNITS_PER_MAJOR)
+
+
+def format_minor_units(amount: int) -> str:
+    """Format integer minor units as an exact major-unit string, e.g. 1250 -> '12.50', for exports."""
+    # Integer arithmetic rather than Decimal, since exports call this once per row
+    amount = amount or 0
+    if amount < 0:
+        return '-' + format_minor_units(-amount)
+    return '%d.%02d' % divmod(amount, MINOR_UNITS_PER_MAJOR)
+
+
+def allocate(total: int, weights: Sequence[Number]) -> List[int]:
+    """
+    Split an integer total in proportion to weights using the largest remainder method.
+
+    Every share is floored first, then the cents left over go one at a time
+    to the shares with the largest fractional remainders (earlier entries win
+    ties). The result always sums to exactly the total.
+    """
+    if not weights:
+        raise ValueError("At least one participant is required")
+
+    exact_weights = [Fraction(str(weight)) for weight in weights]
+    if any(weight < 0 for weight in exact_weights):
+        raise ValueError("Split weights cannot be negative")
+
+    weight_total = sum(exact_weights)
+    if weight_total == 0:
+        raise ValueError("Split weights cannot all be zero")
+
+    shares = []
+    remainders = []
+    for index, weight in enumerate(exact_weights):
+        exact_share = total * weight / weight_total
+        share = exact_share.numerator // exact_share.denominator
+        shares.append(share)
+        remainders.append((exact_share - share, index))
+
+    leftover = total - sum(shares)
+    for _, index in sorted(remainders, key=lambda item: (-item[0], item[1]))[:leftover]:
+        shares[index] += 1
+
+    return shares
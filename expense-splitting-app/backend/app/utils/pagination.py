@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Hashable, List, Optional
+from flask import request # type: ignore
+from sqlalchemy import and_, or_ # type: ignore
+from .lru_cache import LRUCache
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Exact totals are expensive on large tables, so they are only recounted every so often
+_total_cache = LRUCache(maxsize=4096, ttl=30)
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor that was not produced by this API."""
+
+
+class CursorPage:
+    """One page of results plus the opaque cursor for the next page."""
+
+    def __init__(self, items: List[Any], next_cursor: Optional[str], total: Optional[int] = None):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.total = total
+
+    def to_dict(self, key: str, items: List[Any]) -> dict:
+        """Build the JSON response body for this page from its serialized items."""
+        data = {key: items, 'next_cursor': self.next_cursor}
+        if self.total is not None:
+            data['total'] = self.total
+        return data
+
+
+def encode_cursor(sort_value: Optional[datetime], row_id: int) -> str:
+    """Encode a (timestamp, id) position as an opaque URL-safe token."""
+    payload = json.dumps([sort_value.isoformat() if sort_value else None, row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token: str):
+    """Decode a cursor produced by encode_cursor."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        if not isinstance(row_id, int):
+            raise ValueError
+        return sort_value, row_id
+    except (TypeError, ValueError, UnicodeError):
+        raise InvalidCursorError("Invalid cursor")
+
+
+def get_page_args(limit_param: str = 'limit', default_limit: Optional[int] = None):
+    """Read the cursor, page size and include_total flag from the query string."""
+    cursor = request.args.get('cursor')
+    limit = request.args.get(limit_param, default=default_limit, type=int)
+    include_total = request.args.get('include_total', default='false').lower() == 'true'
+    return cursor, limit, include_total
+
+
+def clamp_page_size(limit: Optional[int], default: int = DEFAULT_PAGE_SIZE) -> int:
+    """Keep a requested page size within sensible bounds."""
+    if not limit or limit < 1:
+        return default
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def paginate_by_cursor(
+    query,
+    sort_column,
+    id_column,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_total: bool = False,
+    total_cache_key: Optional[Hashable] = None,
+    key: Optional[Callable[[Any], tuple]] = None,
+) -> CursorPage:
+    """
+    Keyset-paginate a query newest first over (sort_column, id_column).
+
+    Each page seeks straight to the cursor position instead of using OFFSET,
+    so deep pages cost the same as the first one. Totals are only counted
+    when asked for, and cached for a short while under total_cache_key.
+    """
+    limit = clamp_page_size(limit)
+    key = key or (lambda item: (getattr(item, sort_column.key), getattr(item, id_column.key)))
+
+    total = None
+    if include_total:
+        total = _total_cache.get(total_cache_key) if total_cache_key is not None else None
+        if total is None:
+            total = query.order_by(None).count()
+            if total_cache_key is not None:
+                _total_cache.set(total_cache_key, total)
+
+    if cursor:
+        sort_value, row_id = decode_cursor(cursor)
+        query = query.filter(or_(
+            sort_column < sort_value,
+            and_(sort_column == sort_value, id_column < row_id)
+        ))
+
+    # Fetch one extra row to find out whether there is another page
+    rows = query.order_by(sort_column.desc(), id_column.desc()).limit(limit + 1).all()
+    items = rows[:limit]
+
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = encode_cursor(*key(items[-1]))
+
+    return CursorPage(items, next_cursor, total)
+
+
+def paginate_sorted(
+    items: List[Any],
+    key: Callable[[Any], tuple],
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    include_total: bool = False,
+) -> CursorPage:
+    """
+    Page through a list already sorted newest first by key(item) = (timestamp, id).
+
+    Cursors are interchangeable with paginate_by_cursor's, so a small
+    collection read whole from a cache can be paged the same way as a query.
+    """
+    limit = clamp_page_size(limit)
+    total = len(items) if include_total else None
+
+    if cursor:
+        position = decode_cursor(cursor)
+        items = [item for item in items if key(item) < position]
+
+    page = items[:limit]
+    next_cursor = encode_cursor(*key(page[-1])) if len(items) > limit else None
+    return CursorPage(page, next_cursor, total)
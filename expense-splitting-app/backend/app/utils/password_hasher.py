@@ -0,0 +1,100 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import multiprocessing
+import threading
+from typing import Optional
+from flask import current_app, has_app_context # type: ignore
+from werkzeug.security import check_password_hash, generate_password_hash # type: ignore
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when too many hashes are already queued, so the caller can shed load."""
+
+
+class PasswordHasher:
+    """
+    Hashes and checks passwords in a bounded process pool.
+
+    Hashing is deliberately CPU-heavy, so running it on the request thread
+    holds the GIL and stalls every other request in the worker. The pool
+    runs it in separate processes while the request thread simply waits.
+    With workers=0 hashing runs inline, which is what the tests use.
+    """
+
+    def __init__(self, method: str = DEFAULT_METHOD, workers: int = 0, max_pending: int = 64, timeout: float = 10.0):
+        self.method = method
+        self.workers = workers
+        self.timeout = timeout
+        self._pending = threading.BoundedSemaphore(max_pending)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Created on first use so forked web workers each start their own pool
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    methods = multiprocessing.get_all_start_methods()
+                    context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+        return self._executor
+
+    def _run(self, func, *args):
+        if not self.workers:
+            return func(*args)
+
+        # Fail fast rather than queueing behind a full pool; the caller answers 503 with Retry-After
+        if not self._pending.acquire(blocking=False):
+            raise PasswordHashingBusy("Too many password checks in progress, please retry")
+        try:
+            future = self._get_executor().submit(func, *args)
+        except Exception:
+            self._pending.release()
+            raise
+        # The slot is held until the hash really finishes, not just until the caller gives up
+        future.add_done_callback(lambda _: self._pending.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            raise PasswordHashingBusy("Password hashing timed out, please retry")
+
+    def hash(self, password: str) -> str:
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash: str, password: str) -> bool:
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash: str) -> bool:
+        """True when a stored hash was made with a different method or cost than the configured one."""
+        return password_hash.split('$', 1)[0] != self.method
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Used outside an app created by create_app
+_default_hasher = PasswordHasher()
+
+
+def init_password_hasher(app) -> PasswordHasher:
+    """Create the app's hasher from PASSWORD_HASH_METHOD, PASSWORD_HASH_WORKERS and friends."""
+    hasher = PasswordHasher(
+        method=app.config.get('PASSWORD_HASH_METHOD', DEFAULT_METHOD),
+        workers=app.config.get('PASSWORD_HASH_WORKERS', 0),
+        max_pending=app.config.get('PASSWORD_HASH_MAX_PENDING', 64),
+        timeout=app.config.get('PASSWORD_HASH_TIMEOUT', 10.0),
+    )
+    app.extensions['password_hasher'] = hasher
+    return hasher
+
+
+def get_password_hasher() -> PasswordHasher:
+    if has_app_context():
+        hasher = current_app.extensions.get('password_hasher')
+        if hasher is not None:
+            return hasher
+    return _default_hasher
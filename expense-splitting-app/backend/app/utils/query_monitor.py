@@ -0,0 +1,117 @@
+from collections import Counter
+from contextlib import contextmanager
+import logging
+import threading
+import time
+from typing import List, Optional, Tuple
+from flask import current_app, g, has_request_context, request # type: ignore
+from sqlalchemy import event # type: ignore
+from sqlalchemy.engine import Engine # type: ignore
+
+_local = threading.local()
+_listeners_installed = False
+_install_lock = threading.Lock()
+
+
+class QueryStats:
+    """Counts the SQL statements and database time spent in one unit of work."""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.statements = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        # Statements are parameterised, so N+1 queries share the same text
+        self.statements[' '.join(statement.split())] += 1
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        """Return statements that ran at least threshold times, the usual sign of an N+1."""
+        return [(statement, count) for statement, count in self.statements.most_common() if count >= threshold]
+
+
+def _active_collectors():
+    collectors = list(getattr(_local, 'collectors', ()))
+    if has_request_context():
+        stats = g.get('query_stats')
+        if stats is not None:
+            collectors.append(stats)
+    return collectors
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_start_time', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start_times = conn.info.get('query_start_time')
+    if not start_times:
+        return
+    duration = time.perf_counter() - start_times.pop()
+
+    for stats in _active_collectors():
+        stats.record(statement, duration)
+
+
+def _install_listeners():
+    global _listeners_installed
+    with _install_lock:
+        if _listeners_installed:
+            return
+        # Listen on the Engine class so engines created lazily are covered too
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listeners_installed = True
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the queries run inside the block, for example to pin a query budget in tests:
+
+        with count_queries() as stats:
+            client.get('/api/expenses?group_id=1')
+        assert stats.count <= 3
+    """
+    _install_listeners()
+    stats = QueryStats()
+    if not hasattr(_local, 'collectors'):
+        _local.collectors = []
+    collectors = _local.collectors
+    collectors.append(stats)
+    try:
+        yield stats
+    finally:
+        collectors.remove(stats)
+
+
+def init_query_monitor(app) -> None:
+    """Track query count and database time for every request handled by the app."""
+    _install_listeners()
+
+    @app.before_request
+    def start_query_stats():
+        g.query_stats = QueryStats()
+
+    @app.after_request
+    def report_query_stats(response):
+        stats: Optional[QueryStats] = g.pop('query_stats', None)
+        if stats is None:
+            return response
+
+        config = current_app.config
+        threshold = config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+        for statement, count in stats.repeated_statements(threshold):
+            logging.warning(f"Possible N+1 in {request.endpoint}: statement ran {count} times: {statement[:200]}")
+
+        budget = config.get('SQL_QUERY_BUDGET')
+        if budget is not None and stats.count > budget:
+            logging.warning(f"Query budget exceeded in {request.endpoint}: {stats.count} queries (budget {budget})")
+
+        if config.get('SQL_QUERY_STATS_HEADERS'):
+            response.headers['X-DB-Query-Count'] = str(stats.count)
+            response.headers['X-DB-Time-Ms'] = f"{stats.total_time * 1000:.2f}"
+
+        return response
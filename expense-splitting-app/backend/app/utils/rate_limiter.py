@@ -0,0 +1,292 @@
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from flask import current_app, jsonify, request # type: ignore
+from .auth_utils import Identity, get_current_identity
+
+_START_KEY = 'splitit.request_start'
+_SLOT_KEY = 'splitit.concurrency_slot'
+
+# Endpoints that hash a password get their own, much smaller per-IP budget
+PASSWORD_ENDPOINTS = {'auth.login', 'auth.register'}
+
+
+# (key, rate, burst) of each bucket a request is charged to
+Bucket = Tuple[str, float, float]
+
+
+def _take_all(current: Sequence[Tuple[float, float]], buckets: Sequence[Bucket], cost: float,
+              now: float) -> Tuple[List[float], float]:
+    """
+    Refill each bucket up to now and take cost from all of them, or from none if any is short.
+
+    current holds each bucket's (tokens, updated_at). Returns the tokens left
+    in each bucket and the seconds until every bucket could pay, 0 when allowed.
+    A request turned away by one bucket must not drain the others, or a user
+    over their own limit would also use up their IP's budget.
+    """
+    refilled = [
+        min(burst, tokens + max(0.0, now - updated_at) * rate)
+        for (tokens, updated_at), (_, rate, burst) in zip(current, buckets)
+    ]
+    retry_after = max(
+        ((cost - tokens) / rate for tokens, (_, rate, _) in zip(refilled, buckets) if tokens < cost), default=0.0
+    )
+    if retry_after:
+        return refilled, retry_after
+    return [tokens - cost for tokens in refilled], 0.0
+
+
+class MemoryRateLimitStore:
+    """
+    Token buckets held in this process only.
+
+    Each worker enforces its own limits, so the effective limit is multiplied
+    by the number of workers. Fine for development and single-process setups.
+    """
+
+    def __init__(self, prune_interval: float = 60.0):
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}
+        self._lock = threading.Lock()
+        self._prune_interval = prune_interval
+        self._last_prune = time.monotonic()
+
+    def consume(self, key: str, rate: float, burst: float, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Take cost tokens from the key's bucket. Returns 0 when allowed, otherwise the seconds until it would be."""
+        return self.consume_all([(key, rate, burst)], cost, now)
+
+    def consume_all(self, buckets: Sequence[Bucket], cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Take cost tokens from every bucket, or from none if one is short. Returns 0 when allowed, otherwise the seconds to wait."""
+        now = time.time() if now is None else now
+        with self._lock:
+            current = [self._buckets.get(key, (burst, now, 0.0))[:2] for key, _, burst in buckets]
+            tokens, retry_after = _take_all(current, buckets, cost, now)
+            for (key, rate, burst), left in zip(buckets, tokens):
+                # Remember when the bucket will be full again so idle keys can be dropped
+                self._buckets[key] = (left, now, now + (burst - left) / rate)
+            self._prune(now)
+        return retry_after
+
+    def _prune(self, now: float) -> None:
+        if time.monotonic() - self._last_prune < self._prune_interval:
+            return
+        self._last_prune = time.monotonic()
+        for key in [key for key, (_, _, full_at) in self._buckets.items() if full_at <= now]:
+            del self._buckets[key]
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class SqliteRateLimitStore:
+    """
+    Token buckets in a SQLite file that every worker on the host opens.
+
+    A local stand-in for a shared store like Redis: each check is one short
+    write transaction covering all of a request's buckets, so limits hold
+    across gunicorn workers on one machine.
+    """
+
+    def __init__(self, path: str, prune_interval: float = 60.0):
+        self.path = path
+        self._local = threading.local()
+        self._prune_interval = prune_interval
+        self._last_prune = 0.0
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread and per process, since forked workers can't share one
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS rate_limit_buckets ('
+                'key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL, full_at REAL NOT NULL)'
+            )
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def consume(self, key: str, rate: float, burst: float, cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Take cost tokens from the key's bucket. Returns 0 when allowed, otherwise the seconds until it would be."""
+        return self.consume_all([(key, rate, burst)], cost, now)
+
+    def consume_all(self, buckets: Sequence[Bucket], cost: float = 1.0, now: Optional[float] = None) -> float:
+        """Take cost tokens from every bucket, or from none if one is short. Returns 0 when allowed, otherwise the seconds to wait."""
+        now = time.time() if now is None else now
+        conn = self._connection()
+        # Every bucket is read and written in one transaction, so another worker can't slip in between
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            rows = conn.execute(
+                f"SELECT key, tokens, updated_at FROM rate_limit_buckets WHERE key IN ({', '.join('?' * len(buckets))})",
+                [key for key, _, _ in buckets]
+            )
+            stored = {key: (tokens, updated_at) for key, tokens, updated_at in rows}
+            current = [stored.get(key, (burst, now)) for key, _, burst in buckets]
+            tokens, retry_after = _take_all(current, buckets, cost, now)
+            conn.executemany(
+                'INSERT INTO rate_limit_buckets (key, tokens, updated_at, full_at) VALUES (?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated_at = excluded.updated_at, full_at = excluded.full_at',
+                [(key, left, now, now + (burst - left) / rate) for (key, rate, burst), left in zip(buckets, tokens)]
+            )
+            if now - self._last_prune >= self._prune_interval:
+                self._last_prune = now
+                conn.execute('DELETE FROM rate_limit_buckets WHERE full_at <= ?', (now,))
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return retry_after
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Caps the requests in flight in this worker and adapts the cap to latency (AIMD).
+
+    While requests finish within the target latency the limit creeps up by
+    about one per limit's worth of requests. When they take longer, the
+    limit is cut multiplicatively, at most once per target interval, so a
+    worker that is falling behind sheds new work with a fast 503 instead of
+    queueing it.
+    """
+
+    def __init__(self, target_latency: float, initial_limit: int = 32, min_limit: int = 4,
+                 max_limit: int = 256, backoff: float = 0.9):
+        self.target_latency = target_latency
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self._limit = float(initial_limit)
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._in_flight >= int(self._limit):
+                return False
+            self._in_flight += 1
+            return True
+
+    def release(self, latency: float) -> None:
+        with self._lock:
+            in_flight = self._in_flight
+            self._in_flight -= 1
+            if latency > self.target_latency:
+                now = time.monotonic()
+                if now - self._last_decrease >= self.target_latency:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+            elif in_flight * 2 >= self._limit:
+                # Only grow while the limit is actually being used
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+
+class RateLimiter:
+    """Per-IP and per-user token buckets plus the adaptive concurrency limiter."""
+
+    def __init__(self, store, concurrency: Optional[AdaptiveConcurrencyLimiter],
+                 ip_rate: float, ip_burst: float, user_rate: float, user_burst: float,
+                 password_rate: float, password_burst: float):
+        self.store = store
+        self.concurrency = concurrency
+        self.ip_rate, self.ip_burst = ip_rate, ip_burst
+        self.user_rate, self.user_burst = user_rate, user_burst
+        self.password_rate, self.password_burst = password_rate, password_burst
+
+    def check(self, ip: str, user_id=None, endpoint: Optional[str] = None) -> float:
+        """Charge one request to the caller's buckets. Returns 0 when allowed, otherwise the seconds to wait."""
+        buckets = [(f'ip:{ip}', self.ip_rate, self.ip_burst)]
+        if user_id is not None:
+            buckets.append((f'user:{user_id}', self.user_rate, self.user_burst))
+        if endpoint in PASSWORD_ENDPOINTS:
+            buckets.append((f'password:{ip}', self.password_rate, self.password_burst))
+
+        try:
+            return self.store.consume_all(buckets)
+        except sqlite3.Error as e:
+            # Fail open: a broken limiter store shouldn't take the API down with it
+            logging.warning(f"Rate limit store unavailable, allowing request: {e}")
+            return 0.0
+
+
+def _too_many_requests(message: str, status: int, retry_after: float):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def create_rate_limit_store(app):
+    if app.config.get('RATE_LIMIT_STORE', 'memory') == 'sqlite':
+        path = app.config.get('RATE_LIMIT_STORE_PATH') or os.path.join(app.instance_path, 'rate_limits.db')
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        return SqliteRateLimitStore(path)
+    return MemoryRateLimitStore()
+
+
+def init_rate_limiter(app) -> Optional[RateLimiter]:
+    """Register admission control for every request: token buckets first, then the concurrency limiter."""
+    if not app.config.get('RATE_LIMIT_ENABLED', True):
+        return None
+
+    config = app.config
+    concurrency = None
+    if config.get('CONCURRENCY_TARGET_LATENCY_MS'):
+        concurrency = AdaptiveConcurrencyLimiter(
+            target_latency=config['CONCURRENCY_TARGET_LATENCY_MS'] / 1000,
+            initial_limit=config.get('CONCURRENCY_LIMIT_INITIAL', 32),
+            min_limit=config.get('CONCURRENCY_LIMIT_MIN', 4),
+            max_limit=config.get('CONCURRENCY_LIMIT_MAX', 256),
+        )
+    limiter = RateLimiter(
+        create_rate_limit_store(app), concurrency,
+        ip_rate=config.get('RATE_LIMIT_IP_PER_SECOND', 20), ip_burst=config.get('RATE_LIMIT_IP_BURST', 40),
+        user_rate=config.get('RATE_LIMIT_USER_PER_SECOND', 10), user_burst=config.get('RATE_LIMIT_USER_BURST', 30),
+        password_rate=config.get('RATE_LIMIT_PASSWORD_PER_SECOND', 0.2), password_burst=config.get('RATE_LIMIT_PASSWORD_BURST', 10),
+    )
+    app.extensions['rate_limiter'] = limiter
+
+    @app.before_request
+    def admit_request():
+        if request.method == 'OPTIONS':
+            return None
+
+        identity = get_current_identity()
+        user_id = identity.user_id if isinstance(identity, Identity) else None
+        retry_after = limiter.check(request.remote_addr or 'unknown', user_id, request.endpoint)
+        if retry_after:
+            return _too_many_requests('Too many requests, please slow down', 429, retry_after)
+
+        if limiter.concurrency is not None:
+            if not limiter.concurrency.try_acquire():
+                return _too_many_requests('Server is busy, please retry shortly', 503, 1)
+            request.environ[_SLOT_KEY] = True
+            request.environ[_START_KEY] = time.perf_counter()
+        return None
+
+    @app.teardown_request
+    def release_request(exc):
+        # Runs even when the view raised, so slots are never leaked
+        if request.environ.pop(_SLOT_KEY, False):
+            limiter.concurrency.release(time.perf_counter() - request.environ.pop(_START_KEY))
+
+    return limiter
+
+
+def get_rate_limiter() -> Optional[RateLimiter]:
+    return current_app.extensions.get('rate_limiter')
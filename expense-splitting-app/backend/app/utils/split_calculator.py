@@ -0,0 +1,226 @@
+from array import array
+from itertools import accumulate
+from typing import Dict, Iterator, List, Optional, Sequence
+
+try:
+    import numpy as np # type: ignore
+except ImportError:  # NumPy is optional, the pure-Python path gives identical results
+    np = None
+
+# Percentages are turned into integer weights with four decimal places, so 100% == 1,000,000
+PERCENT_SCALE = 10_000
+FULL_PERCENTAGE = 100 * PERCENT_SCALE
+
+# Above this, amount * weight could overflow int64 in the vectorised path
+_INT64_SAFE = 2 ** 62
+
+
+class SplitBatch:
+    """
+    Splits for many expenses in compact form.
+
+    shares holds every participant share (in minor units) back to back and
+    expense i owns shares[offsets[i]:offsets[i + 1]]. Expenses that failed
+    validation are listed in errors and their shares must be ignored.
+    """
+
+    def __init__(self, shares, offsets, errors: Optional[Dict[int, str]] = None):
+        self.shares = shares
+        self.offsets = offsets
+        self.errors = errors or {}
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def shares_for(self, index: int) -> List[int]:
+        """Return the shares of one expense as plain ints."""
+        segment = self.shares[self.offsets[index]:self.offsets[index + 1]]
+        return segment.tolist() if hasattr(segment, 'tolist') else list(segment)
+
+    def __iter__(self) -> Iterator[List[int]]:
+        for index in range(len(self)):
+            yield self.shares_for(index)
+
+
+def numpy_available() -> bool:
+    return np is not None
+
+
+def offsets_from_counts(counts: Sequence[int]) -> array:
+    """Turn per-expense participant counts into the offsets used by SplitBatch."""
+    return array('q', accumulate(counts, initial=0))
+
+
+def _use_numpy(use_numpy: Optional[bool]) -> bool:
+    if use_numpy and np is None:
+        raise RuntimeError("NumPy is not installed")
+    return np is not None if use_numpy is None else use_numpy
+
+
+def _check_amounts(amounts, offsets) -> Dict[int, str]:
+    errors = {}
+    for index, amount in enumerate(amounts):
+        if amount <= 0:
+            errors[index] = "Invalid amount for split calculation"
+        elif offsets[index + 1] == offsets[index]:
+            errors[index] = "At least one participant is required"
+    return errors
+
+
+def split_equal(amounts: Sequence[int], counts: Sequence[int], use_numpy: Optional[bool] = None) -> SplitBatch:
+    """Split every amount equally, handing leftover cents to the first participants."""
+    offsets = offsets_from_counts(counts)
+    errors = _check_amounts(amounts, offsets)
+
+    if _use_numpy(use_numpy):
+        totals = np.asarray(amounts, dtype=np.int64)
+        sizes = np.asarray(counts, dtype=np.int64)
+        if errors:
+            totals[list(errors)] = 0
+        safe_sizes = np.maximum(sizes, 1)
+        base, leftover = np.divmod(totals, safe_sizes)
+        # Position of each participant within its own expense
+        starts = np.asarray(offsets[:-1], dtype=np.int64)
+        rank = np.arange(offsets[-1], dtype=np.int64) - np.repeat(starts, sizes)
+        shares = np.repeat(base, sizes) + (rank < np.repeat(leftover, sizes))
+        return SplitBatch(shares, offsets, errors)
+
+    shares = array('q')
+    for index, (amount, count) in enumerate(zip(amounts, counts)):
+        if index in errors:
+            shares.extend([0] * count)
+            continue
+        base, leftover = divmod(amount, count)
+        shares.extend([base + 1] * leftover)
+        shares.extend([base] * (count - leftover))
+    return SplitBatch(shares, offsets, errors)
+
+
+def split_by_weights(amounts: Sequence[int], weights: Sequence[int], counts: Sequence[int],
+                     use_numpy: Optional[bool] = None) -> SplitBatch:
+    """
+    Split every amount in proportion to non-negative integer weights.
+
+    Uses the same largest remainder rule as money.allocate: shares are
+    floored, then leftover cents go to the largest remainders, earlier
+    participants winning ties.
+    """
+    offsets = offsets_from_counts(counts)
+    errors = _check_amounts(amounts, offsets)
+
+    if _use_numpy(use_numpy):
+        totals = np.asarray(amounts, dtype=np.int64)
+        sizes = np.asarray(counts, dtype=np.int64)
+        values = np.asarray(weights, dtype=np.int64)
+        starts = np.asarray(offsets[:-1], dtype=np.int64)
+        if len(values) != offsets[-1]:
+            raise ValueError("Weights and participant counts do not match")
+
+        segment_ids = np.repeat(np.arange(len(sizes)), sizes)
+        weight_totals = np.zeros(len(sizes), dtype=np.int64)
+        np.add.at(weight_totals, segment_ids, values)
+        for index in np.flatnonzero(weight_totals <= 0).tolist():
+            errors.setdefault(index, "Split weights cannot all be zero")
+        for index in np.unique(segment_ids[values < 0]).tolist():
+            errors[index] = "Split weights cannot be negative"
+        if values.size and int(values.max()) * max(int(totals.max()), 1) >= _INT64_SAFE:
+            return split_by_weights(amounts, weights, counts, use_numpy=False)
+
+        if errors:
+            bad = np.zeros(len(sizes), dtype=bool)
+            bad[list(errors)] = True
+            totals = np.where(bad, 0, totals)
+            weight_totals = np.where(bad, 1, weight_totals)
+            values = np.where(bad[segment_ids], 0, values)
+
+        exact = np.repeat(totals, sizes) * values
+        divisor = np.repeat(weight_totals, sizes)
+        shares, remainders = np.divmod(exact, divisor)
+        handed_out = np.zeros(len(sizes), dtype=np.int64)
+        np.add.at(handed_out, segment_ids, shares)
+        leftover = totals - handed_out
+
+        # Rank participants within each expense by remainder, largest first and earlier index on ties.
+        # Remainders share a divisor within an expense, so comparing them directly is exact.
+        order = np.lexsort((np.arange(len(values)), -remainders, segment_ids))
+        rank = np.empty(len(values), dtype=np.int64)
+        rank[order] = np.arange(len(values), dtype=np.int64) - np.repeat(starts, sizes)
+        shares = shares + (rank < leftover[segment_ids])
+        return SplitBatch(shares, offsets, errors)
+
+    shares = array('q')
+    for index, amount in enumerate(amounts):
+        segment = weights[offsets[index]:offsets[index + 1]]
+        weight_total = sum(segment)
+        if index not in errors:
+            if any(weight < 0 for weight in segment):
+                errors[index] = "Split weights cannot be negative"
+            elif weight_total <= 0:
+                errors[index] = "Split weights cannot all be zero"
+        if index in errors:
+            shares.extend([0] * len(segment))
+            continue
+
+        floors = []
+        remainders = []
+        for position, weight in enumerate(segment):
+            share, remainder = divmod(amount * weight, weight_total)
+            floors.append(share)
+            remainders.append((-remainder, position))
+        leftover = amount - sum(floors)
+        for _, position in sorted(remainders)[:leftover]:
+            floors[position] += 1
+        shares.extend(floors)
+    return SplitBatch(shares, offsets, errors)
+
+
+def scale_percentages(percentages: Sequence[float]) -> List[int]:
+    """Convert percentages to integer weights, rejecting more than four decimal places."""
+    weights = []
+    for percentage in percentages:
+        scaled = float(percentage) * PERCENT_SCALE
+        weight = round(scaled)
+        if abs(scaled - weight) > 1e-6:
+            raise ValueError("Percentages support at most four decimal places")
+        weights.append(weight)
+    return weights
+
+
+def split_by_percentage(amounts: Sequence[int], weights: Sequence[int], counts: Sequence[int],
+                        use_numpy: Optional[bool] = None) -> SplitBatch:
+    """
+    Split every amount by percentages, which must add up to exactly 100 per expense.
+
+    Percentages are passed as the integer weights returned by scale_percentages.
+    """
+    batch = split_by_weights(amounts, weights, counts, use_numpy=use_numpy)
+
+    offsets = batch.offsets
+    for index in range(len(batch)):
+        if index not in batch.errors and sum(weights[offsets[index]:offsets[index + 1]]) != FULL_PERCENTAGE:
+            batch.errors[index] = "Total percentage must equal 100%"
+    return batch
+
+
+def split_by_amounts(amounts: Sequence[int], custom_amounts: Sequence[int], counts: Sequence[int],
+                     use_numpy: Optional[bool] = None) -> SplitBatch:
+    """Use the given per-participant amounts, checking that each expense adds up."""
+    offsets = offsets_from_counts(counts)
+    errors = _check_amounts(amounts, offsets)
+
+    if _use_numpy(use_numpy):
+        shares = np.asarray(custom_amounts, dtype=np.int64)
+        segment_ids = np.repeat(np.arange(len(counts)), np.asarray(counts, dtype=np.int64))
+        sums = np.zeros(len(counts), dtype=np.int64)
+        np.add.at(sums, segment_ids, shares)
+        mismatched = np.flatnonzero(sums != np.asarray(amounts, dtype=np.int64)).tolist()
+    else:
+        shares = array('q', custom_amounts)
+        mismatched = [
+            index for index, amount in enumerate(amounts)
+            if sum(shares[offsets[index]:offsets[index + 1]]) != amount
+        ]
+
+    for index in mismatched:
+        errors.setdefault(index, "The total of custom amounts must match the total amount.")
+    return SplitBatch(shares, offsets, errors)
@@ -0,0 +1,210 @@
+from datetime import datetime, timedelta
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+from flask import current_app, has_app_context # type: ignore
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError # type: ignore
+from .bloom import BloomFilter
+
+# Tokens without an exp claim are kept as long as the longest-lived token we issue
+DEFAULT_TOKEN_LIFETIME = timedelta(days=7)
+
+# Each refresh re-reads entries revoked this long before the previous one. An
+# entry stamped before a refresh but committed after it, or by a worker whose
+# clock runs behind, is still picked up.
+REFRESH_OVERLAP = timedelta(seconds=30)
+
+
+class MemoryBlocklistStore:
+    """
+    Revoked JTIs held in this process only.
+
+    The local stand-in for tests and single-process development; revocations
+    are lost on restart and not seen by other workers.
+    """
+
+    def __init__(self):
+        self._expiry: Dict[str, datetime] = {}
+        self._revoked_at: Dict[str, datetime] = {}
+        self._lock = threading.Lock()
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._revoked_at.setdefault(jti, datetime.utcnow())
+            self._expiry[jti] = expires_at
+
+    def contains(self, jti: str) -> bool:
+        expires_at = self._expiry.get(jti)
+        return expires_at is not None and expires_at > datetime.utcnow()
+
+    def changes_since(self, since: datetime) -> List[str]:
+        with self._lock:
+            return [jti for jti, revoked_at in self._revoked_at.items() if revoked_at >= since]
+
+    def active(self) -> List[str]:
+        now = datetime.utcnow()
+        return [jti for jti, expires_at in self._expiry.items() if expires_at > now]
+
+    def prune(self, now: datetime) -> int:
+        with self._lock:
+            expired = [jti for jti, expires_at in self._expiry.items() if expires_at <= now]
+            for jti in expired:
+                del self._expiry[jti]
+                del self._revoked_at[jti]
+            return len(expired)
+
+
+class DatabaseBlocklistStore:
+    """Revoked JTIs in the revoked_tokens table, shared by every worker and kept across restarts."""
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        from .. import db
+        from ..models import RevokedToken
+
+        try:
+            db.session.add(RevokedToken(jti=jti, expires_at=expires_at))
+            db.session.commit()
+        except IntegrityError:
+            # Already revoked, e.g. a double logout
+            db.session.rollback()
+
+    def contains(self, jti: str) -> bool:
+        from .. import db
+        from ..models import RevokedToken
+
+        return db.session.query(RevokedToken.id).filter(
+            RevokedToken.jti == jti,
+            RevokedToken.expires_at > datetime.utcnow()
+        ).first() is not None
+
+    def changes_since(self, since: datetime) -> List[str]:
+        from .. import db
+        from ..models import RevokedToken
+
+        return [jti for (jti,) in db.session.query(RevokedToken.jti).filter(RevokedToken.revoked_at >= since)]
+
+    def active(self) -> List[str]:
+        from .. import db
+        from ..models import RevokedToken
+
+        return [jti for (jti,) in db.session.query(RevokedToken.jti).filter(RevokedToken.expires_at > datetime.utcnow())]
+
+    def prune(self, now: datetime) -> int:
+        from .. import db
+        from ..models import RevokedToken
+
+        # Runs during request authentication, so it must not commit the request's session
+        with db.engine.begin() as connection:
+            result = connection.execute(RevokedToken.__table__.delete().where(RevokedToken.expires_at <= now))
+        return result.rowcount
+
+
+class TokenBlocklist:
+    """
+    A blocklist store fronted by a per-worker bloom filter.
+
+    The filter is refreshed incrementally with entries revoked since shortly
+    before the last refresh, so the common "not revoked" answer needs no I/O.
+    Only possible hits are confirmed with the store. Expired entries are
+    pruned from the store periodically, and the filter is rebuilt from the
+    live entries every rebuild_interval or once it fills up.
+    """
+
+    def __init__(self, store, capacity: int = 100000, refresh_interval: float = 2.0, prune_interval: float = 300.0,
+                 rebuild_interval: float = 300.0):
+        self.store = store
+        self.capacity = capacity
+        self.refresh_interval = refresh_interval
+        self.prune_interval = prune_interval
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        self._bloom = BloomFilter(capacity)
+        self._since: Optional[datetime] = None
+        self._refreshed_at = None
+        self._pruned_at = time.monotonic()
+        self._rebuilt_at = None
+
+    def revoke(self, jti: str, expires_at: Optional[datetime] = None) -> None:
+        self.store.add(jti, expires_at or datetime.utcnow() + DEFAULT_TOKEN_LIFETIME)
+        with self._lock:
+            self._bloom.add(jti)
+
+    def is_revoked(self, jti: str) -> bool:
+        self._refresh_if_due()
+        if jti not in self._bloom:
+            return False
+        return self.store.contains(jti)
+
+    def _refresh_if_due(self) -> None:
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+
+        with self._lock:
+            if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+                return
+
+            if now - self._pruned_at >= self.prune_interval:
+                self._pruned_at = now
+                try:
+                    self.store.prune(datetime.utcnow())
+                except SQLAlchemyError as e:
+                    # Housekeeping only, e.g. the table is locked: try again next time
+                    logging.warning(f"Pruning the token blocklist failed: {e}")
+
+            started_at = datetime.utcnow()
+            if (self._since is None or self._bloom.is_saturated
+                    or now - self._rebuilt_at >= self.rebuild_interval):
+                # Pruned entries can't be removed from a bloom filter, so start over from the live ones
+                bloom = BloomFilter(self.capacity)
+                for jti in self.store.active():
+                    bloom.add(jti)
+                self._bloom = bloom
+                self._rebuilt_at = now
+            else:
+                for jti in self.store.changes_since(self._since):
+                    self._bloom.add(jti)
+
+            self._since = started_at - REFRESH_OVERLAP
+            self._refreshed_at = now
+
+
+# Used outside an app created by create_app, e.g. blueprints under test
+_default_blocklist = TokenBlocklist(MemoryBlocklistStore(), refresh_interval=0)
+
+
+def init_token_blocklist(app) -> TokenBlocklist:
+    """Create the app's blocklist from TOKEN_BLOCKLIST_STORE ('database', 'memory' or a store object)."""
+    store = app.config.get('TOKEN_BLOCKLIST_STORE', 'database')
+    if store == 'database':
+        store = DatabaseBlocklistStore()
+    elif store == 'memory':
+        store = MemoryBlocklistStore()
+
+    blocklist = TokenBlocklist(
+        store,
+        capacity=app.config.get('TOKEN_BLOCKLIST_CAPACITY', 100000),
+        refresh_interval=app.config.get('TOKEN_BLOCKLIST_REFRESH_SECONDS', 2.0),
+        rebuild_interval=app.config.get('TOKEN_BLOCKLIST_REBUILD_SECONDS', 300.0),
+    )
+    app.extensions['token_blocklist'] = blocklist
+    return blocklist
+
+
+def get_blocklist() -> TokenBlocklist:
+    if has_app_context():
+        blocklist = current_app.extensions.get('token_blocklist')
+        if blocklist is not None:
+            return blocklist
+    return _default_blocklist
+
+
+def revoke(jti: str, expires_at: Optional[datetime] = None) -> None:
+    """Add a token's JTI to the blocklist until it expires."""
+    get_blocklist().revoke(jti, expires_at)
+
+
+def is_revoked(jti: str) -> bool:
+    """Return True if the token has been revoked."""
+    return get_blocklist().is_revoked(jti)
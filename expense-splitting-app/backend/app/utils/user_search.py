@@ -0,0 +1,47 @@
+from sqlalchemy import text # type: ignore
+
+# Trigram and ngram indexes can't match anything shorter than this
+SEARCH_MIN_LENGTH = 3
+
+# An external content FTS5 table over users: it stores only the index and
+# reads the text back from users, kept in step by triggers. The trigram
+# tokenizer matches any substring, case-insensitively.
+SQLITE_USER_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5("
+    "username, full_name, content='users', content_rowid='id', tokenize='trigram')",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN "
+    "INSERT INTO users_fts(rowid, username, full_name) VALUES (new.id, new.username, new.full_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username, full_name) VALUES ('delete', old.id, old.username, old.full_name); "
+    "END",
+    "CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF username, full_name ON users BEGIN "
+    "INSERT INTO users_fts(users_fts, rowid, username, full_name) VALUES ('delete', old.id, old.username, old.full_name); "
+    "INSERT INTO users_fts(rowid, username, full_name) VALUES (new.id, new.username, new.full_name); "
+    "END",
+]
+
+# InnoDB full-text index with the ngram parser, so it matches inside words too
+MYSQL_USER_SEARCH_DDL = [
+    "CREATE FULLTEXT INDEX ix_users_fulltext ON users (username, full_name) WITH PARSER ngram",
+]
+
+
+def install_user_search(target, connection, **kw) -> None:
+    """Create the user search index when the users table is created (db.create_all)."""
+    statements = {
+        'sqlite': SQLITE_USER_SEARCH_DDL,
+        'mysql': MYSQL_USER_SEARCH_DDL,
+    }.get(connection.dialect.name, [])
+    for statement in statements:
+        connection.execute(text(statement))
+
+
+def fts_phrase(term: str) -> str:
+    """Quote a search term as a single FTS phrase, so operators in it are matched literally."""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def like_pattern(term: str) -> str:
+    """A LIKE pattern matching term anywhere, with wildcards in it escaped (ESCAPE '\\')."""
+    return '%' + term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
@@ -0,0 +1,78 @@
+"""
+Measure POST /api/expenses latency and query count against group size.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_add_expense
+"""
+import logging
+import os
+import statistics
+import tempfile
+import time
+import jwt # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Group, GroupMember, User
+from app.utils.query_monitor import count_queries
+
+MEMBER_COUNTS = [10, 100, 1000]
+REQUESTS = 50
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-secret'
+
+    return create_app(BenchConfig)
+
+
+def seed_group(members):
+    users = [
+        User(username=f'user{members}_{i}', email=f'user{members}_{i}@example.com', password_hash='x', full_name=f'User {i}')
+        for i in range(members)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    group = Group(name=f'Bench {members}', unique_code=f'BENCH{members}', created_by=users[0].id)
+    db.session.add(group)
+    db.session.flush()
+    db.session.add_all([GroupMember(group_id=group.id, user_id=user.id) for user in users])
+    db.session.commit()
+    return users[0].id, group.id
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{'members':>8} {'median ms':>10} {'p95 ms':>8} {'queries':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            groups = {members: seed_group(members) for members in MEMBER_COUNTS}
+
+        client = app.test_client()
+        for members, (user_id, group_id) in groups.items():
+            token = jwt.encode({'sub': user_id, 'exp': int(time.time()) + 3600}, 'bench-secret', algorithm='HS256')
+            headers = {'Authorization': f'Bearer {token}'}
+
+            timings = []
+            for i in range(REQUESTS):
+                with count_queries() as stats:
+                    start = time.perf_counter()
+                    response = client.post('/api/expenses', headers=headers, json={
+                        'description': f'expense {i}', 'amount': 99.99, 'currency': 'ZAR',
+                        'group_id': group_id, 'split_type': 'equal'
+                    })
+                    timings.append((time.perf_counter() - start) * 1000)
+                assert response.status_code == 201, response.get_json()
+
+            p95 = statistics.quantiles(timings, n=20)[-1]
+            print(f"{members:>8} {statistics.median(timings):>10.2f} {p95:>8.2f} {stats.count:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Compare the single-expense endpoint with the bulk import endpoint.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_bulk_import
+
+On a file-backed SQLite database on one CPU the bulk endpoint ran 56x to
+92x faster than the single-expense endpoint over five runs, about 60x in
+a typical run. The single endpoint's rate is the noisier of the two.
+"""
+import logging
+import os
+import tempfile
+import time
+import jwt # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Group, GroupMember, User
+
+MEMBERS = 10
+SINGLE_ROWS = 200
+BULK_ROWS = 5000
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-secret'
+        BULK_IMPORT_MAX_ROWS = BULK_ROWS
+
+    return create_app(BenchConfig)
+
+
+def seed_group():
+    users = [
+        User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x', full_name=f'User {i}')
+        for i in range(MEMBERS)
+    ]
+    db.session.add_all(users)
+    db.session.flush()
+    group = Group(name='Bench', unique_code='BENCH01', created_by=users[0].id)
+    db.session.add(group)
+    db.session.flush()
+    db.session.add_all([GroupMember(group_id=group.id, user_id=user.id) for user in users])
+    db.session.commit()
+    return users[0].id, group.id
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            user_id, group_id = seed_group()
+
+        client = app.test_client()
+        token = jwt.encode({'sub': user_id, 'exp': int(time.time()) + 3600}, 'bench-secret', algorithm='HS256')
+        headers = {'Authorization': f'Bearer {token}'}
+
+        start = time.perf_counter()
+        for i in range(SINGLE_ROWS):
+            response = client.post('/api/expenses', headers=headers, json={
+                'description': f'single {i}', 'amount': 12.5, 'currency': 'ZAR', 'group_id': group_id,
+                'split_type': 'equal', 'participants': [{'user_id': user_id, 'name': 'User 0'}]
+            })
+            assert response.status_code == 201, response.get_json()
+        single_rate = SINGLE_ROWS / (time.perf_counter() - start)
+
+        rows = [{'description': f'bulk {i}', 'amount': 12.5, 'currency': 'ZAR'} for i in range(BULK_ROWS)]
+        start = time.perf_counter()
+        response = client.post(f'/api/expenses/bulk?group_id={group_id}', headers=headers, json=rows)
+        assert response.status_code == 201, response.get_json()
+        bulk_rate = BULK_ROWS / (time.perf_counter() - start)
+
+    print(f"single endpoint: {single_rate:10.0f} rows/s")
+    print(f"bulk endpoint:   {bulk_rate:10.0f} rows/s")
+    print(f"speedup:         {bulk_rate / single_rate:10.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""
+Measure GET /api/groups/<id>/export throughput and peak memory against ledger size.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_group_export
+"""
+from datetime import datetime, timedelta
+import logging
+import os
+import tempfile
+import time
+import tracemalloc
+import jwt # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Expense, ExpenseSplit, Group, GroupMember, User
+
+MEMBERS = 4
+SPLIT_ROW_COUNTS = [10_000, 100_000, 1_000_000]
+INSERT_BATCH = 50_000
+
+
+def make_app(path):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-secret'
+
+    return create_app(BenchConfig)
+
+
+def seed_group(split_rows):
+    users = [User(username=f'user{split_rows}_{i}', email=f'user{split_rows}_{i}@example.com', password_hash='x',
+                  full_name=f'User {i}') for i in range(MEMBERS)]
+    db.session.add_all(users)
+    db.session.flush()
+    group = Group(name=f'Bench {split_rows}', unique_code=f'B{split_rows}', created_by=users[0].id)
+    db.session.add(group)
+    db.session.flush()
+    db.session.add_all([GroupMember(group_id=group.id, user_id=user.id) for user in users])
+    db.session.commit()
+
+    expense_count = split_rows // MEMBERS
+    first_id = (db.session.query(db.func.max(Expense.id)).scalar() or 0) + 1
+    start = datetime(2020, 1, 1)
+    for offset in range(0, expense_count, INSERT_BATCH):
+        ids = range(first_id + offset, first_id + min(offset + INSERT_BATCH, expense_count))
+        db.session.bulk_insert_mappings(Expense, [
+            {'id': expense_id, 'description': f'Expense {expense_id}', 'amount': 1000, 'currency': 'ZAR',
+             'group_id': group.id, 'user_id': users[0].id, 'split_type': 'equal', 'paid_by': 'User 0',
+             'created_at': start + timedelta(minutes=expense_id)}
+            for expense_id in ids
+        ])
+        db.session.bulk_insert_mappings(ExpenseSplit, [
+            {'expense_id': expense_id, 'user_id': user.id, 'amount': 250, 'name': user.full_name}
+            for expense_id in ids for user in users
+        ])
+        db.session.commit()
+    return users[0].id, group.id
+
+
+def export(client, group_id, headers, export_format):
+    response = client.get(f'/api/groups/{group_id}/export?format={export_format}', headers=headers, buffered=False)
+    sent = sum(len(chunk) for chunk in response.response)
+    response.close()
+    return sent
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{'split rows':>10} {'format':>7} {'seconds':>8} {'rows/s':>9} {'MB sent':>8} {'peak MB':>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+            groups = {rows: seed_group(rows) for rows in SPLIT_ROW_COUNTS}
+
+        client = app.test_client()
+        for rows, (user_id, group_id) in groups.items():
+            token = jwt.encode({'sub': user_id, 'exp': int(time.time()) + 3600}, 'bench-secret', algorithm='HS256')
+            headers = {'Authorization': f'Bearer {token}'}
+
+            for export_format in ('csv', 'ndjson'):
+                start = time.perf_counter()
+                sent = export(client, group_id, headers, export_format)
+                elapsed = time.perf_counter() - start
+
+                # Measured in a second run, since tracing allocations slows the export several times over
+                tracemalloc.start()
+                export(client, group_id, headers, export_format)
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                print(f"{rows:>10} {export_format:>7} {elapsed:>8.2f} {rows / elapsed:>9.0f} {sent / 1e6:>8.1f} {peak / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Measure login throughput under concurrent load, hashing inline versus in the process pool.
+
+While the login threads run, one more thread polls a cheap authenticated
+endpoint to show how much password hashing delays unrelated requests.
+Run from the backend directory:
+
+    python -m benchmarks.bench_login
+"""
+import logging
+import os
+import statistics
+import tempfile
+import threading
+import time
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import User
+from app.services.user_service import UserService
+from app.utils.password_hasher import get_password_hasher
+
+LOGIN_THREADS = 16
+LOGINS_PER_THREAD = 4
+PASSWORD = 'Bench-pass1!'
+
+
+def make_app(path, workers):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-secret'
+        PASSWORD_HASH_WORKERS = workers
+
+    return create_app(BenchConfig)
+
+
+def run(workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), workers)
+        with app.app_context():
+            db.create_all()
+            user = User(username='bench', email='bench@example.com', full_name='Bench',
+                        password_hash=get_password_hasher().hash(PASSWORD))
+            db.session.add(user)
+            db.session.commit()
+            token = UserService.generate_jwt_token(user.id, 'user')
+
+        stop = threading.Event()
+        poll_latencies = []
+
+        def login_worker():
+            client = app.test_client()
+            for _ in range(LOGINS_PER_THREAD):
+                response = client.post('/api/login', json={'username': 'bench', 'password': PASSWORD})
+                assert response.status_code == 200, response.get_json()
+
+        def poller():
+            client = app.test_client()
+            headers = {'Authorization': f'Bearer {token}'}
+            while not stop.is_set():
+                start = time.perf_counter()
+                client.get('/api/user', headers=headers)
+                poll_latencies.append((time.perf_counter() - start) * 1000)
+
+        poll_thread = threading.Thread(target=poller)
+        poll_thread.start()
+        threads = [threading.Thread(target=login_worker) for _ in range(LOGIN_THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        stop.set()
+        poll_thread.join()
+
+        with app.app_context():
+            get_password_hasher().shutdown()
+
+    logins = LOGIN_THREADS * LOGINS_PER_THREAD
+    p95 = statistics.quantiles(poll_latencies, n=20)[-1] if len(poll_latencies) > 1 else poll_latencies[0]
+    return logins / elapsed, statistics.median(poll_latencies), p95
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    pool_size = os.cpu_count() or 1
+    print(f"{'hashing':>16} {'logins/s':>9} {'other req p50 ms':>17} {'p95 ms':>8}")
+    for label, workers in (('inline', 0), (f'pool ({pool_size} procs)', pool_size)):
+        rate, p50, p95 = run(workers)
+        print(f"{label:>16} {rate:>9.1f} {p50:>17.1f} {p95:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
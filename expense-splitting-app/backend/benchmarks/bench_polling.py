@@ -0,0 +1,131 @@
+"""
+Measure the database load of polling clients with and without conditional GETs.
+
+Every client repeatedly polls its user, profile, groups list, and one
+group's members and expenses, the way the frontend refreshes its views.
+Between rounds a few expenses are added so some groups really do change.
+With conditional GETs on, clients send back the ETag they were given and
+unchanged resources are answered with 304 after one version query.
+The first round only fetches everything once; the rounds after it are measured.
+Run from the backend directory:
+
+    python -m benchmarks.bench_polling
+"""
+import logging
+import os
+import itertools
+import random
+import tempfile
+import time
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Group, GroupMember, User
+from app.services.expense_service import ExpenseService
+from app.services.user_service import UserService
+from app.utils.query_monitor import count_queries
+
+CLIENTS = 1000
+GROUP_SIZE = 10
+EXPENSES_PER_GROUP = 20
+ROUNDS = 3  # Measured rounds, after one warm-up round
+WRITES_PER_ROUND = 5  # Expenses added between rounds, each in a random group
+
+_descriptions = itertools.count()
+
+
+def make_app(path, enabled):
+    class BenchConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f'sqlite:///{path}'
+        SECRET_KEY = 'bench-secret'
+        JWT_SECRET_KEY = 'bench-secret'
+        CONDITIONAL_GET_ENABLED = enabled
+
+    return create_app(BenchConfig)
+
+
+def add_expense(group_id, payer_id):
+    ExpenseService.add_expense(
+        payer_id, 12.50, f'Coffee {next(_descriptions)}', group_id,
+        split_type='equal', paid_by='Payer', currency='ZAR', participants=[]
+    )
+
+
+def seed():
+    users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x', full_name=f'User {i}')
+             for i in range(CLIENTS)]
+    db.session.add_all(users)
+    db.session.flush()
+
+    memberships, owners = {}, {}
+    for start in range(0, CLIENTS, GROUP_SIZE):
+        members = users[start:start + GROUP_SIZE]
+        group = Group(name=f'Group {start // GROUP_SIZE}', unique_code=f'G{start:06d}', created_by=members[0].id)
+        db.session.add(group)
+        db.session.flush()
+        owners[group.id] = members[0].id
+        for user in members:
+            db.session.add(GroupMember(group_id=group.id, user_id=user.id))
+            memberships[user.id] = group.id
+    db.session.commit()
+
+    for group_id, owner_id in owners.items():
+        for _ in range(EXPENSES_PER_GROUP):
+            add_expense(group_id, owner_id)
+    return memberships, owners
+
+
+def run(enabled):
+    random.seed(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        app = make_app(os.path.join(tmp, 'bench.db'), enabled)
+        with app.app_context():
+            db.create_all()
+            memberships, owners = seed()
+            tokens = {user_id: UserService.generate_jwt_token(user_id, 'user') for user_id in memberships}
+
+        client = app.test_client()
+        etags = {}
+        requests = not_modified = sent = queries = 0
+        db_time = elapsed = 0.0
+        for round_number in range(ROUNDS + 1):
+            if round_number:
+                with app.app_context():
+                    for group_id in random.sample(sorted(owners), WRITES_PER_ROUND):
+                        add_expense(group_id, owners[group_id])
+
+            start = time.perf_counter()
+            with count_queries() as stats:
+                for user_id, group_id in memberships.items():
+                    for url in ('/api/user', '/api/profile', '/api/groups',
+                                f'/api/groups/members?group_id={group_id}', f'/api/expenses?group_id={group_id}'):
+                        headers = {'Authorization': f'Bearer {tokens[user_id]}'}
+                        if (user_id, url) in etags:
+                            headers['If-None-Match'] = etags[user_id, url]
+                        response = client.get(url, headers=headers)
+                        if round_number:
+                            requests += 1
+                            not_modified += response.status_code == 304
+                            sent += len(response.data)
+                        if 'ETag' in response.headers:
+                            etags[user_id, url] = response.headers['ETag']
+            if round_number:
+                queries += stats.count
+                db_time += stats.total_time
+                elapsed += time.perf_counter() - start
+
+    return requests, not_modified, queries, db_time, sent, elapsed
+
+
+def main():
+    logging.disable(logging.CRITICAL)
+    print(f"{CLIENTS} clients, {ROUNDS} rounds of 5 endpoints, {WRITES_PER_ROUND} expenses added per round")
+    print(f"{'conditional GET':>15} {'requests':>9} {'304s':>6} {'queries':>8} {'queries/req':>12} "
+          f"{'db ms':>6} {'MB sent':>8} {'req/s':>6}")
+    for enabled in (False, True):
+        requests, not_modified, queries, db_time, sent, elapsed = run(enabled)
+        print(f"{'on' if enabled else 'off':>15} {requests:>9} {not_modified:>6} {queries:>8} {queries / requests:>12.2f} "
+              f"{db_time * 1000:>6.0f} {sent / 1e6:>8.1f} {requests / elapsed:>6.0f}")
+
+
+if __name__ == '__main__':
+    main()
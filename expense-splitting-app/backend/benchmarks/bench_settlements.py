@@ -0,0 +1,40 @@
+"""
+Benchmark the debt-simplification engine against group size.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_settlements
+"""
+import random
+import statistics
+import time
+from app.services.settlement_service import SettlementService
+
+MEMBER_COUNTS = [10, 100, 1000, 5000, 10000, 50000]
+REPEATS = 5
+
+
+def random_balances(members, rng):
+    """Build a zero-sum set of net balances for a group, in cents."""
+    balances = {user_id: rng.randint(-50000, 50000) for user_id in range(1, members)}
+    balances[members] = -sum(balances.values())
+    return balances
+
+
+def main():
+    rng = random.Random(0)
+    print(f"{'members':>8} {'median ms':>10} {'transfers':>10}")
+
+    for members in MEMBER_COUNTS:
+        balances = random_balances(members, rng)
+        timings = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            transfers = SettlementService.simplify_debts(balances)
+            timings.append((time.perf_counter() - start) * 1000)
+
+        print(f"{members:>8} {statistics.median(timings):>10.2f} {len(transfers):>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+"""
+Benchmark the batch split calculator against the per-expense calculate_splits path.
+
+Each run splits enough expenses to touch about 100,000 participant shares,
+for groups of 10 to 10,000 participants. Run from the backend directory:
+
+    python -m benchmarks.bench_split_calculator
+"""
+import logging
+import random
+import statistics
+import time
+from app.services.expense_service import ExpenseService
+from app.utils import split_calculator
+
+PARTICIPANT_COUNTS = [10, 100, 1000, 10000]
+SHARES_PER_RUN = 100_000
+REPEATS = 3
+
+
+def timed(func):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def percentages_for(participants, rng):
+    """Random percentages with two decimals that add up to exactly 100."""
+    basis_points = [rng.randint(1, 100) for _ in range(participants)]
+    scaled = split_calculator.split_by_weights([10000], basis_points, [participants], use_numpy=False)
+    return [share / 100 for share in scaled.shares_for(0)]
+
+
+def main():
+    # calculate_splits logs every result at DEBUG level
+    logging.getLogger().setLevel(logging.WARNING)
+    rng = random.Random(0)
+    engines = [('per-expense', None), ('batch python', False)]
+    if split_calculator.numpy_available():
+        engines.append(('batch numpy', True))
+    else:
+        print("NumPy is not installed, skipping the vectorised path\n")
+
+    print(f"{'split':>10} {'people':>7} {'expenses':>9} " + ' '.join(f"{name + ' ms':>16}" for name, _ in engines))
+
+    for participants in PARTICIPANT_COUNTS:
+        expenses = max(SHARES_PER_RUN // participants, 1)
+        amounts = [rng.randint(100, 10_000_000) for _ in range(expenses)]
+        counts = [participants] * expenses
+        people = [{'user_id': user_id, 'name': f'user{user_id}'} for user_id in range(participants)]
+        percentages = percentages_for(participants, rng)
+        weights = split_calculator.scale_percentages(percentages) * expenses
+        with_percentages = [{**person, 'percentage': percentage} for person, percentage in zip(people, percentages)]
+
+        cases = [
+            ('equal', people,
+             lambda use_numpy: split_calculator.split_equal(amounts, counts, use_numpy=use_numpy)),
+            ('percentage', with_percentages,
+             lambda use_numpy: split_calculator.split_by_percentage(amounts, weights, counts, use_numpy=use_numpy)),
+        ]
+        for split_type, split_participants, run_batch in cases:
+            results = []
+            for _, use_numpy in engines:
+                if use_numpy is None:
+                    results.append(timed(lambda: [
+                        ExpenseService.calculate_splits({
+                            'split_type': split_type, 'amount': amount, 'participants': split_participants
+                        })
+                        for amount in amounts
+                    ]))
+                else:
+                    results.append(timed(lambda: run_batch(use_numpy)))
+
+            print(f"{split_type:>10} {participants:>7} {expenses:>9} " + ' '.join(f"{ms:>16.1f}" for ms in results))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+"""store money as integer minor units
+
+Revision ID: 1c5c6b29da2d
+Revises: 732dee520c93
+Create Date: 2026-10-18 15:43:19.692666
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1c5c6b29da2d'
+down_revision = '732dee520c93'
+branch_labels = None
+depends_on = None
+
+# (table, column) pairs that hold money
+MONEY_COLUMNS = [
+    ('balance', 'balance'),
+    ('expense_splits', 'amount'),
+    ('expenses', 'amount'),
+    ('group_balances', 'balance'),
+    ('payment', 'amount'),
+]
+
+
+def upgrade():
+    for table, column in MONEY_COLUMNS:
+        # Convert existing major-unit values to cents before narrowing the type
+        op.execute(f'UPDATE {table} SET {column} = ROUND({column} * 100)')
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column,
+                   existing_type=sa.FLOAT(),
+                   type_=sa.Integer(),
+                   existing_nullable=False)
+
+
+def downgrade():
+    for table, column in reversed(MONEY_COLUMNS):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.alter_column(column,
+                   existing_type=sa.Integer(),
+                   type_=sa.FLOAT(),
+                   existing_nullable=False)
+        op.execute(f'UPDATE {table} SET {column} = {column} / 100.0')
@@ -0,0 +1,56 @@
+"""add user search index
+
+Revision ID: 31099845ae30
+Revises: 45c4a8f1562e
+Create Date: 2026-10-18 17:02:44.118204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '31099845ae30'
+down_revision = '45c4a8f1562e'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # External content FTS5 table with the trigram tokenizer, so any substring matches
+        op.execute(
+            "CREATE VIRTUAL TABLE users_fts USING fts5("
+            "username, full_name, content='users', content_rowid='id', tokenize='trigram')"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_insert AFTER INSERT ON users BEGIN "
+            "INSERT INTO users_fts(rowid, username, full_name) VALUES (new.id, new.username, new.full_name); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_delete AFTER DELETE ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, username, full_name) VALUES ('delete', old.id, old.username, old.full_name); "
+            "END"
+        )
+        op.execute(
+            "CREATE TRIGGER users_fts_update AFTER UPDATE OF username, full_name ON users BEGIN "
+            "INSERT INTO users_fts(users_fts, rowid, username, full_name) VALUES ('delete', old.id, old.username, old.full_name); "
+            "INSERT INTO users_fts(rowid, username, full_name) VALUES (new.id, new.username, new.full_name); "
+            "END"
+        )
+        # Index the users that already exist
+        op.execute("INSERT INTO users_fts(users_fts) VALUES ('rebuild')")
+    elif dialect == 'mysql':
+        op.execute("CREATE FULLTEXT INDEX ix_users_fulltext ON users (username, full_name) WITH PARSER ngram")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS users_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS users_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS users_fts_insert")
+        op.execute("DROP TABLE IF EXISTS users_fts")
+    elif dialect == 'mysql':
+        op.drop_index('ix_users_fulltext', table_name='users')
@@ -0,0 +1,62 @@
+import time
+import unittest
+import jwt # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Group, GroupMember, User
+
+
+class GroupTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SECRET_KEY = 'test-secret-key'
+    JWT_SECRET_KEY = 'test-secret-key'
+
+
+class GroupTestCase(unittest.TestCase):
+    """
+    An in-memory database with users alice, bob and carol and a group called Trip.
+
+    Subclasses can set config, the usernames to create and how many of them
+    join the group (members, all of them by default).
+    """
+
+    config = GroupTestConfig
+    usernames = ('alice', 'bob', 'carol')
+    members = None
+
+    def setUp(self):
+        """Set up an in-memory database with one group."""
+        self.app = create_app(self.config)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.users = []
+        for name in self.usernames:
+            user = User(username=name, email=f'{name}@example.com', password_hash='x', full_name=name.title())
+            db.session.add(user)
+            self.users.append(user)
+        db.session.flush()
+
+        self.group = Group(name='Trip', unique_code='TRIP123', created_by=self.users[0].id)
+        db.session.add(self.group)
+        db.session.flush()
+        for user in self.users[:self.members]:
+            db.session.add(GroupMember(group_id=self.group.id, user_id=user.id))
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down the test database."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _prepare_auth_headers(self, user_id, **headers):
+        """Prepare authentication headers for a test request."""
+        token = jwt.encode(
+            {'sub': user_id, 'exp': int(time.time()) + 3600},
+            self.app.config['SECRET_KEY'],
+            algorithm='HS256'
+        )
+        return {'Authorization': f'Bearer {token}', **headers}
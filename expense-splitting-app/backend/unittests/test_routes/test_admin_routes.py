@@ -150,7 +150,8 @@ class TestAdminRoutes(unittest.TestCase):
         routes_to_test = [
             ('/api/admin/users/2/promote', 'POST'),
             ('/api/admin/users/2/revoke', 'POST'),
-            ('/api/delete-user/2', 'DELETE')
+            ('/api/delete-user/2', 'DELETE'),
+            ('/api/admin/cache-stats', 'GET')
         ]
 
         # Generate a non-admin token
@@ -166,10 +167,25 @@ class TestAdminRoutes(unittest.TestCase):
                 elif method == 'DELETE':
                     response = self.client.delete(route, 
                                                   headers={'Authorization': f'Bearer {non_admin_token}'})
+                else:
+                    response = self.client.get(route,
+                                               headers={'Authorization': f'Bearer {non_admin_token}'})
 
                 # Assert forbidden access
                 self.assertEqual(response.status_code, 403)
                 self.assertIn('Admin access required', str(response.json))
 
+    def test_cache_stats(self):
+        """Test that admins can read the cache statistics."""
+        admin_token = self._generate_test_token(1)
+        stats = {'backend': 'memory', 'hits': 3, 'misses': 1}
+
+        with patch('app.routes.admin.get_cache') as mock_get_cache:
+            mock_get_cache.return_value.stats.return_value = stats
+            response = self.client.get('/api/admin/cache-stats', headers={'Authorization': f'Bearer {admin_token}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertDictEqual(response.json, {'enabled': True, **stats})
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+import unittest
+from app import db
+from app.models import GroupBalance, Payment, User
+from app.services import dashboard_service
+from app.services.balance_service import BalanceService
+from app.services.group_service import GroupService
+from app.services.expense_service import ExpenseService
+from app.utils.query_monitor import count_queries
+from unittests.base import GroupTestCase
+
+
+class TestBalanceRoutes(GroupTestCase):
+    def setUp(self):
+        """Set up the shared group with an empty dashboard cache."""
+        super().setUp()
+        dashboard_service._dashboard_cache.clear()
+
+    def _add_expense(self, user, amount, description):
+        return ExpenseService.add_expense(
+            user.id, amount, description, self.group.id,
+            split_type='equal', paid_by=user.full_name, currency='ZAR', participants=[]
+        )
+
+    def test_add_expense_updates_ledger(self):
+        """Test that adding an expense credits the payer and debits every participant."""
+        self._add_expense(self.users[0], 90, 'Dinner')
+
+        balances = {row.user_id: row.balance for row in GroupBalance.query.filter_by(group_id=self.group.id)}
+        self.assertEqual(balances[self.users[0].id], 6000)
+        self.assertEqual(balances[self.users[1].id], -3000)
+        self.assertEqual(balances[self.users[2].id], -3000)
+        self.assertEqual(sum(balances.values()), 0)
+
+    def test_uneven_split_keeps_every_cent(self):
+        """Test that an amount that doesn't divide evenly still balances to the cent."""
+        expense = self._add_expense(self.users[0], 100, 'Groceries')
+
+        self.assertEqual(sorted(split.amount for split in expense.expense_splits), [3333, 3333, 3334])
+        ledger = {row.user_id: row.balance for row in GroupBalance.query.filter_by(group_id=self.group.id)}
+        self.assertEqual(sum(ledger.values()), 0)
+        self.assertEqual(BalanceService.compute_group_balances(self.group.id), ledger)
+
+    def test_payment_settles_ledger(self):
+        """Test that a successful settlement moves the balance from payer to payee."""
+        self._add_expense(self.users[0], 90, 'Dinner')
+
+        payment = Payment(
+            user_id=self.users[1].id, payee_id=self.users[0].id, group_id=self.group.id,
+            amount=3000, currency='ZAR', payment_method='stripe', payment_status='success'
+        )
+        db.session.add(payment)
+        BalanceService.apply_payment(payment)
+        db.session.commit()
+
+        balances = {row.user_id: row.balance for row in GroupBalance.query.filter_by(group_id=self.group.id)}
+        self.assertEqual(balances[self.users[0].id], 3000)
+        self.assertEqual(balances[self.users[1].id], 0)
+        self.assertEqual(BalanceService.compute_group_balances(self.group.id), balances)
+
+    def test_get_group_balances(self):
+        """Test that the balances endpoint reads the ledger for every member."""
+        self._add_expense(self.users[0], 90, 'Dinner')
+        self._add_expense(self.users[1], 30, 'Taxi')
+
+        response = self.client.get(
+            f'/api/groups/{self.group.id}/balances',
+            headers=self._prepare_auth_headers(self.users[2].id)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        balances = {row['user_id']: row['balance'] for row in response.get_json()['balances']}
+        self.assertEqual(balances, {
+            self.users[0].id: 50.0,
+            self.users[1].id: -10.0,
+            self.users[2].id: -40.0,
+        })
+        self.assertEqual(response.get_json()['totals'], [{'currency': 'ZAR', 'total': 120.0, 'expense_count': 2}])
+
+    def test_get_group_balances_non_member(self):
+        """Test that users outside the group cannot read its balances."""
+        outsider = User(username='dave', email='dave@example.com', password_hash='x')
+        db.session.add(outsider)
+        db.session.commit()
+
+        response = self.client.get(
+            f'/api/groups/{self.group.id}/balances',
+            headers=self._prepare_auth_headers(outsider.id)
+        )
+
+        self.assertEqual(response.status_code, 403)
+
+    def test_group_dashboard(self):
+        """Test that the dashboard returns members, balances, expenses and the plan together."""
+        self._add_expense(self.users[0], 90, 'Dinner')
+        self._add_expense(self.users[1], 30, 'Taxi')
+
+        response = self.client.get(
+            f'/api/groups/{self.group.id}/dashboard',
+            headers=self._prepare_auth_headers(self.users[2].id)
+        )
+
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual({member['username']: member['balance'] for member in data['members']},
+                         {'alice': 50.0, 'bob': -10.0, 'carol': -40.0})
+        self.assertEqual([expense['description'] for expense in data['recent_expenses']], ['Taxi', 'Dinner'])
+        self.assertEqual(len(data['recent_expenses'][0]['participants']), 3)
+        self.assertIsNone(data['expenses_next_cursor'])
+        self.assertEqual(data['totals'], [{'currency': 'ZAR', 'total': 120.0, 'expense_count': 2}])
+        self.assertEqual(sum(transfer['amount'] for transfer in data['transfers']), 50.0)
+
+    def test_group_dashboard_is_cached_until_the_group_changes(self):
+        """Test that an unchanged group is served from memory and every write invalidates it."""
+        headers = self._prepare_auth_headers(self.users[1].id)
+        url = f'/api/groups/{self.group.id}/dashboard'
+        self._add_expense(self.users[0], 90, 'Dinner')
+        first = self.client.get(url, headers=headers).get_json()
+
+        with count_queries() as stats:
+            second = self.client.get(url, headers=headers).get_json()
+        self.assertEqual(second, first)
+        self.assertEqual(stats.count, 1)  # Just the membership and revision check
+
+        self._add_expense(self.users[1], 30, 'Taxi')
+        after_expense = self.client.get(url, headers=headers).get_json()
+        self.assertGreater(after_expense['group']['revision'], first['group']['revision'])
+        self.assertEqual(len(after_expense['recent_expenses']), 2)
+
+        dave = User(username='dave', email='dave@example.com', password_hash='x')
+        db.session.add(dave)
+        db.session.commit()
+        GroupService.add_user_to_group(dave.id, self.group.id)
+        after_join = self.client.get(url, headers=headers).get_json()
+        self.assertIn('dave', [member['username'] for member in after_join['members']])
+
+    def test_group_dashboard_access(self):
+        """Test that only members can read a dashboard, even once it is cached."""
+        self.client.get(f'/api/groups/{self.group.id}/dashboard', headers=self._prepare_auth_headers(self.users[0].id))
+        outsider = User(username='dave', email='dave@example.com', password_hash='x')
+        db.session.add(outsider)
+        db.session.commit()
+
+        response = self.client.get(f'/api/groups/{self.group.id}/dashboard',
+                                   headers=self._prepare_auth_headers(outsider.id))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/api/groups/999/dashboard', headers=self._prepare_auth_headers(outsider.id))
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
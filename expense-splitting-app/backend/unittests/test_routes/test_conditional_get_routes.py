@@ -0,0 +1,99 @@
+import unittest
+from app.services.expense_service import ExpenseService
+from app.services.profile_service import ProfileService
+from app.utils.query_monitor import count_queries
+from unittests.base import GroupTestCase
+
+
+class TestConditionalGetRoutes(GroupTestCase):
+    members = 2  # carol is an outsider
+
+    def _add_expense(self, amount, description):
+        ExpenseService.add_expense(
+            self.users[0].id, amount, description, self.group.id,
+            split_type='equal', paid_by='Alice', currency='ZAR', participants=[]
+        )
+
+    def test_unchanged_resources_answer_304_with_one_query(self):
+        """Test that every polled endpoint answers a repeated request with 304 after a single query."""
+        user_id = self.users[0].id
+        urls = [
+            '/api/user',
+            '/api/profile',
+            '/api/groups',
+            f'/api/groups/members?group_id={self.group.id}',
+            f'/api/expenses?group_id={self.group.id}',
+        ]
+        for url in urls:
+            first = self.client.get(url, headers=self._prepare_auth_headers(user_id))
+            self.assertEqual(first.status_code, 200, url)
+            etag = first.headers['ETag']
+            self.assertEqual(first.headers['Cache-Control'], 'private, no-cache')
+
+            with count_queries() as stats:
+                second = self.client.get(url, headers=self._prepare_auth_headers(user_id, **{'If-None-Match': etag}))
+            self.assertEqual(second.status_code, 304, url)
+            self.assertEqual(second.data, b'')
+            self.assertEqual(second.headers['ETag'], etag)
+            self.assertEqual(stats.count, 1, url)
+
+    def test_if_modified_since(self):
+        """Test that Last-Modified on the user's own record is honoured."""
+        headers = self._prepare_auth_headers(self.users[0].id)
+        first = self.client.get('/api/profile', headers=headers)
+        self.assertIn('Last-Modified', first.headers)
+
+        headers['If-Modified-Since'] = first.headers['Last-Modified']
+        self.assertEqual(self.client.get('/api/profile', headers=headers).status_code, 304)
+
+    def test_writes_change_the_etag(self):
+        """Test that an expense, a new member or a renamed member invalidates the group's ETags."""
+        user_id = self.users[0].id
+        urls = ['/api/groups', f'/api/groups/members?group_id={self.group.id}', f'/api/expenses?group_id={self.group.id}']
+        etags = {url: self.client.get(url, headers=self._prepare_auth_headers(user_id)).headers['ETag'] for url in urls}
+
+        for write in (
+            lambda: self._add_expense(20, 'Taxi'),
+            lambda: ProfileService.update_user_profile(self.users[1].id, 'Robert', None),
+        ):
+            write()
+            for url in urls:
+                response = self.client.get(url, headers=self._prepare_auth_headers(user_id, **{'If-None-Match': etags[url]}))
+                self.assertEqual(response.status_code, 200, url)
+                self.assertNotEqual(response.headers['ETag'], etags[url])
+                etags[url] = response.headers['ETag']
+
+        members = self.client.get(
+            f'/api/groups/members?group_id={self.group.id}', headers=self._prepare_auth_headers(user_id)
+        ).get_json()
+        self.assertIn('Robert', [member['full_name'] for member in members['members']])
+
+    def test_pages_and_users_get_their_own_etags(self):
+        """Test that the ETag depends on the query string and on who is asking."""
+        url = f'/api/expenses?group_id={self.group.id}'
+        alice = self.client.get(url, headers=self._prepare_auth_headers(self.users[0].id)).headers['ETag']
+        bob = self.client.get(url, headers=self._prepare_auth_headers(self.users[1].id)).headers['ETag']
+        small_page = self.client.get(url + '&per_page=1', headers=self._prepare_auth_headers(self.users[0].id)).headers['ETag']
+        self.assertEqual(len({alice, bob, small_page}), 3)
+
+    def test_errors_are_not_cached(self):
+        """Test that outsiders and missing groups get the usual errors, without an ETag."""
+        outsider = self._prepare_auth_headers(self.users[2].id, **{'If-None-Match': '*'})
+        response = self.client.get(f'/api/expenses?group_id={self.group.id}', headers=outsider)
+        self.assertEqual(response.status_code, 403)
+        self.assertNotIn('ETag', response.headers)
+
+        response = self.client.get('/api/expenses?group_id=999', headers=self._prepare_auth_headers(self.users[0].id))
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn('ETag', response.headers)
+
+    def test_disabled(self):
+        """Test that CONDITIONAL_GET_ENABLED=False leaves responses untouched."""
+        self.app.extensions['conditional_get'] = False
+        response = self.client.get('/api/user', headers=self._prepare_auth_headers(self.users[0].id))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main()
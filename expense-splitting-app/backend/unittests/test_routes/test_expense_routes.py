@@ -0,0 +1,323 @@
+from datetime import datetime
+import json
+import unittest
+from app import db
+from app.models import Expense, ExpenseSplit, GroupBalance, GroupMember, User
+from app.utils.query_monitor import count_queries
+from unittests.base import GroupTestCase
+
+
+class TestExpenseRoutes(GroupTestCase):
+    def _add_members(self, count):
+        """Add extra members to the test group."""
+        users = [User(username=f'member{i}', email=f'member{i}@example.com', password_hash='x') for i in range(count)]
+        db.session.add_all(users)
+        db.session.flush()
+        db.session.add_all([GroupMember(group_id=self.group.id, user_id=user.id) for user in users])
+        db.session.commit()
+
+    def test_add_expense_query_count(self):
+        """Test that adding an expense runs the same handful of queries whatever the group size."""
+        headers = self._prepare_auth_headers(self.users[0].id)
+        group_id = self.group.id
+
+        counts = []
+        for extra_members, description in ((0, 'Dinner'), (50, 'Hotel')):
+            self._add_members(extra_members)
+            with count_queries() as stats:
+                response = self.client.post('/api/expenses', headers=headers, json={
+                    'amount': 100, 'description': description, 'group_id': group_id,
+                    'split_type': 'equal', 'currency': 'ZAR'
+                })
+            self.assertEqual(response.status_code, 201, response.get_json())
+            counts.append(stats.count)
+
+        # Validation, expense, splits, ledger upsert, ledger version and the response's expense refresh
+        self.assertEqual(counts, [6, 6])
+        hotel = Expense.query.filter_by(description='Hotel').one()
+        self.assertEqual(len(hotel.expense_splits), 53)
+        self.assertEqual(hotel.paid_by, 'Alice')
+
+    def test_add_expense_rejects_duplicates_and_outsiders(self):
+        """Test the duplicate, unknown group and non-member checks of the single validation query."""
+        payload = {'amount': 30, 'description': 'Taxi', 'group_id': self.group.id, 'split_type': 'equal', 'currency': 'ZAR'}
+        headers = self._prepare_auth_headers(self.users[0].id)
+        self.assertEqual(self.client.post('/api/expenses', headers=headers, json=payload).status_code, 201)
+
+        response = self.client.post('/api/expenses', headers=headers, json=payload)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Duplicate', response.get_json()['error'])
+
+        response = self.client.post('/api/expenses', headers=headers, json={**payload, 'group_id': 999})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()['error'], 'Group not found')
+
+        outsider = User(username='dave', email='dave@example.com', password_hash='x')
+        db.session.add(outsider)
+        db.session.commit()
+        response = self.client.post('/api/expenses', headers=self._prepare_auth_headers(outsider.id), json={**payload, 'description': 'Bus'})
+        self.assertEqual(response.status_code, 403)
+
+    def test_add_expense_splits_between_given_participants(self):
+        """Test that participants narrow the split and that a missing share is a 400, not a server error."""
+        alice, bob, carol = (user.id for user in self.users)
+        headers = self._prepare_auth_headers(alice)
+        payload = {'amount': 90, 'group_id': self.group.id, 'currency': 'ZAR'}
+
+        response = self.client.post('/api/expenses', headers=headers, json={
+            **payload, 'description': 'Lunch', 'split_type': 'equal', 'participants': [alice, bob]
+        })
+        self.assertEqual(response.status_code, 201, response.get_json())
+        lunch = Expense.query.filter_by(description='Lunch').one()
+        self.assertEqual(sorted((split.user_id, split.amount) for split in lunch.expense_splits), [(alice, 4500), (bob, 4500)])
+
+        response = self.client.post('/api/expenses', headers=headers, json={
+            **payload, 'description': 'Rent', 'split_type': 'percentage',
+            'participants': [{'user_id': alice, 'percentage': 60}, {'user_id': carol, 'percentage': 40}]
+        })
+        self.assertEqual(response.status_code, 201, response.get_json())
+
+        for description, split_type, participants in (
+            ('Fuel', 'percentage', [{'user_id': alice, 'percentage': 50}, {'user_id': bob}]),
+            ('Snacks', 'custom_amount', [{'user_id': alice, 'amount': 90}, {'user_id': bob}]),
+            ('Tolls', 'percentage', None),
+            ('Parking', 'equal', [alice, 999]),
+        ):
+            response = self.client.post('/api/expenses', headers=headers, json={
+                **payload, 'description': description, 'split_type': split_type, 'participants': participants
+            })
+            self.assertEqual(response.status_code, 400, description)
+        self.assertEqual(Expense.query.count(), 2)
+
+    def test_bulk_import_json(self):
+        """Test a JSON import that mixes valid and invalid rows."""
+        rows = [
+            {'description': 'Hotel', 'amount': 300, 'currency': 'ZAR'},
+            {'description': 'Fuel', 'amount': '60.50', 'currency': 'ZAR',
+             'participants': [self.users[0].id, self.users[1].id]},
+            {'description': 'Hotel', 'amount': 10, 'currency': 'ZAR'},
+            {'description': 'Snacks', 'amount': -5, 'currency': 'ZAR'},
+            {'description': 'Museum', 'amount': 20, 'currency': 'ZAR', 'participants': [999]},
+        ]
+
+        response = self.client.post(
+            f'/api/expenses/bulk?group_id={self.group.id}',
+            headers=self._prepare_auth_headers(self.users[0].id),
+            json=rows
+        )
+
+        self.assertEqual(response.status_code, 201)
+        response_json = response.get_json()
+        self.assertEqual(response_json['created'], 2)
+        self.assertEqual([error['row'] for error in response_json['errors']], [2, 3, 4])
+        self.assertEqual(Expense.query.count(), 2)
+        self.assertEqual(ExpenseSplit.query.count(), 5)
+
+        balances = {row.user_id: row.balance for row in GroupBalance.query.filter_by(group_id=self.group.id)}
+        self.assertEqual(balances[self.users[0].id], 36050 - 10000 - 3025)
+        self.assertEqual(sum(balances.values()), 0)
+
+    def test_bulk_import_batches_inserts(self):
+        """Test that a large import inserts its expenses and splits in one statement each and maps every ID."""
+        rows = [{'description': f'Row {i}', 'amount': 3, 'currency': 'ZAR'} for i in range(200)]
+
+        with count_queries() as stats:
+            response = self.client.post(f'/api/expenses/bulk?group_id={self.group.id}',
+                                        headers=self._prepare_auth_headers(self.users[0].id), json=rows)
+
+        self.assertEqual(response.status_code, 201)
+        inserts = {statement.split(' (')[0]: count for statement, count in stats.statements.items() if statement.startswith('INSERT')}
+        self.assertEqual(inserts['INSERT INTO expenses'], 1)
+        self.assertEqual(inserts['INSERT INTO expense_splits'], 1)
+        self.assertEqual(ExpenseSplit.query.count(), 600)
+        self.assertTrue(all(len(expense.expense_splits) == 3 for expense in Expense.query.filter(Expense.description.like('Row %'))))
+
+    def test_bulk_import_mixed_split_types(self):
+        """Test that percentage and custom rows are split in batches and checked per row."""
+        alice, bob, carol = (user.id for user in self.users)
+        rows = [
+            {'description': 'Rent', 'amount': 100, 'currency': 'ZAR', 'split_type': 'percentage',
+             'participants': [{'user_id': alice, 'percentage': 50}, {'user_id': bob, 'percentage': 50}]},
+            {'description': 'Power', 'amount': 100, 'currency': 'ZAR', 'split_type': 'percentage',
+             'participants': [{'user_id': alice, 'percentage': 50}, {'user_id': bob, 'percentage': 40}]},
+            {'description': 'Gifts', 'amount': 10, 'currency': 'ZAR', 'split_type': 'custom_amount',
+             'participants': [{'user_id': bob, 'amount': '2.50'}, {'user_id': carol, 'amount': 7.5}]},
+            {'description': 'Power', 'amount': 20, 'currency': 'ZAR'},
+        ]
+
+        response = self.client.post(
+            f'/api/expenses/bulk?group_id={self.group.id}',
+            headers=self._prepare_auth_headers(alice),
+            json=rows
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['errors'], [{'row': 1, 'error': 'Total percentage must equal 100%'}])
+        gifts = Expense.query.filter_by(description='Gifts').one()
+        self.assertEqual(sorted(split.amount for split in gifts.expense_splits), [250, 750])
+        # The description of a rejected row stays free for later rows
+        self.assertEqual(Expense.query.filter_by(description='Power').one().amount, 2000)
+
+    def test_bulk_import_csv(self):
+        """Test importing expenses from a CSV stream."""
+        body = (
+            'description,amount,currency,split_type,created_at\n'
+            'Groceries,90,ZAR,equal,2024-03-01T10:00:00\n'
+            'Taxi,30,USD,equal,\n'
+        )
+
+        response = self.client.post(
+            f'/api/expenses/bulk?group_id={self.group.id}',
+            headers=self._prepare_auth_headers(self.users[1].id),
+            data=body,
+            content_type='text/csv'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['created'], 2)
+        groceries = Expense.query.filter_by(description='Groceries').one()
+        self.assertEqual(groceries.created_at.year, 2024)
+        self.assertEqual(groceries.paid_by, 'Bob')
+
+    def test_bulk_import_ndjson_reports_bad_lines(self):
+        """Test that malformed NDJSON lines are reported without failing the import."""
+        body = '{"description": "Lunch", "amount": 45, "currency": "ZAR"}\nnot json\n'
+
+        response = self.client.post(
+            f'/api/expenses/bulk?group_id={self.group.id}',
+            headers=self._prepare_auth_headers(self.users[0].id),
+            data=body,
+            content_type='application/x-ndjson'
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['errors'][0]['row'], 1)
+
+    def test_bulk_import_non_member(self):
+        """Test that users outside the group cannot import into it."""
+        outsider = User(username='dave', email='dave@example.com', password_hash='x')
+        db.session.add(outsider)
+        db.session.commit()
+
+        response = self.client.post(
+            f'/api/expenses/bulk?group_id={self.group.id}',
+            headers=self._prepare_auth_headers(outsider.id),
+            json=[{'description': 'Hotel', 'amount': 300, 'currency': 'ZAR'}]
+        )
+
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(Expense.query.count(), 0)
+
+    def test_get_expenses_cursor_pagination(self):
+        """Test walking every page of expenses with the next_cursor token."""
+        rows = [{'description': f'Expense {i}', 'amount': 10 + i, 'currency': 'ZAR'} for i in range(25)]
+        headers = self._prepare_auth_headers(self.users[0].id)
+        self.client.post(f'/api/expenses/bulk?group_id={self.group.id}', headers=headers, json=rows)
+
+        seen = []
+        cursor = None
+        pages = 0
+        while True:
+            url = f'/api/expenses?group_id={self.group.id}&per_page=10&include_total=true'
+            if cursor:
+                url += f'&cursor={cursor}'
+            response = self.client.get(url, headers=headers)
+            self.assertEqual(response.status_code, 200)
+
+            response_json = response.get_json()
+            self.assertEqual(response_json['total'], 25)
+            seen.extend(expense['id'] for expense in response_json['expenses'])
+            pages += 1
+            cursor = response_json['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(pages, 3)
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_get_expenses_invalid_cursor(self):
+        """Test that a tampered cursor is rejected."""
+        response = self.client.get(
+            f'/api/expenses?group_id={self.group.id}&cursor=not-a-cursor',
+            headers=self._prepare_auth_headers(self.users[0].id)
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_expenses_query_budget(self):
+        """Test that listing expenses uses at most 3 queries regardless of page size."""
+        rows = [{'description': f'Expense {i}', 'amount': 10 + i, 'currency': 'ZAR'} for i in range(40)]
+        headers = self._prepare_auth_headers(self.users[0].id)
+        self.client.post(f'/api/expenses/bulk?group_id={self.group.id}', headers=headers, json=rows)
+
+        group_id = self.group.id
+
+        for per_page in (5, 40):
+            with count_queries() as stats:
+                response = self.client.get(f'/api/expenses?group_id={group_id}&per_page={per_page}', headers=headers)
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.get_json()['expenses']), per_page)
+            self.assertLessEqual(stats.count, 3, stats.statements)
+            self.assertEqual(stats.repeated_statements(threshold=2), [])
+
+    def test_query_stats_flag_repeated_statements(self):
+        """Test that a lazy load per row shows up as a repeated statement."""
+        rows = [{'description': f'Expense {i}', 'amount': 10, 'currency': 'ZAR'} for i in range(6)]
+        self.client.post(f'/api/expenses/bulk?group_id={self.group.id}', headers=self._prepare_auth_headers(self.users[0].id), json=rows)
+        db.session.expire_all()
+
+        with count_queries() as stats:
+            for expense in Expense.query.all():
+                expense.expense_splits
+
+        self.assertEqual(stats.count, 7)
+        self.assertEqual(stats.repeated_statements(threshold=5)[0][1], 6)
+
+
+    def test_group_export_streams_expenses_with_splits(self):
+        """Test that the group export streams one row per split, oldest first, in a fixed number of queries."""
+        headers = self._prepare_auth_headers(self.users[0].id)
+        for day, amount in ((1, 9000), (2, 100)):
+            expense = Expense(description=f'Day {day}', amount=amount, currency='ZAR', group_id=self.group.id,
+                              user_id=self.users[0].id, split_type='equal', paid_by='Alice',
+                              created_at=datetime(2024, 5, day))
+            db.session.add(expense)
+            db.session.flush()
+            shares = [amount // 3 + (1 if i < amount % 3 else 0) for i in range(3)]
+            for user, share in zip(self.users, shares):
+                db.session.add(ExpenseSplit(expense_id=expense.id, user_id=user.id, amount=share, name=user.full_name))
+        db.session.commit()
+        group_id = self.group.id
+
+        with count_queries() as stats:
+            response = self.client.get(f'/api/groups/{group_id}/export', headers=headers)
+            self.assertTrue(response.is_streamed)
+            lines = response.get_data(as_text=True).splitlines()
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(stats.count, 2)
+        self.assertEqual(lines[0].split(',')[:4], ['expense_id', 'created_at', 'description', 'amount'])
+        self.assertEqual(len(lines), 7)
+        self.assertEqual([line.split(',')[-1] for line in lines[1:]], ['30.00'] * 3 + ['0.34', '0.33', '0.33'])
+
+        response = self.client.get(f'/api/groups/{group_id}/export?format=ndjson&from=2024-05-02', headers=headers)
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual({row['description'] for row in rows}, {'Day 2'})
+        self.assertEqual(rows[0]['amount'], '1.00')
+
+    def test_group_export_access(self):
+        """Test that only members can export, and unknown groups are 404."""
+        outsider = User(username='dave', email='dave@example.com', password_hash='x')
+        db.session.add(outsider)
+        db.session.commit()
+
+        response = self.client.get(f'/api/groups/{self.group.id}/export', headers=self._prepare_auth_headers(outsider.id))
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get('/api/groups/999/export', headers=self._prepare_auth_headers(self.users[0].id))
+        self.assertEqual(response.status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import time
+import unittest
+from unittest.mock import patch
+import jwt # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import RevokedToken, User
+from app.services.user_service import UserService
+from app.utils import auth_utils
+
+
+class AuthCacheTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SECRET_KEY = 'test-secret-key'
+    JWT_SECRET_KEY = 'test-secret-key'
+    TOKEN_BLOCKLIST_STORE = 'database'
+
+
+class TestTokenCacheAndLogout(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with one user."""
+        self.app = create_app(AuthCacheTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        auth_utils._token_cache.clear()
+
+        self.user = User(username='alice', email='alice@example.com', password_hash='x', full_name='Alice')
+        db.session.add(self.user)
+        db.session.commit()
+        self.token = UserService.generate_jwt_token(self.user.id, 'user')
+        self.headers = {'Authorization': f'Bearer {self.token}'}
+
+    def tearDown(self):
+        """Tear down the test database."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_token_verified_once_across_requests(self):
+        """Test that a hot token is verified once and then served from the cache."""
+        with patch('app.utils.auth_utils.jwt.decode', wraps=jwt.decode) as spy:
+            for _ in range(3):
+                response = self.client.get('/api/groups/members?group_id=1', headers=self.headers)
+                self.assertNotEqual(response.status_code, 401)
+
+        self.assertEqual(spy.call_count, 1)
+
+    def test_logout_revokes_cached_token(self):
+        """Test that a logged out token is rejected even though it was cached."""
+        self.assertEqual(self.client.get('/api/user', headers=self.headers).status_code, 200)
+
+        response = self.client.post('/api/logout', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.get('/api/user', headers=self.headers)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(RevokedToken.query.count(), 1)
+
+        # A fresh login still works
+        headers = {'Authorization': f'Bearer {UserService.generate_jwt_token(self.user.id, "user")}'}
+        self.assertEqual(self.client.get('/api/user', headers=headers).status_code, 200)
+
+    def test_cached_token_still_expires(self):
+        """Test that the cache never outlives the token's exp claim."""
+        token = jwt.encode({'sub': self.user.id, 'exp': int(time.time()) + 60}, 'test-secret-key', algorithm='HS256')
+        headers = {'Authorization': f'Bearer {token}'}
+        self.assertEqual(self.client.get('/api/user', headers=headers).status_code, 200)
+
+        with patch('app.utils.auth_utils.time.time', return_value=time.time() + 120):
+            response = self.client.get('/api/user', headers=headers)
+
+        self.assertEqual(response.status_code, 401)
+        self.assertIn('expired', response.get_json()['error'])
+
+    def test_admin_required_uses_role_claim(self):
+        """Test that admin routes read the role from the verified identity."""
+        response = self.client.post(f'/api/admin/users/{self.user.id}/promote', headers=self.headers)
+        self.assertEqual(response.status_code, 403)
+
+        admin_token = UserService.generate_jwt_token(self.user.id, 'admin')
+        response = self.client.post('/api/admin/users/999/promote', headers={'Authorization': f'Bearer {admin_token}'})
+        self.assertNotIn(response.status_code, (401, 403))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,263 @@
+from datetime import datetime
+import hashlib
+import hmac
+import json
+import time
+import unittest
+from unittest.mock import patch
+from app import db
+from app.models import Balance, GroupBalance, Payment, WebhookEvent
+from app.services.payment_gateway import get_payment_gateway
+from app.services.webhook_service import HANDLERS as WEBHOOK_HANDLERS, WebhookService
+from unittests.base import GroupTestCase, GroupTestConfig
+
+
+class PaymentTestConfig(GroupTestConfig):
+    PAYMENT_PROVIDER_TIMEOUT = 0.5
+    PAYMENT_PROVIDER_MAX_ATTEMPTS = 2
+    PAYMENT_CIRCUIT_FAILURES = 2
+    STRIPE_WEBHOOK_SECRET = 'whsec_test'
+
+
+class TestPaymentRoutes(GroupTestCase):
+    config = PaymentTestConfig
+    usernames = ('alice', 'bob')
+
+    def setUp(self):
+        """Set up an in-memory database with two group members and the fake provider."""
+        super().setUp()
+        self.provider = get_payment_gateway('stripe').provider
+        self.headers = self._prepare_auth_headers(self.users[0].id)
+
+    def _settlement(self):
+        return {'amount': 12.5, 'currency': 'usd', 'group_id': self.group.id, 'payee_id': self.users[1].id}
+
+    def test_create_stripe_payment(self):
+        """Test that a Stripe payment creates an intent and a pending payment in cents."""
+        response = self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()['client_secret'].startswith('pi_fake_'))
+        payment = Payment.query.one()
+        self.assertEqual((payment.amount, payment.payment_status), (1250, 'pending'))
+
+    def test_group_settlement_needs_another_member_as_payee(self):
+        """Test that a group payment without a payee, or to the payer, is rejected before reaching the provider."""
+        settlement = self._settlement()
+        del settlement['payee_id']
+        for url in ('/api/payments/stripe', '/api/payments/paypal'):
+            response = self.client.post(url, json=settlement, headers=self.headers)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('payee_id', response.get_json()['error'])
+
+        response = self.client.post('/api/payments/stripe', json={**settlement, 'payee_id': self.users[0].id},
+                                    headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.provider.calls, [])
+        self.assertEqual(Payment.query.count(), 0)
+
+    def test_provider_outage_returns_503(self):
+        """Test that an unreachable provider gives a fast 503 with Retry-After and records nothing."""
+        self.provider.fail_next = 10
+
+        response = self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+
+        # The circuit is now open, so the next call doesn't reach the provider at all
+        calls = len(self.provider.calls)
+        response = self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.provider.calls), calls)
+        self.assertEqual(Payment.query.count(), 0)
+
+    def test_paypal_payment_round_trip(self):
+        """Test that an approved PayPal payment completes and settles the group ledger."""
+        response = self.client.post('/api/payments/paypal', json=self._settlement(), headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        approval_url = response.get_json()['approval_url']
+        query = approval_url.split('?', 1)[1]
+
+        response = self.client.get(f'/api/payments/paypal/success?{query}')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Payment.query.one().payment_status, 'completed')
+
+    def test_replayed_paypal_success_debits_once(self):
+        """Test that reloading the PayPal success page doesn't charge the user's balance again."""
+        response = self.client.post('/api/payments/paypal', json=self._settlement(), headers=self.headers)
+        query = response.get_json()['approval_url'].split('?', 1)[1]
+
+        for _ in range(2):
+            response = self.client.get(f'/api/payments/paypal/success?{query}')
+            self.assertEqual(response.status_code, 200)
+
+        self.assertEqual(Balance.query.filter_by(user_id=self.users[0].id).one().balance, -1250)
+
+
+    def _post_stripe_event(self, event_id, intent):
+        """Post a payment_intent.succeeded event signed the way Stripe signs it."""
+        payload = json.dumps({
+            'id': event_id, 'object': 'event', 'type': 'payment_intent.succeeded',
+            'data': {'object': intent}
+        })
+        timestamp = int(time.time())
+        signature = hmac.new(b'whsec_test', f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+        return self.client.post(
+            '/api/payments/stripe/webhook', data=payload, content_type='application/json',
+            headers={'Stripe-Signature': f't={timestamp},v1={signature}'}
+        )
+
+    def _intent(self, payment):
+        return {'id': payment.provider_reference, 'object': 'payment_intent', 'amount': payment.amount,
+                'metadata': {'user_id': str(payment.user_id)}}
+
+    def test_webhook_is_stored_and_applied_once(self):
+        """Test that a redelivered event is acknowledged but only applied once."""
+        self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+        intent = self._intent(Payment.query.one())
+
+        for _ in range(3):
+            response = self._post_stripe_event('evt_1', intent)
+            self.assertEqual(response.status_code, 200)
+
+        # Acknowledged, but nothing applied until the inbox is drained
+        self.assertEqual(WebhookEvent.query.count(), 1)
+        self.assertEqual(Payment.query.one().payment_status, 'pending')
+
+        self.assertEqual(WebhookService.process_pending(), 1)
+        self.assertEqual(WebhookService.process_pending(), 0)
+
+        self.assertEqual(Payment.query.one().payment_status, 'success')
+        self.assertEqual(Balance.query.filter_by(user_id=self.users[0].id).one().balance, -1250)
+        ledger = {row.user_id: row.balance for row in GroupBalance.query.filter_by(group_id=self.group.id)}
+        self.assertEqual(ledger, {self.users[0].id: 1250, self.users[1].id: -1250})
+
+    def test_second_event_for_the_same_intent_changes_nothing(self):
+        """Test that two distinct events for one intent debit the user once, in one batch or across batches."""
+        self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+        intent = self._intent(Payment.query.one())
+
+        self._post_stripe_event('evt_1', intent)
+        self._post_stripe_event('evt_2', intent)
+        WebhookService.process_pending()
+        self._post_stripe_event('evt_3', intent)
+        WebhookService.process_pending()
+
+        self.assertEqual(Balance.query.filter_by(user_id=self.users[0].id).one().balance, -1250)
+
+    def test_webhook_batch_skips_bad_events(self):
+        """Test that one batch applies every good event and marks malformed ones failed."""
+        for _ in range(2):
+            self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+        first, second = Payment.query.order_by(Payment.id).all()
+        self._post_stripe_event('evt_1', self._intent(first))
+        self._post_stripe_event('evt_2', {'id': 'pi_2', 'amount': 1250})
+        self._post_stripe_event('evt_3', self._intent(second))
+
+        self.assertEqual(WebhookService.process_pending(batch_size=10), 3)
+
+        statuses = [event.status for event in WebhookEvent.query.order_by(WebhookEvent.id)]
+        self.assertEqual(statuses, ['processed', 'failed', 'processed'])
+        self.assertEqual([payment.payment_status for payment in Payment.query], ['success', 'success'])
+        self.assertEqual(Balance.query.filter_by(user_id=self.users[0].id).one().balance, -2500)
+
+
+    def test_unexpected_handler_error_fails_only_that_event(self):
+        """Test that an event whose handler raises something unexpected is marked failed instead of blocking the inbox."""
+        for _ in range(3):
+            self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+        payments = Payment.query.order_by(Payment.id).all()
+        bad_reference = payments[1].provider_reference
+        for number, payment in enumerate(payments):
+            self._post_stripe_event(f'evt_{number}', self._intent(payment))
+
+        handler = WEBHOOK_HANDLERS[('stripe', 'payment_intent.succeeded')]
+
+        def flaky(intent, group_deltas, user_deltas):
+            if intent['id'] == bad_reference:
+                raise RuntimeError('constraint violated')
+            handler(intent, group_deltas, user_deltas)
+
+        with patch.dict(WEBHOOK_HANDLERS, {('stripe', 'payment_intent.succeeded'): flaky}):
+            self.assertEqual(WebhookService.process_pending(batch_size=10), 3)
+        self.assertEqual(WebhookService.process_pending(batch_size=10), 0)
+
+        events = WebhookEvent.query.order_by(WebhookEvent.id).all()
+        self.assertEqual([event.status for event in events], ['processed', 'failed', 'processed'])
+        self.assertIn('RuntimeError', events[1].error)
+        self.assertEqual([payment.payment_status for payment in payments], ['success', 'pending', 'success'])
+        self.assertEqual(Balance.query.filter_by(user_id=self.users[0].id).one().balance, -2500)
+
+    def test_webhook_matches_payment_by_provider_reference(self):
+        """Test that of two payments with the same amount, the one the event names is completed."""
+        for _ in range(2):
+            self.client.post('/api/payments/stripe', json=self._settlement(), headers=self.headers)
+        first, second = Payment.query.order_by(Payment.id).all()
+        self.assertNotEqual(first.provider_reference, second.provider_reference)
+
+        self._post_stripe_event('evt_1', self._intent(second))
+        WebhookService.process_pending()
+
+        self.assertEqual([first.payment_status, second.payment_status], ['pending', 'success'])
+
+    def test_idempotency_key_creates_one_payment(self):
+        """Test that replaying a request with the same Idempotency-Key returns the same intent and payment."""
+        headers = dict(self.headers, **{'Idempotency-Key': 'settle-1'})
+        secrets = [
+            self.client.post('/api/payments/stripe', json=self._settlement(), headers=headers).get_json()['client_secret']
+            for _ in range(2)
+        ]
+
+        self.assertEqual(secrets[0], secrets[1])
+        payment = Payment.query.one()
+        self.assertEqual(payment.idempotency_key, f'{self.users[0].id}:settle-1')
+
+
+    def _add_history(self):
+        """Add three payments on different days with different statuses."""
+        for day, status, amount in ((1, 'success', 1000), (2, 'failed', 2050), (3, 'success', 300)):
+            db.session.add(Payment(
+                user_id=self.users[0].id, amount=amount, currency='usd', payment_method='stripe',
+                payment_status=status, created_at=datetime(2024, 3, day, 12)
+            ))
+        db.session.commit()
+
+    def test_history_filters_by_date_and_status(self):
+        """Test that history can be narrowed by an inclusive date range and by status."""
+        self._add_history()
+
+        response = self.client.get('/api/payment/history?from=2024-03-02&to=2024-03-03', headers=self.headers)
+        self.assertEqual([p['amount'] for p in response.get_json()['payment_history']], [3.0, 20.5])
+
+        response = self.client.get('/api/payment/history?status=success&include_total=true', headers=self.headers)
+        data = response.get_json()
+        self.assertEqual([p['amount'] for p in data['payment_history']], [3.0, 10.0])
+        self.assertEqual(data['total'], 2)
+
+        response = self.client.get('/api/payment/history?from=yesterday', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_history_export_streams_csv_and_ndjson(self):
+        """Test that the export streams every matching payment, oldest first, in either format."""
+        self._add_history()
+
+        response = self.client.get('/api/payment/history/export?status=success', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        self.assertIn('attachment; filename="payment-history.csv"', response.headers['Content-Disposition'])
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0].split(',')[:4], ['id', 'created_at', 'amount', 'currency'])
+        self.assertEqual([line.split(',')[2] for line in lines[1:]], ['10.00', '3.00'])
+
+        response = self.client.get('/api/payment/history/export?format=ndjson&to=2024-03-02', headers=self.headers)
+        rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([(row['amount'], row['payment_status']) for row in rows], [('10.00', 'success'), ('20.50', 'failed')])
+        self.assertEqual(rows[0]['created_at'], '2024-03-01T12:00:00')
+
+        response = self.client.get('/api/payment/history/export?format=xml', headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
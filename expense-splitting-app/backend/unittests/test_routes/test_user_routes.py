@@ -5,6 +5,7 @@ import jwt # type: ignore
 import time
 from app.routes.user import bp  # Import the blueprint to test
 from app.routes.auth import UserService  # Import UserService from auth route
+from app.utils.pagination import CursorPage
 
 class TestUserRoutes(unittest.TestCase):
     def setUp(self):
@@ -76,16 +77,56 @@ class TestUserRoutes(unittest.TestCase):
 
         # Mock the UserService method
         with patch('app.routes.user.UserService.get_all_users') as mock_get_all_users:
-            mock_get_all_users.return_value = mock_users
+            mock_get_all_users.return_value = CursorPage(mock_users, None)
 
             # Send request with token
             response = self.client.get('/api/users', 
                                        headers={'Authorization': f'Bearer {mock_token}'})
 
         self.assertEqual(response.status_code, 200)
-        self.assertDictEqual(response.json, {'users': mock_users})
+        self.assertDictEqual(response.json, {'users': mock_users, 'next_cursor': None})
         mock_get_all_users.assert_called_once()
 
+    def test_search_users(self):
+        """Test that ?q= searches users instead of listing them all."""
+        mock_token = self._generate_test_token(1)
+        mock_users = [{'id': 2, 'name': 'Jane Smith', 'email': 'jane@example.com'}]
+
+        with patch('app.routes.user.UserService.search_users') as mock_search_users, \
+                patch('app.routes.user.UserService.get_all_users') as mock_get_all_users:
+            mock_search_users.return_value = CursorPage(mock_users, None)
+            response = self.client.get('/api/users?q=jan&limit=5',
+                                       headers={'Authorization': f'Bearer {mock_token}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertDictEqual(response.json, {'users': mock_users, 'next_cursor': None})
+        mock_search_users.assert_called_once_with('jan', cursor=None, limit=5, include_total=False)
+        mock_get_all_users.assert_not_called()
+
+        with patch('app.routes.user.UserService.search_users', side_effect=ValueError('too short')):
+            response = self.client.get('/api/users?q=j',
+                                       headers={'Authorization': f'Bearer {mock_token}'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_get_users_by_ids(self):
+        """Test that ?ids= looks up just those users."""
+        mock_token = self._generate_test_token(1)
+        mock_users = [{'id': 3}, {'id': 1}]
+
+        with patch('app.routes.user.UserService.get_users_by_ids') as mock_get_users_by_ids:
+            mock_get_users_by_ids.return_value = mock_users
+            response = self.client.get('/api/users?ids=3,1',
+                                       headers={'Authorization': f'Bearer {mock_token}'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertDictEqual(response.json, {'users': mock_users})
+        mock_get_users_by_ids.assert_called_once_with([3, 1])
+
+        for ids in ('1,abc', ','.join(str(i) for i in range(101))):
+            response = self.client.get(f'/api/users?ids={ids}',
+                                       headers={'Authorization': f'Bearer {mock_token}'})
+            self.assertEqual(response.status_code, 400)
+
     def test_unauthorized_access(self):
         """Test that unauthorized requests are handled correctly."""
         # Test get_user without authentication
@@ -0,0 +1,112 @@
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import User
+from app.services.user_service import UserService
+from app.utils.availability_index import AvailabilityIndex, get_availability_index
+
+
+class AvailabilityTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    AVAILABILITY_INDEX_REFRESH_SECONDS = 60
+
+
+class TestAvailabilityIndex(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(AvailabilityTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        db.session.add(User(username='Alice', email='alice@example.com', password_hash='x'))
+        db.session.commit()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _user_queries(self, func):
+        """Run func and return the queries it sent against the users table."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            if 'FROM users' in statement:
+                statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return result, statements
+
+    def test_available_names_need_no_query(self):
+        """Test that once the index is loaded, free names are answered without touching the database."""
+        self.client.post('/api/check-username', json={'username': 'warmup'})
+
+        response, queries = self._user_queries(
+            lambda: self.client.post('/api/check-username', json={'username': 'bob'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+        response, queries = self._user_queries(
+            lambda: self.client.post('/api/check-email', json={'email': 'bob@example.com'}))
+        self.assertEqual(response.get_json(), {'isRegistered': False})
+        self.assertEqual(queries, [])
+
+    def test_possible_hits_are_confirmed(self):
+        """Test that taken names are reported, and index false positives are caught by the database."""
+        self.assertEqual(self.client.post('/api/check-username', json={'username': 'Alice'}).status_code, 409)
+        self.assertEqual(self.client.post('/api/check-email', json={'email': 'alice@example.com'}).get_json(),
+                         {'isRegistered': True})
+
+        # Same name in another case: a hit in the normalized index, but usernames are compared exactly
+        response, queries = self._user_queries(
+            lambda: self.client.post('/api/check-username', json={'username': 'alice'}))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries), 1)
+
+    def test_registration_updates_the_index(self):
+        """Test that a user registered by this worker is taken straight away, before the next refresh."""
+        UserService.is_username_taken('warmup')
+        UserService.register_user('carol', 'carol@example.com', 'Secret-pass1!', 'Carol Danvers')
+
+        self.assertTrue(UserService.is_username_taken('carol'))
+        self.assertTrue(UserService.is_email_registered('carol@example.com'))
+        with self.assertRaises(ValueError):
+            UserService.register_user('carol', 'other@example.com', 'Secret-pass1!', 'Carol Danvers')
+
+    def test_lost_registration_race_names_the_clash(self):
+        """Test that a duplicate only the unique constraints catch is reported as the field that clashed."""
+        with patch.object(UserService, 'is_username_taken', return_value=False), \
+                patch.object(UserService, 'is_email_registered', return_value=False):
+            with self.assertRaisesRegex(ValueError, '^Username is already taken$'):
+                UserService.register_user('Alice', 'other@example.com', 'Secret-pass1!', 'Alice Again')
+            with self.assertRaisesRegex(ValueError, '^Email is already registered$'):
+                UserService.register_user('zed', 'alice@example.com', 'Secret-pass1!', 'Zed')
+        self.assertEqual(User.query.count(), 1)
+
+    def test_refresh_picks_up_other_workers_users(self):
+        """Test that users added elsewhere are loaded incrementally on refresh."""
+        index = AvailabilityIndex(refresh_interval=0)
+        self.assertFalse(index.may_contain_username('dave'))
+
+        db.session.add(User(username='dave', email='dave@example.com', password_hash='x'))
+        db.session.commit()
+
+        self.assertTrue(index.may_contain_username('dave'))
+        self.assertTrue(index.may_contain_email('DAVE@example.com '))
+
+    def test_without_index_checks_go_to_the_database(self):
+        """Test that disabling the index leaves checks correct."""
+        with patch.dict(self.app.extensions, {'availability_index': None}):
+            self.assertIsNone(get_availability_index())
+            self.assertTrue(UserService.is_username_taken('Alice'))
+            self.assertFalse(UserService.is_username_taken('bob'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import os
+import sqlite3
+import tempfile
+import time
+import unittest
+from unittest.mock import MagicMock
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import User
+from app.services.admin_service import AdminService
+from app.services.group_service import GroupService
+from app.services.profile_service import ProfileService
+from app.services.user_service import UserService
+from app.utils.cache import Cache, MemoryCacheBackend, SqliteCacheBackend, get_cache
+from app.utils.query_monitor import count_queries
+
+
+class CacheTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class TestCache(unittest.TestCase):
+    def test_read_through_and_stats(self):
+        """Test that a value is loaded once, then served from the cache, and counted."""
+        cache = Cache(MemoryCacheBackend())
+        loader = MagicMock(return_value={'id': 1})
+
+        self.assertEqual(cache.get_or_load('user', 1, loader), {'id': 1})
+        self.assertEqual(cache.get_or_load('user', 1, loader), {'id': 1})
+        self.assertEqual(loader.call_count, 1)
+
+        cache.invalidate('user', 1)
+        cache.get_or_load('user', 1, loader)
+        self.assertEqual(loader.call_count, 2)
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+        self.assertEqual(stats['namespaces']['user']['invalidations'], 1)
+
+    def test_missing_values_and_expiry(self):
+        """Test that None is never cached and entries expire after their TTL."""
+        cache = Cache(MemoryCacheBackend(), ttl=0.05)
+        missing = MagicMock(return_value=None)
+        cache.get_or_load('user', 2, missing)
+        cache.get_or_load('user', 2, missing)
+        self.assertEqual(missing.call_count, 2)
+
+        loader = MagicMock(return_value=[1, 2])
+        cache.get_or_load('group_members', 1, loader)
+        time.sleep(0.06)
+        cache.get_or_load('group_members', 1, loader)
+        self.assertEqual(loader.call_count, 2)
+
+    def test_sqlite_backend_is_shared(self):
+        """Test that workers sharing the SQLite file see each other's entries and invalidations."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'cache.db')
+            first, second = Cache(SqliteCacheBackend(path)), Cache(SqliteCacheBackend(path))
+
+            first.get_or_load('user', 1, lambda: {'name': 'Alice'})
+            self.assertEqual(second.get_or_load('user', 1, lambda: {'name': 'stale'}), {'name': 'Alice'})
+
+            second.invalidate('user', 1)
+            self.assertEqual(first.get_or_load('user', 1, lambda: {'name': 'Alicia'}), {'name': 'Alicia'})
+
+    def test_backend_errors_fall_back_to_loader(self):
+        """Test that a failing backend is treated as a miss rather than an error."""
+        backend = MagicMock()
+        backend.get.side_effect = sqlite3.OperationalError('database is locked')
+        backend.set.side_effect = sqlite3.OperationalError('database is locked')
+
+        self.assertEqual(Cache(backend).get_or_load('user', 1, lambda: {'id': 1}), {'id': 1})
+
+
+class TestCachedServices(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(CacheTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.alice = User(username='alice', email='alice@example.com', password_hash='x', full_name='Alice')
+        self.bob = User(username='bob', email='bob@example.com', password_hash='x', full_name='Bob')
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_user_lookups_hit_the_cache_until_a_write(self):
+        """Test that user and profile lookups share one cached entry that writes invalidate."""
+        user_id = self.alice.id
+        UserService.get_user_by_id(user_id)
+        with count_queries() as stats:
+            self.assertEqual(UserService.get_user_by_id(user_id)['role'], 'user')
+            self.assertEqual(ProfileService.get_user_profile(user_id)['full_name'], 'Alice')
+        self.assertEqual(stats.count, 0)
+
+        AdminService.promote_user_to_admin(user_id)
+        self.assertEqual(UserService.get_user_by_id(user_id)['role'], 'admin')
+
+        ProfileService.update_user_profile(user_id, 'Alicia', None)
+        self.assertEqual(ProfileService.get_user_profile(user_id)['full_name'], 'Alicia')
+
+    def test_group_members_are_cached_and_paged(self):
+        """Test that member pages come from one cached list, refreshed when someone joins or is renamed."""
+        group_id = GroupService.create_group(self.alice.id, 'Trip').id
+        GroupService.get_group_members(group_id)
+
+        GroupService.add_user_to_group(self.bob.id, group_id)
+        with count_queries() as stats:
+            first = GroupService.get_group_members(group_id, limit=1, include_total=True)  # Reloaded after the join
+            second = GroupService.get_group_members(group_id, cursor=first.next_cursor, limit=1)
+        self.assertEqual(stats.count, 2)
+        self.assertEqual([member['username'] for member in first.items + second.items], ['bob', 'alice'])
+        self.assertEqual(first.total, 2)
+        self.assertIsNone(second.next_cursor)
+
+        ProfileService.update_user_profile(self.bob.id, 'Robert', None)
+        self.assertEqual(GroupService.get_group_members(group_id).items[0]['full_name'], 'Robert')
+
+        with self.assertRaises(ValueError):
+            GroupService.get_group_members(999)
+        stats = get_cache().stats()['namespaces']['group_members']
+        self.assertEqual(stats['invalidations'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import unittest
+from sqlalchemy import event # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Group, GroupMember, User
+from app.services.admin_service import AdminService
+from app.services.balance_service import BalanceService
+from app.services.expense_service import ExpenseService
+from app.services.group_service import GroupService
+
+
+class GroupServiceTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class TestGetUserGroups(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(GroupServiceTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.alice = User(username='alice', email='alice@example.com', password_hash='x')
+        self.bob = User(username='bob', email='bob@example.com', password_hash='x')
+        db.session.add_all([self.alice, self.bob])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _count_queries(self, func):
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        return result, len(statements)
+
+    def test_lists_joined_groups_with_summaries_in_one_query(self):
+        """Test that groups the user joined are listed with counters and their balance, in one query."""
+        trip = GroupService.create_group(self.alice.id, 'Trip')
+        GroupService.create_group(self.bob.id, 'Not mine')
+        GroupService.add_user_to_group(self.bob.id, trip.id)
+        ExpenseService.add_expense(
+            user_id=self.alice.id, group_id=trip.id, amount=30.00, description='Dinner',
+            split_type='equal', paid_by='alice', currency='ZAR',
+            participants=[{'user_id': self.alice.id, 'name': 'alice'}, {'user_id': self.bob.id, 'name': 'bob'}],
+        )
+        bob_id, trip_id = self.bob.id, trip.id
+        db.session.expire_all()
+
+        page, queries = self._count_queries(lambda: GroupService.get_user_groups(bob_id))
+
+        self.assertEqual(queries, 1)
+        self.assertEqual([group['name'] for group in page.items], ['Not mine', 'Trip'])
+        summary = page.items[1]
+        self.assertEqual(summary['group_id'], trip_id)
+        self.assertEqual(summary['member_count'], 2)
+        self.assertEqual(summary['total_spent'], 30.0)
+        self.assertEqual(summary['balance'], -15.0)
+        self.assertIsNotNone(summary['last_activity_at'])
+        self.assertEqual(page.items[0]['balance'], 0.0)
+
+    def test_counters_match_recomputed_totals(self):
+        """Test that the group counters agree with the underlying rows after several writes."""
+        trip = GroupService.create_group(self.alice.id, 'Trip')
+        GroupService.add_user_to_group(self.bob.id, trip.id)
+        GroupService.add_user_to_group(self.bob.id, trip.id)  # Already a member, not counted twice
+        participants = [{'user_id': self.alice.id, 'name': 'alice'}, {'user_id': self.bob.id, 'name': 'bob'}]
+        for amount, description in ((10.00, 'Taxi'), (5.50, 'Coffee')):
+            ExpenseService.add_expense(
+                user_id=self.alice.id, group_id=trip.id, amount=amount, description=description,
+                split_type='equal', paid_by='alice', currency='ZAR', participants=participants,
+            )
+
+        group = db.session.get(Group, trip.id)
+        db.session.refresh(group)
+        self.assertEqual(group.member_count, 2)
+        self.assertEqual(group.total_spent, 1550)
+        self.assertEqual(BalanceService.compute_group_balances(trip.id)[self.bob.id], -775)
+
+    def test_deleting_a_member_updates_their_groups(self):
+        """Test that deleting a user removes their memberships, lowers the counters and bumps the revisions."""
+        trip = GroupService.create_group(self.alice.id, 'Trip')
+        GroupService.add_user_to_group(self.bob.id, trip.id)
+        trip_id, bob_id = trip.id, self.bob.id
+        revision = db.session.get(Group, trip_id).ledger_version
+
+        AdminService.delete_user(bob_id)
+
+        group = db.session.get(Group, trip_id)
+        db.session.refresh(group)
+        self.assertEqual(group.member_count, 1)
+        self.assertGreater(group.ledger_version, revision)
+        self.assertEqual(GroupMember.query.filter_by(user_id=bob_id).count(), 0)
+        self.assertEqual(GroupService.get_user_groups(self.alice.id).items[0]['member_count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
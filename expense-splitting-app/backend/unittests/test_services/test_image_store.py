@@ -0,0 +1,143 @@
+import io
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+from werkzeug.datastructures import FileStorage # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import User
+from app.services.profile_service import ProfileService
+from app.utils import image_store
+from app.utils.image_store import ImageStore, get_image_store
+
+
+def png_bytes(width, height, color=(200, 30, 30)):
+    buffer = io.BytesIO()
+    image_store.Image.new('RGB', (width, height), color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestImageStore(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        self.store = ImageStore(self.folder, sizes=(16, 64), workers=0, max_bytes=1024 * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_same_content_is_stored_once(self):
+        """Test that uploads are named by content, so equal files share one copy and different ones never collide."""
+        first = self.store.save(io.BytesIO(b'%PDF-1 one'), 'pdf')
+        again = self.store.save(io.BytesIO(b'%PDF-1 one'), 'pdf')
+        other = self.store.save(io.BytesIO(b'%PDF-1 two'), 'pdf')
+
+        self.assertEqual(first, again)
+        self.assertNotEqual(first, other)
+        self.assertEqual(sorted(os.listdir(self.folder)), sorted([first, other]))
+
+    def test_oversized_upload_is_rejected_without_leftovers(self):
+        """Test that an upload over the size limit raises ValueError and leaves nothing behind."""
+        store = ImageStore(self.folder, workers=0, max_bytes=100)
+        with self.assertRaises(ValueError):
+            store.save(io.BytesIO(b'x' * 101), 'jpg')
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_names_and_paths(self):
+        """Test thumbnail naming and that names can't escape the folder."""
+        self.assertEqual(ImageStore.thumbnail_name('abc.jpg', 64), 'abc_64.jpg')
+        self.assertEqual(ImageStore.original_name('abc_64.jpg'), 'abc.jpg')
+        self.assertIsNone(ImageStore.original_name('abc.jpg'))
+        self.assertIsNone(self.store.path('../etc/passwd'))
+
+    def test_without_pillow_the_original_is_served(self):
+        """Test that profiles point at the original when thumbnails can't be made."""
+        with patch.object(image_store, 'Image', None):
+            name = self.store.save(io.BytesIO(b'not really a jpeg'), 'jpeg')
+            self.assertTrue(name.endswith('.jpg'))
+            self.assertEqual(self.store.display_url(name), f'/uploads/images/{name}')
+
+    @unittest.skipIf(image_store.Image is None, 'Pillow is not installed')
+    def test_thumbnails(self):
+        """Test that every configured size is made, keeping the aspect ratio."""
+        name = self.store.save(io.BytesIO(png_bytes(400, 200)), 'png')
+
+        self.assertEqual(self.store.display_url(name), f'/uploads/images/{ImageStore.thumbnail_name(name, 64)}')
+        for size in (16, 64):
+            with image_store.Image.open(os.path.join(self.folder, ImageStore.thumbnail_name(name, size))) as thumbnail:
+                self.assertEqual(thumbnail.size, (size, size // 2))
+
+    @unittest.skipIf(image_store.Image is None, 'Pillow is not installed')
+    def test_thumbnails_in_background(self):
+        """Test that the thread pool makes the thumbnails off the calling thread."""
+        store = ImageStore(self.folder, sizes=(32,), workers=1)
+        name = store.save(io.BytesIO(png_bytes(100, 100)), 'png')
+        store.shutdown()  # Waits for queued work
+        self.assertIsNotNone(store.path(ImageStore.thumbnail_name(name, 32)))
+
+
+class ImageTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class TestProfileImages(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.mkdtemp()
+        ImageTestConfig.UPLOAD_FOLDER = self.folder
+        self.app = create_app(ImageTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+        self.users = [User(username=name, email=f'{name}@example.com', password_hash='x') for name in ('alice', 'bob')]
+        db.session.add_all(self.users)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.folder)
+
+    def _upload(self, user, content, filename='me.jpg'):
+        upload = FileStorage(stream=io.BytesIO(content), filename=filename)
+        return ProfileService.update_user_profile(user.id, user.username.title(), upload).profile_image
+
+    def test_same_filename_does_not_overwrite(self):
+        """Test that two users uploading me.jpg keep their own pictures."""
+        with patch.object(image_store, 'Image', None):
+            alice_url = self._upload(self.users[0], b'alice picture')
+            bob_url = self._upload(self.users[1], b'bob picture')
+
+        self.assertNotEqual(alice_url, bob_url)
+        self.assertEqual(self.client.get(alice_url).data, b'alice picture')
+        self.assertEqual(self.client.get(bob_url).data, b'bob picture')
+
+    def test_images_are_served_as_immutable(self):
+        """Test cache headers for stored images, and the fallback while a thumbnail is missing."""
+        name = get_image_store().save(io.BytesIO(b'original bytes'), 'jpg')
+
+        response = self.client.get(f'/uploads/images/{name}')
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+
+        pending = self.client.get(f'/uploads/images/{ImageStore.thumbnail_name(name, 256)}')
+        self.assertEqual(pending.data, b'original bytes')
+        self.assertEqual(pending.headers['Cache-Control'], 'no-cache')
+
+        self.assertEqual(self.client.get('/uploads/images/missing_64.jpg').status_code, 404)
+
+    @unittest.skipIf(image_store.Image is None, 'Pillow is not installed')
+    def test_profile_points_at_a_thumbnail(self):
+        """Test that the profile image URL is the largest thumbnail."""
+        url = self._upload(self.users[0], png_bytes(1024, 768), filename='me.png')
+
+        self.assertTrue(url.endswith('_256.png'))
+        response = self.client.get(url)
+        self.assertEqual(response.headers['Cache-Control'], 'public, max-age=31536000, immutable')
+        with image_store.Image.open(io.BytesIO(response.data)) as thumbnail:
+            self.assertEqual(thumbnail.size, (256, 192))
+
+
+if __name__ == '__main__':
+    unittest.main()
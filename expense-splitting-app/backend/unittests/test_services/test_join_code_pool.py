@@ -0,0 +1,98 @@
+import time
+import unittest
+from unittest.mock import patch
+from sqlalchemy import event # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Group, GroupJoinCode, GroupMember, User
+from app.services.group_service import GroupService
+from app.services.join_code_pool import JoinCodePool, get_join_code_pool, reserve_join_codes
+
+
+class JoinCodeTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    GROUP_CODE_BATCH_SIZE = 10
+    GROUP_CODE_LOW_WATER = 3
+
+
+class TestJoinCodePool(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(JoinCodeTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.user = User(username='alice', email='alice@example.com', password_hash='x')
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_reserve_skips_codes_already_claimed(self):
+        """Test that a batch never includes a code another pool has claimed."""
+        db.session.add(GroupJoinCode(code='taken01'))
+        db.session.commit()
+
+        with patch('app.services.join_code_pool.generate_short_code', side_effect=['taken01', 'fresh01', 'fresh02']):
+            codes = reserve_join_codes(3)
+
+        self.assertEqual(codes, ['fresh01', 'fresh02'])
+        self.assertEqual(GroupJoinCode.query.count(), 3)
+
+    def test_pool_refills_below_low_water(self):
+        """Test that codes come from the pool and are topped up a batch at a time."""
+        pool = get_join_code_pool()
+        codes = [pool.take() for _ in range(25)]
+
+        self.assertEqual(len(set(codes)), 25)
+        self.assertGreaterEqual(len(pool), 3)
+        self.assertEqual(GroupJoinCode.query.count(), 25 + len(pool))
+
+    def test_background_refill(self):
+        """Test that the refill thread tops the pool up without blocking take()."""
+        pool = JoinCodePool(self.app, batch_size=10, low_water=5, background=True)
+        for _ in range(6):
+            pool.take()
+
+        deadline = time.monotonic() + 5
+        while len(pool) < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(len(pool), 5)
+
+    def test_create_group_is_one_transaction_without_code_lookups(self):
+        """Test that creating a group commits the group and its creator's membership together."""
+        get_join_code_pool().take()  # Reserve the first batch up front
+        statements, commits = [], []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        def committed(session):
+            commits.append(session)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        event.listen(db.session, 'after_commit', committed)
+        try:
+            group = GroupService.create_group(self.user.id, 'Trip')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+            event.remove(db.session, 'after_commit', committed)
+
+        self.assertEqual(len(commits), 1)
+        self.assertFalse(any('groups.unique_code = ' in statement for statement in statements))
+        self.assertFalse(any('group_join_codes' in statement for statement in statements))
+        self.assertIsNotNone(GroupMember.query.filter_by(group_id=group.id, user_id=self.user.id).first())
+
+    def test_many_groups_get_distinct_codes(self):
+        """Test that codes stay unique across many creations."""
+        for i in range(50):
+            GroupService.create_group(self.user.id, f'Group {i}')
+
+        codes = [code for code, in db.session.query(Group.unique_code)]
+        self.assertEqual(len(set(codes)), 50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+from app.utils.money import allocate, format_minor_units, from_minor_units, to_minor_units
+
+
+class TestMoney(unittest.TestCase):
+    def test_to_minor_units(self):
+        """Test that amounts are converted to cents without float drift."""
+        self.assertEqual(to_minor_units('60.50'), 6050)
+        self.assertEqual(to_minor_units(0.1 + 0.2), 30)
+        self.assertEqual(to_minor_units(19.995), 2000)
+        self.assertEqual(from_minor_units(6050), 60.5)
+        self.assertEqual(format_minor_units(6050), '60.50')
+        self.assertEqual(format_minor_units(-5), '-0.05')
+
+    def test_to_minor_units_rejects_garbage(self):
+        """Test that non-numeric amounts raise ValueError."""
+        for amount in ('abc', None, True, 'nan'):
+            with self.assertRaises(ValueError):
+                to_minor_units(amount)
+
+    def test_allocate_largest_remainder(self):
+        """Test that leftover cents go to the largest remainders and the total is kept."""
+        self.assertEqual(allocate(100, [1, 1, 1]), [34, 33, 33])
+        self.assertEqual(allocate(1000, [33.3, 33.3, 33.4]), [333, 333, 334])
+        self.assertEqual(allocate(1, [1, 1]), [1, 0])
+
+        shares = allocate(999_999, [7, 3, 11, 13])
+        self.assertEqual(sum(shares), 999_999)
+
+    def test_allocate_invalid_weights(self):
+        """Test that empty, negative or all-zero weights are rejected."""
+        for weights in ([], [1, -1], [0, 0]):
+            with self.assertRaises(ValueError):
+                allocate(100, weights)
+
+
+if __name__ == '__main__':
+    unittest.main()
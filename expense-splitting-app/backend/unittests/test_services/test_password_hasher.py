@@ -0,0 +1,94 @@
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import time
+import unittest
+from unittest.mock import patch
+from werkzeug.security import generate_password_hash # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import User
+from app.utils.password_hasher import PasswordHasher, PasswordHashingBusy, get_password_hasher
+
+
+class HasherTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SECRET_KEY = 'test-secret-key'
+    JWT_SECRET_KEY = 'test-secret-key'
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+
+
+class TestPasswordHasher(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with a user hashed at an older cost."""
+        self.app = create_app(HasherTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+        self.user = User(username='alice', email='alice@example.com', full_name='Alice',
+                         password_hash=generate_password_hash('Secret-pass1', 'pbkdf2:sha256:500'))
+        db.session.add(self.user)
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down the test database."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_hash_and_verify(self):
+        """Test that hashes use the configured method and verify only the right password."""
+        hasher = PasswordHasher(method='pbkdf2:sha256:1000')
+        password_hash = hasher.hash('Secret-pass1')
+
+        self.assertTrue(password_hash.startswith('pbkdf2:sha256:1000$'))
+        self.assertTrue(hasher.verify(password_hash, 'Secret-pass1'))
+        self.assertFalse(hasher.verify(password_hash, 'wrong'))
+        self.assertFalse(hasher.needs_rehash(password_hash))
+        self.assertTrue(hasher.needs_rehash(self.user.password_hash))
+
+    def test_full_queue_fails_fast_until_work_finishes(self):
+        """Test that a full queue is refused at once, and a timed out hash keeps its slot until it really ends."""
+        hasher = PasswordHasher(workers=1, max_pending=1, timeout=0.1)
+        executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(executor.shutdown)
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        with patch.object(hasher, '_get_executor', return_value=executor):
+            with self.assertRaises(PasswordHashingBusy):
+                hasher._run(release.wait)  # Times out, but keeps running
+
+            start = time.monotonic()
+            with self.assertRaises(PasswordHashingBusy):
+                hasher._run(str, 'next')
+            self.assertLess(time.monotonic() - start, 0.05)
+
+            release.set()
+            executor.submit(lambda: None).result()  # The blocked call has finished
+            self.assertEqual(hasher._run(str, 'next'), 'next')
+
+    def test_login_upgrades_old_hash(self):
+        """Test that a successful login rehashes with the configured method and cost."""
+        response = self.client.post('/api/login', json={'username': 'alice', 'password': 'Secret-pass1'})
+        self.assertEqual(response.status_code, 200)
+
+        db.session.refresh(self.user)
+        self.assertTrue(self.user.password_hash.startswith('pbkdf2:sha256:1000$'))
+
+        # The upgraded hash still works, and a wrong password leaves it alone
+        self.assertEqual(self.client.post('/api/login', json={'username': 'alice', 'password': 'Secret-pass1'}).status_code, 200)
+        self.assertEqual(self.client.post('/api/login', json={'username': 'alice', 'password': 'nope'}).status_code, 401)
+
+    def test_login_sheds_load_when_busy(self):
+        """Test that a full hashing queue answers 503 with Retry-After instead of piling up."""
+        with patch.object(get_password_hasher(), 'verify', side_effect=PasswordHashingBusy('busy')):
+            response = self.client.post('/api/login', json={'username': 'alice', 'password': 'Secret-pass1'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
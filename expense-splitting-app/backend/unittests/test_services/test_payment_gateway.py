@@ -0,0 +1,112 @@
+import time
+import unittest
+from unittest.mock import patch
+from app.services.fake_payment_provider import FakePaymentProvider
+from app.services.payment_gateway import (
+    CircuitBreaker, PaymentGateway, PaymentProviderError, PaymentProviderUnavailable
+)
+
+
+class TestPaymentGateway(unittest.TestCase):
+    def setUp(self):
+        self.provider = FakePaymentProvider()
+        self.gateway = PaymentGateway('fake', self.provider, timeout=1.0, max_attempts=3, workers=2,
+                                      backoff=0.01, breaker=CircuitBreaker(failure_threshold=3, reset_timeout=0.2))
+
+    def tearDown(self):
+        self.gateway.shutdown()
+
+    def _create_intent(self, key='key-1', **kwargs):
+        return self.gateway.call('create_payment_intent', 500, 'usd', {'user_id': 1}, idempotency_key=key, **kwargs)
+
+    def test_transient_failures_are_retried(self):
+        """Test that a transient failure is retried and the idempotency key yields one intent."""
+        self.provider.fail_next = 2
+
+        intent = self._create_intent()
+
+        self.assertTrue(intent['client_secret'].startswith('pi_fake_'))
+        self.assertEqual(len(self.provider.calls), 3)
+        self.assertEqual(len(self.provider.intents), 1)
+
+    def test_declines_are_not_retried(self):
+        """Test that a provider rejection is raised straight away."""
+        self.provider.decline_next = 1
+
+        with self.assertRaises(PaymentProviderError):
+            self._create_intent()
+        self.assertEqual(len(self.provider.calls), 1)
+        self.assertEqual(self.gateway.breaker.state, 'closed')
+
+    def test_slow_provider_is_cut_off_at_the_deadline(self):
+        """Test that callers wait no longer than the deadline for a hanging provider."""
+        self.provider.latency = 2.0
+        start = time.monotonic()
+
+        with self.assertRaises(PaymentProviderUnavailable):
+            self._create_intent()
+        self.assertLess(time.monotonic() - start, 1.5)
+
+    def test_circuit_opens_then_recovers(self):
+        """Test that repeated failures fail fast until the reset timeout allows a trial call."""
+        self.provider.fail_next = 3
+        with self.assertRaises(PaymentProviderUnavailable):
+            self._create_intent()
+        self.assertEqual(self.gateway.breaker.state, 'open')
+
+        calls = len(self.provider.calls)
+        with self.assertRaises(PaymentProviderUnavailable) as raised:
+            self._create_intent('key-2')
+        self.assertEqual(len(self.provider.calls), calls)
+        self.assertGreater(raised.exception.retry_after, 0)
+
+        time.sleep(0.25)
+        self.assertTrue(self._create_intent('key-3')['client_secret'])
+        self.assertEqual(self.gateway.breaker.state, 'closed')
+
+    def _open_circuit_and_wait(self):
+        self.provider.fail_next = 3
+        with self.assertRaises(PaymentProviderUnavailable):
+            self._create_intent()
+        time.sleep(0.25)
+        self.assertEqual(self.gateway.breaker.state, 'half-open')
+
+    def test_unexpected_error_in_trial_call_reopens_the_circuit(self):
+        """Test that a trial call failing with an unexpected exception counts as a failure rather than wedging the circuit."""
+        self._open_circuit_and_wait()
+
+        with patch.object(self.provider, 'create_payment_intent', side_effect=RuntimeError('boom')):
+            with self.assertRaises(RuntimeError):
+                self._create_intent('key-2')
+        self.assertEqual(self.gateway.breaker.state, 'open')
+
+        time.sleep(0.25)
+        self.assertTrue(self._create_intent('key-3')['client_secret'])
+        self.assertEqual(self.gateway.breaker.state, 'closed')
+
+    def test_trial_slot_is_released_when_the_queue_is_full(self):
+        """Test that a trial call turned away before reaching the provider lets the next call try."""
+        self._open_circuit_and_wait()
+
+        held = 0
+        while self.gateway._slots.acquire(blocking=False):
+            held += 1
+        with self.assertRaises(PaymentProviderUnavailable):
+            self._create_intent('key-2')
+        for _ in range(held):
+            self.gateway._slots.release()
+
+        self.assertTrue(self._create_intent('key-3')['client_secret'])
+        self.assertEqual(self.gateway.breaker.state, 'closed')
+
+    def test_non_idempotent_calls_are_attempted_once(self):
+        """Test that calls the provider could apply twice are never retried."""
+        self.provider.fail_next = 1
+
+        with self.assertRaises(PaymentProviderUnavailable):
+            self.gateway.call('execute_payment', 'PAYID-1', 'PAYER', idempotent=False)
+        self.assertEqual(self.provider.calls, ['execute_payment'])
+
+
+if __name__ == '__main__':
+    unittest.main()
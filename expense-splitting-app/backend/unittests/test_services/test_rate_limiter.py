@@ -0,0 +1,123 @@
+import os
+import tempfile
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.utils.rate_limiter import AdaptiveConcurrencyLimiter, MemoryRateLimitStore, SqliteRateLimitStore, get_rate_limiter
+
+
+class RateLimitTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+    SECRET_KEY = 'test-secret-key'
+    JWT_SECRET_KEY = 'test-secret-key'
+    RATE_LIMIT_ENABLED = True
+    RATE_LIMIT_IP_PER_SECOND = 1
+    RATE_LIMIT_IP_BURST = 3
+    RATE_LIMIT_PASSWORD_PER_SECOND = 0.01
+    RATE_LIMIT_PASSWORD_BURST = 2
+
+
+class TestTokenBuckets(unittest.TestCase):
+    def test_bucket_allows_burst_then_refills(self):
+        """Test that a bucket allows its burst, then one request per 1/rate seconds."""
+        with tempfile.TemporaryDirectory() as tmp:
+            for store in (MemoryRateLimitStore(), SqliteRateLimitStore(os.path.join(tmp, 'limits.db'))):
+                results = [store.consume('ip:1', rate=2, burst=3, now=100.0) for _ in range(4)]
+                self.assertEqual(results[:3], [0.0, 0.0, 0.0])
+                self.assertAlmostEqual(results[3], 0.5)
+
+                self.assertEqual(store.consume('ip:1', rate=2, burst=3, now=100.5), 0.0)
+                self.assertEqual(store.consume('ip:2', rate=2, burst=3, now=100.5), 0.0)
+
+    def test_rejected_request_drains_no_bucket(self):
+        """Test that a request refused by one bucket leaves the caller's other buckets untouched."""
+        buckets = [('ip:1', 1, 5), ('user:1', 1, 1)]
+        with tempfile.TemporaryDirectory() as tmp:
+            for store in (MemoryRateLimitStore(), SqliteRateLimitStore(os.path.join(tmp, 'limits.db'))):
+                self.assertEqual(store.consume_all(buckets, now=10.0), 0.0)
+                for _ in range(10):
+                    self.assertAlmostEqual(store.consume_all(buckets, now=10.0), 1.0)
+
+                # The IP bucket paid only for the request that was let through
+                results = [store.consume('ip:1', rate=1, burst=5, now=10.0) for _ in range(5)]
+                self.assertEqual(results[:4], [0.0] * 4)
+                self.assertGreater(results[4], 0)
+
+    def test_sqlite_store_is_shared(self):
+        """Test that two store instances on one file, like two workers, share one bucket."""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'limits.db')
+            first, second = SqliteRateLimitStore(path), SqliteRateLimitStore(path)
+
+            self.assertEqual(first.consume('user:1', rate=1, burst=2, now=50.0), 0.0)
+            self.assertEqual(second.consume('user:1', rate=1, burst=2, now=50.0), 0.0)
+            self.assertGreater(first.consume('user:1', rate=1, burst=2, now=50.0), 0)
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+    def test_limit_shrinks_on_slow_requests_and_recovers(self):
+        """Test that slow completions cut the limit and fast ones grow it back."""
+        limiter = AdaptiveConcurrencyLimiter(target_latency=0.1, initial_limit=4, min_limit=2, max_limit=8, backoff=0.5)
+        self.assertTrue(all(limiter.try_acquire() for _ in range(4)))
+        self.assertFalse(limiter.try_acquire())
+
+        limiter.release(1.0)
+        self.assertEqual(limiter.limit, 2)
+        self.assertFalse(limiter.try_acquire())  # 3 still in flight
+
+        for _ in range(3):
+            limiter.release(0.01)
+        for _ in range(20):
+            limiter.try_acquire()
+            limiter.try_acquire()
+            limiter.release(0.01)
+            limiter.release(0.01)
+        self.assertGreater(limiter.limit, 2)
+        self.assertEqual(limiter.in_flight, 0)
+
+
+class TestRateLimitMiddleware(unittest.TestCase):
+    def setUp(self):
+        """Set up an app with small limits."""
+        self.app = create_app(RateLimitTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        """Tear down the test database."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_ip_limit_returns_429_with_retry_after(self):
+        """Test that requests past the per-IP burst get 429 and a Retry-After header."""
+        statuses = [self.client.post('/api/check-username', json={'username': 'bob'}).status_code for _ in range(4)]
+
+        self.assertNotIn(429, statuses[:3])
+        self.assertEqual(statuses[3], 429)
+        response = self.client.post('/api/check-username', json={'username': 'bob'})
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    def test_login_has_its_own_budget(self):
+        """Test that password endpoints are limited more tightly than the rest of the API."""
+        statuses = [self.client.post('/api/login', json={'username': 'x', 'password': 'y'}).status_code for _ in range(3)]
+
+        self.assertEqual(statuses[:2], [401, 401])
+        self.assertEqual(statuses[2], 429)
+
+    def test_overloaded_worker_sheds_with_503(self):
+        """Test that requests over the concurrency limit are rejected fast with 503."""
+        concurrency = get_rate_limiter().concurrency
+        for _ in range(concurrency.limit):
+            concurrency.try_acquire()
+
+        response = self.client.post('/api/check-username', json={'username': 'bob'})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main()
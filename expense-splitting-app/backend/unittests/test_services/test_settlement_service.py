@@ -0,0 +1,96 @@
+import random
+import unittest
+from unittest.mock import patch
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import Group, GroupMember, User
+from app.services.balance_service import BalanceService
+from app.services.settlement_service import SettlementService
+
+
+class SettlementTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class TestSimplifyDebts(unittest.TestCase):
+    def _settle(self, balances, transfers):
+        """Apply transfers to balances and return what is left."""
+        remaining = dict(balances)
+        for transfer in transfers:
+            remaining[transfer['from_user_id']] += transfer['amount']
+            remaining[transfer['to_user_id']] -= transfer['amount']
+        return remaining
+
+    def test_settles_every_balance(self):
+        """Test that the plan brings every member back to zero."""
+        balances = {1: 5000, 2: -1000, 3: -4000}
+        transfers = SettlementService.simplify_debts(balances)
+
+        self.assertEqual(len(transfers), 2)
+        for balance in self._settle(balances, transfers).values():
+            self.assertEqual(balance, 0)
+
+    def test_transfer_count_is_bounded(self):
+        """Test that a large random group needs at most members - 1 transfers."""
+        rng = random.Random(42)
+        balances = {user_id: rng.randint(-10000, 10000) for user_id in range(1, 1000)}
+        balances[1000] = -sum(balances.values())
+
+        transfers = SettlementService.simplify_debts(balances)
+
+        self.assertLessEqual(len(transfers), len(balances) - 1)
+        for balance in self._settle(balances, transfers).values():
+            self.assertEqual(balance, 0)
+
+    def test_settled_group_needs_no_transfers(self):
+        """Test that a group with zero balances gets an empty plan."""
+        self.assertEqual(SettlementService.simplify_debts({1: 0, 2: 0}), [])
+
+
+class TestSettlementPlanCache(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database with one group of two members."""
+        self.app = create_app(SettlementTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        self.alice = User(username='alice', email='alice@example.com', password_hash='x')
+        self.bob = User(username='bob', email='bob@example.com', password_hash='x')
+        db.session.add_all([self.alice, self.bob])
+        db.session.flush()
+        self.group = Group(name='Flat', unique_code='FLAT123', created_by=self.alice.id)
+        db.session.add(self.group)
+        db.session.flush()
+        db.session.add_all([
+            GroupMember(group_id=self.group.id, user_id=self.alice.id),
+            GroupMember(group_id=self.group.id, user_id=self.bob.id),
+        ])
+        BalanceService.apply_deltas(self.group.id, {self.alice.id: 2000, self.bob.id: -2000})
+        db.session.commit()
+
+    def tearDown(self):
+        """Tear down the test database."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_plan_is_cached_until_ledger_changes(self):
+        """Test that the plan is only rebuilt after the group's ledger moves."""
+        with patch.object(SettlementService, 'simplify_debts', wraps=SettlementService.simplify_debts) as spy:
+            first = SettlementService.get_settlement_plan(self.alice.id, self.group.id)
+            SettlementService.get_settlement_plan(self.bob.id, self.group.id)
+            self.assertEqual(spy.call_count, 1)
+
+            BalanceService.apply_deltas(self.group.id, {self.alice.id: -500, self.bob.id: 500})
+            db.session.commit()
+            second = SettlementService.get_settlement_plan(self.alice.id, self.group.id)
+            self.assertEqual(spy.call_count, 2)
+
+        self.assertEqual(first[0]['amount'], 20.0)
+        self.assertEqual(second[0]['amount'], 15.0)
+        self.assertEqual(second[0]['from_username'], 'bob')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import random
+import unittest
+from app.utils import split_calculator
+from app.utils.money import allocate
+
+ENGINES = [False] + ([True] if split_calculator.numpy_available() else [])
+
+
+class TestSplitCalculator(unittest.TestCase):
+    def test_equal_matches_allocate(self):
+        """Test that batched equal splits match the per-expense allocation."""
+        amounts = [100, 1, 999_999, 5000]
+        counts = [3, 2, 7, 1]
+
+        for use_numpy in ENGINES:
+            batch = split_calculator.split_equal(amounts, counts, use_numpy=use_numpy)
+            self.assertEqual(batch.errors, {})
+            self.assertEqual(list(batch), [allocate(amount, [1] * count) for amount, count in zip(amounts, counts)])
+
+    def test_weights_match_allocate(self):
+        """Test random weighted splits against money.allocate on every engine."""
+        rng = random.Random(7)
+        counts = [rng.randint(1, 30) for _ in range(200)]
+        amounts = [rng.randint(1, 10_000_000) for _ in counts]
+        weights = [rng.randint(0, 1_000_000) + 1 for _ in range(sum(counts))]
+
+        offsets = split_calculator.offsets_from_counts(counts)
+        expected = [allocate(amount, weights[offsets[i]:offsets[i + 1]]) for i, amount in enumerate(amounts)]
+        for use_numpy in ENGINES:
+            batch = split_calculator.split_by_weights(amounts, weights, counts, use_numpy=use_numpy)
+            self.assertEqual(list(batch), expected)
+
+    def test_percentage_errors_are_per_expense(self):
+        """Test that one bad expense doesn't stop the rest of the batch."""
+        weights = split_calculator.scale_percentages([33.3, 33.3, 33.4, 50, 40])
+
+        for use_numpy in ENGINES:
+            batch = split_calculator.split_by_percentage([1000, 1000], weights, [3, 2], use_numpy=use_numpy)
+            self.assertEqual(batch.shares_for(0), [333, 333, 334])
+            self.assertEqual(batch.errors, {1: "Total percentage must equal 100%"})
+
+    def test_custom_amounts_must_add_up(self):
+        """Test that custom amounts are checked against each expense total."""
+        for use_numpy in ENGINES:
+            batch = split_calculator.split_by_amounts([1000, 500, 0], [400, 600, 100, 300, 0], [2, 2, 1], use_numpy=use_numpy)
+            self.assertEqual(batch.shares_for(0), [400, 600])
+            self.assertEqual(set(batch.errors), {1, 2})
+
+    def test_scale_percentages_rejects_extra_precision(self):
+        """Test that percentages finer than four decimal places are rejected."""
+        self.assertEqual(split_calculator.scale_percentages(['12.5', 87.5]), [125000, 875000])
+        with self.assertRaises(ValueError):
+            split_calculator.scale_percentages([33.333333, 66.666667])
+
+
+if __name__ == '__main__':
+    unittest.main()
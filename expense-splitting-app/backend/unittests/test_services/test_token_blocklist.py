@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+import unittest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import RevokedToken
+from app.utils.bloom import BloomFilter
+from app.utils.query_monitor import count_queries
+from app.utils.token_blocklist import DatabaseBlocklistStore, MemoryBlocklistStore, TokenBlocklist
+
+
+class BlocklistTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class TestBloomFilter(unittest.TestCase):
+    def test_no_false_negatives(self):
+        """Test that every added item is reported and the false positive rate stays near target."""
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f'jti-{i}')
+
+        self.assertTrue(all(f'jti-{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other-{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertFalse(bloom.is_saturated)
+
+
+class TestTokenBlocklist(unittest.TestCase):
+    def setUp(self):
+        """Set up an in-memory database for the database store."""
+        self.app = create_app(BlocklistTestConfig)
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        """Tear down the test database."""
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_not_revoked_needs_no_queries(self):
+        """Test that the bloom filter answers the common case without touching the database."""
+        blocklist = TokenBlocklist(DatabaseBlocklistStore(), refresh_interval=60)
+        blocklist.revoke('revoked', datetime.utcnow() + timedelta(hours=1))
+        blocklist.is_revoked('warm-up')
+
+        with count_queries() as stats:
+            self.assertFalse(blocklist.is_revoked('still-valid'))
+        self.assertEqual(stats.count, 0)
+
+        self.assertTrue(blocklist.is_revoked('revoked'))
+
+    def test_workers_see_each_others_revocations(self):
+        """Test that a second worker picks up new entries on its next incremental refresh."""
+        store = DatabaseBlocklistStore()
+        first = TokenBlocklist(store, refresh_interval=0)
+        second = TokenBlocklist(store, refresh_interval=0)
+        self.assertFalse(second.is_revoked('shared'))
+
+        first.revoke('shared', datetime.utcnow() + timedelta(hours=1))
+
+        self.assertTrue(second.is_revoked('shared'))
+
+    def test_entries_committed_late_are_picked_up(self):
+        """Test that a revocation stamped before a refresh but committed after it is not missed."""
+        blocklist = TokenBlocklist(DatabaseBlocklistStore(), refresh_interval=0, rebuild_interval=3600)
+        self.assertFalse(blocklist.is_revoked('warm-up'))
+        self.assertFalse(blocklist.is_revoked('fast-id-2'))
+
+        # Another worker stamped this logout before the refresh above, but only commits it now
+        db.session.add(RevokedToken(jti='slow-id-1', expires_at=datetime.utcnow() + timedelta(hours=1),
+                                    revoked_at=datetime.utcnow() - timedelta(seconds=5)))
+        db.session.commit()
+
+        self.assertTrue(blocklist.is_revoked('slow-id-1'))
+
+    def test_periodic_rebuild(self):
+        """Test that a full rebuild picks up entries the incremental refreshes could not see."""
+        blocklist = TokenBlocklist(DatabaseBlocklistStore(), refresh_interval=0, rebuild_interval=0)
+        self.assertFalse(blocklist.is_revoked('warm-up'))
+
+        db.session.add(RevokedToken(jti='very-late', expires_at=datetime.utcnow() + timedelta(hours=1),
+                                    revoked_at=datetime.utcnow() - timedelta(hours=1)))
+        db.session.commit()
+
+        self.assertTrue(blocklist.is_revoked('very-late'))
+
+    def test_prune_leaves_the_callers_transaction_alone(self):
+        """Test that pruning during a check doesn't commit what the request has pending."""
+        blocklist = TokenBlocklist(DatabaseBlocklistStore(), refresh_interval=0, prune_interval=0)
+        db.session.add(RevokedToken(jti='pending', expires_at=datetime.utcnow() + timedelta(hours=1)))
+
+        blocklist.is_revoked('anything')
+        db.session.rollback()
+
+        self.assertIsNone(RevokedToken.query.filter_by(jti='pending').first())
+
+    def test_expired_entries_are_pruned(self):
+        """Test that entries are dropped once their token would have expired anyway."""
+        for store in (DatabaseBlocklistStore(), MemoryBlocklistStore()):
+            blocklist = TokenBlocklist(store, refresh_interval=0, prune_interval=0)
+            blocklist.revoke('old', datetime.utcnow() - timedelta(seconds=1))
+            blocklist.revoke('current', datetime.utcnow() + timedelta(hours=1))
+
+            self.assertFalse(blocklist.is_revoked('old'))
+            self.assertTrue(blocklist.is_revoked('current'))
+            self.assertEqual(store.active(), ['current'])
+
+        self.assertEqual([token.jti for token in RevokedToken.query.all()], ['current'])
+
+
+if __name__ == '__main__':
+    unittest.main()
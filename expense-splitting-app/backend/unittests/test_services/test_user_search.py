@@ -0,0 +1,87 @@
+import unittest
+from sqlalchemy import event # type: ignore
+from app import create_app, db
+from app.config import TestingConfig
+from app.models import User
+from app.services.user_service import UserService
+
+
+class UserSearchTestConfig(TestingConfig):
+    SQLALCHEMY_DATABASE_URI = 'sqlite://'
+
+
+class TestUserSearch(unittest.TestCase):
+    def setUp(self):
+        self.app = create_app(UserSearchTestConfig)
+        self.ctx = self.app.app_context()
+        self.ctx.push()
+        db.create_all()
+        for username, full_name in (('alice', 'Alice Liddell'), ('bob', 'Bob Malice'),
+                                    ('carol', 'Carol Danvers'), ('dave', None)):
+            db.session.add(User(username=username, email=f'{username}@example.com',
+                                full_name=full_name, password_hash='x'))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.ctx.pop()
+
+    def _usernames(self, term, **kwargs):
+        return sorted(user['username'] for user in UserService.search_users(term, **kwargs).items)
+
+    def test_matches_substrings_of_username_and_full_name(self):
+        """Test that a term matches anywhere in either column, ignoring case."""
+        self.assertEqual(self._usernames('LIC'), ['alice', 'bob'])
+        self.assertEqual(self._usernames('danv'), ['carol'])
+        self.assertEqual(self._usernames('nobody'), [])
+
+    def test_index_follows_updates_and_deletes(self):
+        """Test that the search index is kept in step with the users table."""
+        carol = User.query.filter_by(username='carol').first()
+        carol.full_name = 'Carol Malice'
+        db.session.delete(User.query.filter_by(username='alice').first())
+        db.session.commit()
+
+        self.assertEqual(self._usernames('alice'), ['bob', 'carol'])
+        self.assertEqual(self._usernames('danvers'), [])
+
+    def test_search_uses_the_index(self):
+        """Test that search reads matches from the FTS table, and the terms are quoted."""
+        statements = []
+
+        def record(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', record)
+        try:
+            self.assertEqual(self._usernames('ali"ce OR'), [])
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', record)
+        self.assertTrue(any('users_fts MATCH' in statement for statement in statements))
+
+    def test_rejects_short_terms(self):
+        """Test that terms too short for the trigram index are refused."""
+        with self.assertRaises(ValueError):
+            UserService.search_users('al')
+
+    def test_pages_through_results(self):
+        """Test that search results are paginated with a cursor."""
+        first = UserService.search_users('lic', limit=1)
+        second = UserService.search_users('lic', cursor=first.next_cursor, limit=1)
+
+        self.assertIsNotNone(first.next_cursor)
+        self.assertIsNone(second.next_cursor)
+        self.assertEqual(len({first.items[0]['id'], second.items[0]['id']}), 2)
+
+    def test_get_users_by_ids(self):
+        """Test that a batch lookup keeps the requested order and skips unknown IDs."""
+        ids = {user.username: user.id for user in User.query}
+        users = UserService.get_users_by_ids([ids['carol'], 999, ids['alice'], ids['carol']])
+
+        self.assertEqual([user['username'] for user in users], ['carol', 'alice'])
+        self.assertNotIn('password_hash', users[0])
+
+
+if __name__ == '__main__':
+    unittest.main()